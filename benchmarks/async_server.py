@@ -0,0 +1,128 @@
+"""
+asyncio vs threaded server benchmark
+
+Holds 1,000 concurrent keep-alive connections against each server mode
+and measures throughput, latency and failed requests for a route that
+waits 10ms on I/O: asyncio.sleep in an async action on the asyncio
+server, time.sleep in a sync action on the threaded one.
+
+    python -m benchmarks.async_server [seconds] [connections]
+"""
+import asyncio
+import logging
+import multiprocessing
+import socket
+import statistics
+import sys
+import time
+from unittest.mock import MagicMock
+from core.routing.router import Router
+from slave.async_server import AsyncHTTPServer
+from slave.server import PooledHTTPServer, RouterHandler
+
+THREADS = 32
+
+async def async_io(request):
+    await asyncio.sleep(0.01)
+    return {'ok': True}
+
+def blocking_io(request):
+    time.sleep(0.01)
+    return {'ok': True}
+
+class QuietHandler(RouterHandler):
+    def log_message(self, format, *args):
+        pass
+
+def _serve(mode, listen_socket, connections):
+    logging.disable(logging.WARNING)
+    router = Router()
+    router.get('/io', async_io if mode == 'asyncio' else blocking_io)
+    app = MagicMock()
+    app.make.return_value = router.freeze()
+
+    if mode == 'asyncio':
+        server = AsyncHTTPServer(
+            None, app, threads=THREADS, max_connections=connections * 2, listen_socket=listen_socket
+        )
+    else:
+        def handler(*args, **kwargs):
+            return QuietHandler(*args, app=app, **kwargs)
+        server = PooledHTTPServer(
+            None, handler, workers=THREADS, queue_size=connections * 2, listen_socket=listen_socket
+        )
+    server.serve_forever()
+
+def _listen(backlog):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(backlog)
+    return sock
+
+async def _client(port, stop_at, latencies, failures):
+    request = b'GET /io HTTP/1.1\r\nHost: localhost\r\n\r\n'
+    reader = writer = None
+    while time.monotonic() < stop_at:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            started = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = 0
+            for line in head.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await reader.readexactly(length)
+            if not head.startswith(b'HTTP/1.1 200'):
+                failures.append(head.split(b'\r\n', 1)[0])
+            else:
+                latencies.append(time.perf_counter() - started)
+            if b'Connection: close' in head:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError):
+            failures.append(b'connection error')
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.01)
+    if writer is not None:
+        writer.close()
+
+async def _load(port, seconds, connections):
+    latencies, failures = [], []
+    stop_at = time.monotonic() + seconds
+    await asyncio.gather(*(_client(port, stop_at, latencies, failures) for _ in range(connections)))
+    return latencies, failures
+
+def _measure(mode, seconds, connections):
+    sock = _listen(connections)
+    port = sock.getsockname()[1]
+    server = multiprocessing.get_context('fork').Process(target=_serve, args=(mode, sock, connections))
+    server.start()
+    sock.close()
+    try:
+        latencies, failures = asyncio.run(_load(port, seconds, connections))
+    finally:
+        server.terminate()
+        server.join()
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000 if latencies else 0.0
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0
+    return len(latencies) / seconds, p50, p99, len(failures)
+
+def run(seconds: float = 10.0, connections: int = 1000):
+    print(f"{connections} connections, {seconds:g}s per run, {THREADS} threads per server")
+    print(f"{'mode':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'failed':>7}")
+    for mode in ('threaded', 'asyncio'):
+        throughput, p50, p99, failed = _measure(mode, seconds, connections)
+        print(f"{mode:>8} {throughput:>9.1f} {p50:>8.1f} {p99:>8.1f} {failed:>7}")
+
+if __name__ == '__main__':
+    run(
+        float(sys.argv[1]) if len(sys.argv) > 1 else 10.0,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    )
@@ -0,0 +1,37 @@
+"""
+Startup budget benchmark
+
+Boots the application in fresh interpreters, reports the median boot
+time with its slowest steps, and exits with status 1 when the median is
+over budget, so a CI job fails on startup regressions. The budget is
+given in milliseconds, or read from app.server.boot_budget (BOOT_BUDGET_MS);
+0 only reports.
+
+    python -m benchmarks.boot_budget [budget_ms] [runs]
+"""
+import statistics
+import sys
+from pathlib import Path
+from typing import Optional
+from core.foundation.boot_profile import profile_boot
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+def run(budget_ms: Optional[float] = None, runs: int = 7) -> int:
+
+    profiles = sorted((profile_boot(root=PROJECT_ROOT) for _ in range(runs)), key=lambda profile: profile.total)
+    median = profiles[len(profiles) // 2]
+    print(f"boot    median {median.total * 1000:7.2f} ms  min {profiles[0].total * 1000:7.2f} ms"
+          f"  imports {statistics.median(profile.import_time for profile in profiles) * 1000:7.2f} ms")
+    for phase, name, seconds in sorted(median.steps, key=lambda step: step[2], reverse=True)[:5]:
+        print(f"  {phase:<12} {name:<40} {seconds * 1000:7.2f} ms")
+
+    if median.over_budget(budget_ms):
+        budget_ms = median.budget if budget_ms is None else budget_ms
+        print(f"over budget: {median.total * 1000:.2f} ms > {budget_ms:g} ms")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    arguments = sys.argv[1:3]
+    sys.exit(run(float(arguments[0]) if arguments else None, *(int(arg) for arg in arguments[1:])))
@@ -0,0 +1,66 @@
+"""
+Config cache cold boot benchmark
+
+Generates a config directory of files that read hundreds of environment
+variables through env() and compares, in fresh interpreters, executing
+the config files against loading the config:cache artifact. The shared
+cost of importing the loader itself is excluded from both timings.
+
+    python -m benchmarks.config_boot [files] [keys] [runs]
+"""
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from core.config.loader import config
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+BOOT = '''
+import sys, time
+sys.path[:0] = [{root!r}]
+from core.config.loader import config
+start = time.perf_counter()
+config.load_config({config!r}, use_cache={cached!r})
+elapsed = time.perf_counter() - start
+assert len(config.all()) == {files!r}
+print(elapsed * 1000)
+'''
+
+def _write_config(directory: Path, files: int, keys: int):
+    config_dir = directory / 'config'
+    config_dir.mkdir()
+    for index in range(files):
+        lines = [
+            'from core.config.loader import env',
+            '',
+            'def config():',
+            '    return {',
+        ]
+        for key in range(keys):
+            name = f'BENCH_{index}_{key}'
+            default = (repr(f'value-{key}'), str(key), 'True')[key % 3]
+            lines.append(f"        {name.lower()!r}: {{'value': env({name!r}, {default}), 'enabled': env('APP_DEBUG', False)}},")
+        lines.append('    }')
+        (config_dir / f'section{index}.py').write_text('\n'.join(lines) + '\n')
+    return config_dir
+
+def _boot(config_dir: Path, files: int, cached: bool) -> float:
+    code = BOOT.format(root=str(PROJECT_ROOT), config=str(config_dir), cached=cached, files=files)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return float(output.stdout.strip())
+
+def run(files: int = 12, keys: int = 40, runs: int = 15):
+    directory = Path(tempfile.mkdtemp())
+    config_dir = _write_config(directory, files, keys)
+
+    cache = config.cache(str(config_dir))
+    print(f"{files} config files, {files * keys * 2} env() calls, cache {cache.stat().st_size} bytes")
+
+    for mode, cached in (('config files', False), ('config cache', True)):
+        times = [_boot(config_dir, files, cached) for _ in range(runs)]
+        print(f"{mode:<12} median {statistics.median(times):7.2f} ms  min {min(times):7.2f} ms")
+
+if __name__ == '__main__':
+    run(*(int(arg) for arg in sys.argv[1:4]))
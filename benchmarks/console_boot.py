@@ -0,0 +1,64 @@
+"""
+Console command registry benchmark
+
+Compares, in fresh interpreters, listing the commands (`help`) and
+running one command by importing and instantiating every command class,
+as the kernel did before, against reading the command manifest and
+importing only the invoked command. Application boot is excluded.
+
+    python -m benchmarks.console_boot [runs]
+"""
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from core.console.kernel import commands
+from core.console.manifest import compile_command_manifest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+BOOT = '''
+import contextlib, io, sys, time
+sys.path[:0] = [{root!r}]
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    if {mode!r} == 'eager':
+        from core.console.kernel import commands
+        from core.console.manifest import resolve_command
+        classes = {{}}
+        for name in commands:
+            command_class = resolve_command(name)
+            classes[command_class().signature] = command_class
+        if {args!r} == ['help']:
+            for command_class in classes.values():
+                command_class().description
+        else:
+            classes[{args!r}[0]]().parse_args({args!r}[1:])
+    else:
+        from core.console.kernel import ConsoleKernel
+        kernel = ConsoleKernel({manifest!r})
+        if {args!r} == ['help']:
+            kernel.run({args!r})
+        else:
+            kernel._resolve({args!r}[0])().parse_args({args!r}[1:])
+print((time.perf_counter() - start) * 1000)
+'''
+
+def _boot(manifest: Path, mode: str, args: list) -> float:
+    code = BOOT.format(root=str(PROJECT_ROOT), mode=mode, manifest=str(manifest), args=args)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return float(output.stdout.strip())
+
+def run(runs: int = 15):
+    manifest = Path(tempfile.mkdtemp()) / 'commands.json'
+    compile_command_manifest(commands, manifest)
+
+    for args in (['help'], ['make:model', 'Post']):
+        for mode in ('eager', 'manifest'):
+            times = [_boot(manifest, mode, args) for _ in range(runs)]
+            label = f"{' '.join(args)} ({mode})"
+            print(f"{label:<28} median {statistics.median(times):7.2f} ms  min {min(times):7.2f} ms")
+
+if __name__ == '__main__':
+    run(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,56 @@
+"""
+Streaming JSON encoder benchmark
+
+Serializes a sqlite table of model rows the buffered way (Model.all(),
+to_dict() per row, one json.dumps) and with encode_json_array over
+Model.cursor(), reporting time and peak traced memory for each.
+
+    python -m benchmarks.json_stream [rows]
+"""
+import json
+import sys
+import time
+import tracemalloc
+from unittest.mock import patch
+from core.database.connection import Connection
+from core.database.orm.model import Model
+from core.http.json_stream import encode_json_array
+
+class Order(Model):
+    _table = 'orders'
+    _hidden = ['internal_note']
+    _casts = {'id': 'int', 'paid': 'bool'}
+
+def _buffered():
+    return len(json.dumps([order.to_dict() for order in Order.all()]).encode())
+
+def _streamed():
+    return sum(len(chunk) for chunk in encode_json_array(Order.cursor()))
+
+def _measure(serialize):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = serialize()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+def run(rows: int = 200000):
+    connection = Connection()
+    connection.connect('sqlite', database=':memory:')
+    connection.execute('CREATE TABLE orders (id INTEGER, customer TEXT, total REAL, paid INTEGER, internal_note TEXT)')
+    connection.connection.executemany(
+        'INSERT INTO orders VALUES (?, ?, ?, ?, ?)',
+        ((i, f'customer{i % 977}@example.com', i * 1.25, i % 2, 'n/a') for i in range(rows))
+    )
+
+    print(f"{rows} rows")
+    print(f"{'method':>9} {'bytes':>11} {'seconds':>8} {'peak MiB':>9}")
+    with patch.object(Order, '_get_connection', return_value=connection):
+        for name, serialize in (('buffered', _buffered), ('streamed', _streamed)):
+            size, elapsed, peak = _measure(serialize)
+            print(f"{name:>9} {size:>11} {elapsed:>8.2f} {peak / 1048576:>9.1f}")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,111 @@
+"""
+Pre-fork server benchmark
+
+Measures requests per second for a CPU-bound route served by 1, 2 and 4
+worker processes. Threads within one process share the interpreter lock,
+so throughput should scale with the number of workers up to the number
+of cores.
+
+    python -m benchmarks.prefork [seconds] [clients]
+"""
+import http.client
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+from core.routing.router import Router
+from slave.prefork import PreforkServer
+from slave.server import PooledHTTPServer, RouterHandler, RouterServer
+
+def cpu_bound(request):
+    total = 0
+    for i in range(20000):
+        total += i * i
+    return {'total': total}
+
+class QuietHandler(RouterHandler):
+    def log_message(self, format, *args):
+        pass
+
+class BenchmarkServer(RouterServer):
+    def create_server(self, listen_socket=None, max_requests=0):
+        router = Router()
+        router.get('/work', cpu_bound)
+        app = MagicMock()
+        app.make.return_value = router.freeze()
+
+        def handler(*args, **kwargs):
+            return QuietHandler(*args, app=app, **kwargs)
+
+        return PooledHTTPServer(
+            (self.host, self.port), handler, workers=self.threads,
+            max_requests=max_requests, listen_socket=listen_socket
+        )
+
+def _serve(port, workers):
+    PreforkServer(BenchmarkServer('127.0.0.1', port, workers=workers, threads=4)).run()
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _wait_until_serving(port):
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+def _client(port, stop_at, counts):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    served = 0
+    while time.monotonic() < stop_at:
+        try:
+            connection.request('GET', '/work')
+            connection.getresponse().read()
+            served += 1
+        except (http.client.HTTPException, ConnectionError):
+            # The server hands busy keep-alive connections back; reconnect
+            connection.close()
+    connection.close()
+    counts.append(served)
+
+def _throughput(workers, seconds, clients):
+    port = _free_port()
+    master = multiprocessing.get_context('fork').Process(target=_serve, args=(port, workers))
+    master.start()
+    try:
+        _wait_until_serving(port)
+        counts = []
+        stop_at = time.monotonic() + seconds
+        threads = [threading.Thread(target=_client, args=(port, stop_at, counts)) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(counts) / seconds
+    finally:
+        master.terminate()
+        master.join()
+
+def run(seconds: float = 5.0, clients: int = 8):
+    logging.disable(logging.INFO)
+    print(f"{os.cpu_count()} cores, {clients} clients, {seconds:g}s per run")
+    print(f"{'workers':>7} {'req/s':>10}")
+    for workers in (1, 2, 4):
+        print(f"{workers:>7} {_throughput(workers, seconds, clients):>10.1f}")
+
+if __name__ == '__main__':
+    run(
+        float(sys.argv[1]) if len(sys.argv) > 1 else 5.0,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    )
@@ -0,0 +1,59 @@
+"""
+Rate limiter latency benchmark
+
+Measures the time added to each request by ThrottleRequests for every
+limiter backend.
+
+    python -m benchmarks.rate_limiter [iterations]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+from core.http.middleware.middleware import ThrottleRequests
+from core.http.middleware.rate_limiter import (
+    SQLiteSlidingWindowLimiter,
+    SlidingWindowLimiter,
+    TokenBucketLimiter
+)
+
+class _Request:
+    method = 'GET'
+    path = '/api/users'
+    route = None
+    user = None
+
+    def __init__(self, ip: str):
+        self.client_ip = ip
+
+    def ip(self):
+        return self.client_ip
+
+def _action(request):
+    return {'ok': True}
+
+def run(iterations: int = 20000):
+    requests = [_Request(f"10.0.{i // 256}.{i % 256}") for i in range(1000)]
+    limiters = {
+        'none': None,
+        'memory (sliding window)': SlidingWindowLimiter(),
+        'memory (token bucket)': TokenBucketLimiter(),
+        'sqlite (shared)': SQLiteSlidingWindowLimiter(str(Path(tempfile.mkdtemp()) / 'limits.sqlite')),
+    }
+
+    baseline = None
+    print(f"{'limiter':<26} {'us/request':>12} {'added':>10}")
+    for name, limiter in limiters.items():
+        middleware = ThrottleRequests(max_attempts=1000000, limiter=limiter)
+        handle = _action if limiter is None else (lambda request: middleware.handle(request, _action))
+
+        start = time.perf_counter()
+        for i in range(iterations):
+            handle(requests[i % len(requests)])
+        per_request = (time.perf_counter() - start) / iterations * 1e6
+
+        baseline = per_request if baseline is None else baseline
+        print(f"{name:<26} {per_request:>12.2f} {per_request - baseline:>10.2f}")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,90 @@
+"""
+Route cache cold boot benchmark
+
+Generates an application with 500 routes spread over nested groups and
+compares, in fresh interpreters, executing the route files against
+loading the route:cache artifact. The shared cost of importing the router
+itself is excluded from both timings.
+
+    python -m benchmarks.route_cache [routes] [runs]
+"""
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+from pathlib import Path
+from core.routing.cache import cache_routes
+from core.routing.router import Router
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+CONTROLLER = '''
+from core.http.controllers.controller import Controller
+
+class ResourceController(Controller):
+    def index(self):
+        return {'data': []}
+
+    def show(self, id):
+        return {'data': {'id': id}}
+
+    def store(self):
+        return {'data': {}}
+'''
+
+BOOT = '''
+import sys, time
+sys.path[:0] = [{root!r}, {app!r}]
+from core.routing.router import Router
+start = time.perf_counter()
+if {mode!r} == 'route cache':
+    from core.routing.cache import load_cached_routes
+    router = load_cached_routes({cache!r})
+else:
+    from bench_routes import register
+    router = register(Router()).freeze()
+print((time.perf_counter() - start) * 1000)
+'''
+
+def _write_app(directory: Path, count: int):
+    lines = [
+        'from bench_controller import ResourceController',
+        'from core.http.middleware.middleware import StartSession, VerifyCsrfToken, Authenticate, ThrottleRequests',
+        '',
+        'def register(router):',
+        '    api = router.group("/api").middleware([StartSession(), VerifyCsrfToken()])',
+    ]
+    for index in range(count // 5):
+        lines += [
+            f'    group = api.group("/resource{index}").middleware([Authenticate(), ThrottleRequests()])',
+            '    controller = ResourceController()',
+            '    group.get("", controller.index)',
+            '    group.post("", controller.store)',
+            '    group.get("/{id}", controller.show)',
+            '    group.get("/{id}/children", controller.index)',
+            '    group.get("/{id}/children/{child}", controller.show)',
+        ]
+    lines.append('    return router')
+    (directory / 'bench_controller.py').write_text(textwrap.dedent(CONTROLLER))
+    (directory / 'bench_routes.py').write_text('\n'.join(lines) + '\n')
+
+def _boot(directory: Path, cache: Path, mode: str) -> float:
+    code = BOOT.format(root=str(PROJECT_ROOT), app=str(directory), mode=mode, cache=str(cache))
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return float(output.stdout.strip())
+
+def run(count: int = 500, runs: int = 15):
+    directory = Path(tempfile.mkdtemp())
+    _write_app(directory, count)
+    sys.path.insert(0, str(directory))
+
+    from bench_routes import register
+    cache = cache_routes(register(Router()), directory / 'routes.pickle')
+
+    for mode in ('route files', 'route cache'):
+        times = [_boot(directory, cache, mode) for _ in range(runs)]
+        print(f"{mode:<12} median {statistics.median(times):7.2f} ms  min {min(times):7.2f} ms")
+
+if __name__ == '__main__':
+    run(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,9 @@
+"""
+ASGI entry point
+
+    uvicorn bootstrap.asgi:application --workers 4
+"""
+from core.config.loader import env
+from core.http.asgi import ASGIApplication
+
+application = ASGIApplication(max_body_size=env('SERVER_MAX_BODY_SIZE', 10 * 1024 * 1024))
@@ -20,6 +20,29 @@ def config():
             'host': env('SERVER_HOST', '127.0.0.1'),
             'port': env('SERVER_PORT', 8000),
             'workers': env('SERVER_WORKERS', 4),
+            'threads': env('SERVER_THREADS', 4),
+            'max_requests': env('SERVER_MAX_REQUESTS', 0),
+            'mode': env('SERVER_MODE', 'threaded'),
+            'max_connections': env('SERVER_MAX_CONNECTIONS', 1024),
+            'backlog': env('SERVER_BACKLOG', 128),
+            'queue_size': env('SERVER_QUEUE_SIZE', 64),
+            'keep_alive_timeout': env('SERVER_KEEP_ALIVE_TIMEOUT', 5.0),
+            'max_body_size': env('SERVER_MAX_BODY_SIZE', 10485760),
+            'boot_budget': env('BOOT_BUDGET_MS', 0.0),
+        },
+
+        'compression': {
+            'level': env('COMPRESSION_LEVEL', 6),
+            'min_size': env('COMPRESSION_MIN_SIZE', 1024),
+        },
+        'storage': {
+            'io_threads': env('FILESYSTEM_IO_THREADS', 4),
+            'disk': env('STORAGE_DISK', 'local'),
+            'path': env('STORAGE_PATH', 'storage/app'),
+        },
+        'uploads': {
+            'spool_size': env('UPLOAD_SPOOL_SIZE', 1048576),
+            'tmp_path': env('UPLOAD_TMP_PATH', 'storage/app/tmp'),
         },
         
         'database': {
@@ -42,6 +42,11 @@ def config():
             },
         },
         
+        'limiter': {
+            'driver': env('RATE_LIMITER_DRIVER', 'memory'),
+            'path': env('RATE_LIMITER_PATH', 'storage/framework/cache/rate_limiter.sqlite'),
+        },
+        
         'prefix': env('CACHE_PREFIX', 'pylevel_'),
         'ttl': env('CACHE_TTL', 3600),  # 1 hour
         'tags': env('CACHE_TAGS', True),
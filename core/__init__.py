@@ -1,9 +1,23 @@
 """
 Core package for database, HTTP, and other foundational components
+
+The exports below are imported on first access, so importing any core
+module (the console kernel, the config loader) does not also load the
+ORM, its database drivers and the HTTP stack.
 """
+import importlib
+
+_exports = {
+    'Model': 'core.database',
+    'Controller': 'core.http',
+    'Request': 'core.http',
+    'Response': 'core.http',
+}
 
-from .database import Model
-from .http import Controller, Request, Response
+def __getattr__(name):
+    if name in _exports:
+        return getattr(importlib.import_module(_exports[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     'Model',
@@ -1,8 +1,15 @@
 from typing import Any, Dict, List, Optional, Callable
 from abc import ABC, abstractmethod
+from pathlib import Path
+import hashlib
+import os
+import pickle
+import tempfile
 import time
 import json
 import uuid
+from core.config.loader import env
+from core.foundation.service_provider import ServiceProvider
 
 class Cache(ABC):
     def __init__(self):
@@ -63,6 +70,79 @@ class Cache(ABC):
             self._store[key]['expires'] > time.time()
         )
         
+class FileCache(Cache):
+    """
+    Cache store keeping each item in its own file, so every worker process
+    on the host shares it. Items are pickled and replaced atomically.
+    """
+    def __init__(self, path: Optional[str] = None):
+        super().__init__()
+        base_path = Path(__file__).parent.parent.parent
+        self.path = base_path / (path or 'storage/framework/cache')
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get an item from the cache"""
+        try:
+            with open(self._file(key), 'rb') as f:
+                item = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return default
+        if item['expires'] is None or item['expires'] > time.time():
+            return item['value']
+        self.forget(key)
+        return default
+
+    def put(self, key: str, value: Any, ttl: Optional[int] = None):
+        """Store an item in the cache"""
+        item = {'value': value, 'expires': time.time() + ttl if ttl is not None else None}
+        self.path.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.path), prefix='.cache')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(item, f, pickle.HIGHEST_PROTOCOL)
+        # mkstemp creates the file 0600; every worker sharing the store must read it
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, self._file(key))
+
+    def add(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """Store an item in the cache if it doesn't exist"""
+        if not self.has(key):
+            self.put(key, value, ttl)
+            return True
+        return False
+
+    def forget(self, key: str) -> bool:
+        """Remove an item from the cache"""
+        try:
+            os.unlink(self._file(key))
+            return True
+        except OSError:
+            return False
+
+    def flush(self):
+        """Remove all items from the cache"""
+        for file in self.path.glob('*.cache'):
+            try:
+                file.unlink()
+            except OSError:
+                pass
+
+    def has(self, key: str) -> bool:
+        """Determine if an item exists in the cache"""
+        missing = object()
+        return self.get(key, missing) is not missing
+
+    def _file(self, key: str) -> Path:
+        return self.path / (hashlib.sha1(key.encode('utf-8')).hexdigest() + '.cache')
+
+def make_store(driver: Optional[str] = None) -> Cache:
+    """Create the cache store configured by CACHE_DRIVER"""
+    driver = driver or env('CACHE_DRIVER', 'file')
+    if driver == 'file':
+        return FileCache(env('CACHE_FILE_PATH') or None)
+    if driver in ('memory', 'array'):
+        return Cache()
+    raise ValueError(f"Unsupported cache driver: {driver}")
+
 class CacheServiceProvider(ServiceProvider):
     def _register(self):
         """Register bindings in the container"""
@@ -1,13 +1,27 @@
 """
 Configuration loader
+
+`config:cache` resolves every config file once and pickles the tree to
+bootstrap/cache/config.pickle. While that file is fresh, load_config()
+loads it instead of compiling and executing the config files. Fresh means
+the config files are the ones it was built from (same names, sizes and
+mtimes) and every environment variable the files read still has the value
+it had, so editing .env or exporting a variable falls back to the files.
 """
 import os
 import importlib
+import pickle
 import sys
+import tempfile
 from typing import Any, Dict, Optional, Union
 from pathlib import Path
 from dotenv import load_dotenv
 
+CACHE_VERSION = 1
+
+# Raw values of the variables read through env() while config files execute
+_env_reads: Optional[Dict[str, Optional[str]]] = None
+
 def _convert_value(value: str, default: Any = None) -> Any:
     """
     Convert string value to appropriate type based on default value
@@ -42,6 +56,8 @@ def env(key: str, default: Any = None) -> Any:
     Get an environment variable with type conversion
     """
     value = os.getenv(key)
+    if _env_reads is not None:
+        _env_reads[key] = value
     if value is None:
         return default
     if value == '':
@@ -72,6 +88,7 @@ class ConfigLoader:
             self._cache = {}
             self._env_loaded = False
             self._config_path = None
+            self._env_reads = {}
             self._initialized = True
         
     def load_environment(self, env_file: Optional[str] = None) -> None:
@@ -113,9 +130,10 @@ class ConfigLoader:
         
         self._env_loaded = True
         
-    def load_config(self, config_path: str = 'config') -> None:
+    def load_config(self, config_path: str = 'config', use_cache: bool = True) -> None:
         """
-        Load all configuration files from the config directory
+        Load all configuration files from the config directory, or the
+        config cache when it is fresh
         """
         self._config_path = config_path
         config_dir = Path(config_path)
@@ -123,6 +141,9 @@ class ConfigLoader:
         if not config_dir.exists():
             raise FileNotFoundError(f"Config directory not found: {config_path}")
             
+        if use_cache and self.load_cached(config_dir):
+            return
+            
         # Add config directory parent to Python path if it's not already there
         config_dir_str = str(config_dir.parent)
         if config_dir_str not in sys.path:
@@ -131,6 +152,17 @@ class ConfigLoader:
         # Clear existing configuration
         self.clear()
         
+        global _env_reads
+        _env_reads = {}
+        try:
+            self._execute_config_files(config_dir)
+        finally:
+            self._env_reads, _env_reads = _env_reads, None
+            
+    def _execute_config_files(self, config_dir: Path) -> None:
+        """
+        Compile and execute each config file, storing what its config() returns
+        """
         for config_file in config_dir.glob('*.py'):
             if config_file.stem == '__init__':
                 continue
@@ -153,6 +185,61 @@ class ConfigLoader:
                 print(f"Warning: Could not load {config_file}: {e}")
                 continue
                 
+    def cache(self, config_path: str = 'config', path: Optional[Union[str, Path]] = None) -> Path:
+        """
+        Resolve the configuration files and write the result to the config cache
+        """
+        config_dir = Path(config_path)
+        path = Path(path) if path else cached_config_path(config_dir.resolve().parent)
+        self.load_config(config_path, use_cache=False)
+        try:
+            payload = pickle.dumps({
+                'version': CACHE_VERSION,
+                'config_path': str(config_dir.resolve()),
+                'sources': _fingerprint(config_dir),
+                'env': self._env_reads,
+                'config': self._config,
+            }, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            raise ValueError(f"Unable to cache configuration: {e}. Config values must be picklable.") from e
+            
+        # Write atomically so a booting worker never reads a partial file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix='.config')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        # mkstemp creates the file 0600; workers may run as another user than the deploy step
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+        return path
+        
+    def load_cached(self, config_path: str = 'config', path: Optional[Union[str, Path]] = None) -> bool:
+        """
+        Load the config cache if it is fresh; returns False when it is
+        missing or stale, leaving the configuration untouched
+        """
+        config_dir = Path(config_path).resolve()
+        path = Path(path) if path else cached_config_path(config_dir.parent)
+        try:
+            with open(path, 'rb') as f:
+                cached = pickle.load(f)
+        except (FileNotFoundError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return False
+            
+        if (
+            not isinstance(cached, dict)
+            or cached.get('version') != CACHE_VERSION
+            or cached['config_path'] != str(config_dir)
+            or any(os.getenv(key) != value for key, value in cached['env'].items())
+            or _fingerprint(config_dir) != cached['sources']
+        ):
+            return False
+            
+        self.clear()
+        self._config.update(cached['config'])
+        self._env_reads = cached['env']
+        return True
+        
     def get(self, key: str, default: Any = None) -> Any:
         """
         Get a configuration value using dot notation
@@ -214,6 +301,35 @@ class ConfigLoader:
         if self._config_path:
             self.load_config(self._config_path)
 
+def cached_config_path(base_path: Optional[Union[str, Path]] = None) -> Path:
+    """
+    Get the path of the config cache
+    """
+    base_path = Path(base_path) if base_path else Path(__file__).parent.parent.parent
+    return base_path / 'bootstrap' / 'cache' / 'config.pickle'
+    
+def clear_cached_config(path: Union[str, Path]) -> bool:
+    """
+    Remove the config cache file
+    """
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+        
+def _fingerprint(config_dir: Path) -> Dict[str, tuple]:
+    """
+    Name, size and mtime of each config file, to tell when the cache is stale
+    """
+    sources = {}
+    with os.scandir(config_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith('.py') and entry.name != '__init__.py':
+                stat = entry.stat()
+                sources[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return sources
+
 # Create a global config instance
 config = ConfigLoader()
 
@@ -5,7 +5,7 @@ class MakeRequestCommand(Command):
     """
     Create a new form request class
     """
-    name = "make:request"
+    signature = "make:request"
     description = "Create a new form request class"
 
     def handle(self):
@@ -1,7 +1,34 @@
-from typing import Dict, Type, List
+from typing import Dict, Type, List, Optional, Union
 from abc import ABC, abstractmethod
+from pathlib import Path
 import sys
-from core.console.commands.make_request import MakeRequestCommand
+from core.console.manifest import command_manifest, command_manifest_path, describe_command, resolve_command
+
+# Dotted paths of the built-in commands; a run imports only the one it invokes
+commands = [
+    'core.console.commands.command.MakeControllerCommand',
+    'core.console.commands.command.MakeModelCommand',
+    'core.console.commands.command.MakeMiddlewareCommand',
+    'core.console.commands.command.MakeProviderCommand',
+    'core.console.commands.command.MakeCommandCommand',
+    'core.console.commands.command.MakeMigrationCommand',
+    'core.console.commands.make_request.MakeRequestCommand',
+    'core.console.commands.command.MigrateCommand',
+    'core.console.commands.command.MigrateRollbackCommand',
+    'core.console.commands.command.MigrateResetCommand',
+    'core.console.commands.command.MigrateRefreshCommand',
+    'core.console.commands.command.MigrateStatusCommand',
+    'core.console.commands.command.DbSeedCommand',
+    'core.console.commands.command.CacheClearCommand',
+    'core.console.commands.command.QueueWorkCommand',
+    'core.console.commands.command.QueueListenCommand',
+    'core.console.commands.command.QueueRestartCommand',
+    'core.console.commands.command.RouteListCommand',
+    'app.Console.commands.serve_command.ServeCommand',
+    'core.console.commands.command.WatchCommand',
+    'core.console.commands.command.TinkerCommand',
+    'core.console.commands.command.HelpCommand',
+]
 
 class Command(ABC):
     @property
@@ -22,32 +49,36 @@ class Command(ABC):
         pass
 
 class ConsoleKernel:
-    def __init__(self):
+    def __init__(self, manifest_path: Optional[Union[str, Path]] = None):
         self._commands: Dict[str, Type[Command]] = {}
+        # Signature -> dotted class path and description of commands not imported yet
+        self._lazy_commands: Dict[str, Dict[str, str]] = {}
+        self.manifest_path = manifest_path or command_manifest_path()
         self._register_default_commands()
         
     def _register_default_commands(self):
-        """Register default commands"""
-        self.register(MakeRequestCommand)
+        """Register default commands from the manifest, without importing them"""
+        self._lazy_commands.update(command_manifest(commands, self.manifest_path)['commands'])
         
     def register(self, command_class: Type[Command]):
         """Register a command"""
-        command = command_class()
-        self._commands[command.signature] = command_class
+        signature, _ = describe_command(command_class)
+        self._commands[signature] = command_class
+        self._lazy_commands.pop(signature, None)
         
     def run(self, args: List[str]):
         """Run the command"""
-        if not args:
+        if not args or args == ['help']:
             self._show_help()
             return
             
         command_name = args[0]
-        if command_name not in self._commands:
+        command_class = self._resolve(command_name)
+        if command_class is None:
             print(f"Command '{command_name}' not found.")
             self._show_help()
             return
             
-        command_class = self._commands[command_name]
         command = command_class()
         
         try:
@@ -56,13 +87,22 @@ class ConsoleKernel:
             print(f"Error: {str(e)}")
             sys.exit(1)
             
+    def _resolve(self, signature: str) -> Optional[Type[Command]]:
+        """Get a command class, importing it if only the manifest knows it"""
+        if signature not in self._commands and signature in self._lazy_commands:
+            self._commands[signature] = resolve_command(self._lazy_commands.pop(signature)['class'])
+        return self._commands.get(signature)
+            
     def _show_help(self):
-        """Show available commands"""
+        """Show available commands, from the manifest and the registered classes"""
         print("Available commands:")
+        for signature, entry in self._lazy_commands.items():
+            print(f"  {signature:<30} {entry['description']}")
         for signature, command_class in self._commands.items():
-            command = command_class()
-            print(f"  {signature:<30} {command.description}")
+            print(f"  {signature:<30} {describe_command(command_class)[1]}")
             
     def get_commands(self) -> Dict[str, Type[Command]]:
-        """Get all registered commands"""
+        """Get all registered commands, importing the ones only the manifest knows"""
+        for signature in list(self._lazy_commands):
+            self._resolve(signature)
         return self._commands 
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""
+Compiled console command manifest
+
+Listing the commands means importing every command module and reading
+each command's signature and description. That is done once and written
+to bootstrap/cache/commands.json; later runs read the manifest, so help
+imports no command at all and running a command imports only its own
+module. The manifest is compiled again when the command list or one of
+the command modules changes.
+"""
+import importlib
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+MANIFEST_VERSION = 1
+
+def command_manifest_path(base_path: Optional[Union[str, Path]] = None) -> Path:
+    """Get the path of the compiled command manifest"""
+    base_path = Path(base_path) if base_path else Path(__file__).parent.parent.parent
+    return base_path / 'bootstrap' / 'cache' / 'commands.json'
+
+def resolve_command(name: str) -> type:
+    """Import a command class from its dotted path"""
+    module, _, attribute = name.rpartition('.')
+    return getattr(importlib.import_module(module), attribute)
+
+def describe_command(command_class: type) -> Tuple[str, str]:
+    """Read a command's signature and description without building its argument parser"""
+    # Skipping __init__ leaves the parser unbuilt; both are constants
+    command = command_class.__new__(command_class)
+    return command.signature, command.description
+
+def command_manifest(commands: List[str], path: Union[str, Path]) -> Dict[str, Any]:
+    """Load the command manifest, compiling it first when it is missing or stale"""
+    return load_command_manifest(commands, path) or compile_command_manifest(commands, path)
+
+def load_command_manifest(commands: List[str], path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    """Load the command manifest, or None when it is missing or stale"""
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('classes') != list(commands):
+        return None
+    if any(_fingerprint(source) != fingerprint for source, fingerprint in manifest['sources'].items()):
+        return None
+    return manifest
+
+def compile_command_manifest(commands: List[str], path: Union[str, Path]) -> Dict[str, Any]:
+    """Import every command, record its signature and description and write the manifest"""
+    manifest = {'version': MANIFEST_VERSION, 'classes': list(commands), 'sources': {}, 'commands': {}}
+    for name in commands:
+        command_class = resolve_command(name)
+        source = getattr(sys.modules[command_class.__module__], '__file__', None)
+        if source:
+            manifest['sources'][source] = _fingerprint(source)
+        signature, description = describe_command(command_class)
+        # Later commands replace earlier ones with the same signature
+        manifest['commands'][signature] = {'class': name, 'description': description}
+
+    # Write atomically so a concurrent run never reads a partial file; a
+    # read-only deployment simply compiles the manifest on every run
+    path = Path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix='.commands')
+    except OSError:
+        return manifest
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        # mkstemp creates the file 0600; workers may run as another user than the deploy step
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+    return manifest
+
+def _fingerprint(source: str) -> Optional[List[int]]:
+    """Size and mtime of a command module, to tell when the manifest is stale"""
+    try:
+        stat = os.stat(source)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
@@ -1,7 +1,8 @@
 import sqlite3
 import mysql.connector
 import psycopg2
-from typing import List, Tuple, Any, Dict
+import uuid
+from typing import Iterator, List, Tuple, Any, Dict
 from config.database import config
 
 class Connection:
@@ -90,6 +91,30 @@ class Connection:
         finally:
             query_pointer.close()
         
+    def cursor(self, query: str, params: tuple = None, size: int = 1000) -> Iterator[Any]:
+        """Execute a query and yield its rows, fetching size rows at a time"""
+        if not self.connection:
+            raise Exception("Database connection not set")
+
+        if self.driver == 'pgsql':
+            # Named cursors are server-side, so the result is not loaded into memory up front
+            query_pointer = self.connection.cursor(name=f"cursor_{uuid.uuid4().hex}")
+            query_pointer.itersize = size
+        else:
+            query_pointer = self.connection.cursor()
+        try:
+            if params:
+                query_pointer.execute(query, params)
+            else:
+                query_pointer.execute(query)
+            while True:
+                rows = query_pointer.fetchmany(size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            query_pointer.close()
+
     def close(self):
         """Close the connection"""
         if self.query_pointer:
@@ -1,4 +1,4 @@
-from typing import Any, Dict, List, Optional, Type, TypeVar
+from typing import Any, Dict, Iterator, List, Optional, Type, TypeVar
 from datetime import datetime
 import json
 from core.database.connection import Connection
@@ -79,8 +79,7 @@ class Model:
         """Create a model instance from a database row"""
         instance = cls()
         instance._exists = True
-        for key, value in zip(row.keys(), row):
-            setattr(instance, key, value)
+        instance._attributes.update(zip(row.keys(), row))
         return instance
 
     @classmethod
@@ -90,6 +89,13 @@ class Model:
         results = cls._execute_query(query, params)
         return [cls._create_instance(row) for row in results]
         
+    @classmethod
+    def cursor(cls: Type[T], conditions: str = None, params: tuple = None, chunk_size: int = 1000) -> Iterator[T]:
+        """Iterate over records lazily, holding at most chunk_size rows in memory"""
+        query, params = cls._build_select_query(conditions, params)
+        for row in cls._get_connection().cursor(query, params, chunk_size):
+            yield cls._create_instance(row)
+
     @classmethod
     def find(cls: Type[T], id: Any) -> Optional[T]:
         """Find a model by its primary key"""
@@ -170,6 +176,17 @@ class Model:
                 attributes[key] = self._cast_attribute(key, value)
         return attributes
         
+    def _json_attributes(self) -> Dict[str, Any]:
+        """Attributes for JSON encoders: like to_dict(), but only cast columns are converted"""
+        if not self._hidden and not self._casts:
+            return self._attributes
+        hidden, casts = self._hidden, self._casts
+        return {
+            key: self._cast_attribute(key, value) if key in casts else value
+            for key, value in self._attributes.items()
+            if key not in hidden
+        }
+
     def to_json(self) -> str:
         """Convert the model to JSON"""
         return json.dumps(self.to_dict())
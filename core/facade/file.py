@@ -22,36 +22,96 @@ class File(Facade):
         return file_get_helper(path)
         
     @staticmethod
-    def put(path: str, contents: str):
-        """Write contents to a file."""
+    def put(path: str, contents):
+        """Write contents to a file atomically."""
         return file_put_helper(path, contents)
         
+    @staticmethod
+    def get_bytes(path: str):
+        """Get the contents of a file as bytes."""
+        from core.filesystem.filesystem import filesystem
+        return filesystem.get_bytes(path)
+        
+    @staticmethod
+    def lines(path: str, encoding: str = 'utf-8'):
+        """Iterate over the lines of a file."""
+        from core.filesystem.filesystem import filesystem
+        return filesystem.lines(path, encoding)
+        
+    @staticmethod
+    def chunks(path: str, size: int = 64 * 1024):
+        """Iterate over a file in chunks."""
+        from core.filesystem.filesystem import filesystem
+        return filesystem.chunks(path, size)
+        
+    @staticmethod
+    def map(path: str):
+        """Map a file into memory, read-only."""
+        from core.filesystem.filesystem import filesystem
+        return filesystem.map(path)
+        
+    @staticmethod
+    def hash(path: str, algorithm: str = 'sha256'):
+        """Get the hex digest of a file."""
+        from core.filesystem.filesystem import filesystem
+        return filesystem.hash(path, algorithm)
+        
+    @staticmethod
+    def append(path: str, contents):
+        """Append contents to a file."""
+        from core.filesystem.filesystem import filesystem
+        return filesystem.append(path, contents)
+        
     @staticmethod
     def delete(path: str):
         """Delete a file."""
-        from core.filesystem import filesystem
+        from core.filesystem.filesystem import filesystem
         return filesystem.delete(path)
         
     @staticmethod
     def copy(source: str, destination: str):
         """Copy a file."""
-        from core.filesystem import filesystem
+        from core.filesystem.filesystem import filesystem
         return filesystem.copy(source, destination)
         
     @staticmethod
     def move(source: str, destination: str):
         """Move a file."""
-        from core.filesystem import filesystem
+        from core.filesystem.filesystem import filesystem
         return filesystem.move(source, destination)
         
     @staticmethod
     def size(path: str):
         """Get the size of a file."""
-        from core.filesystem import filesystem
+        from core.filesystem.filesystem import filesystem
         return filesystem.size(path)
         
     @staticmethod
     def last_modified(path: str):
         """Get the last modified time of a file."""
-        from core.filesystem import filesystem
-        return filesystem.last_modified(path) 
\ No newline at end of file
+        from core.filesystem.filesystem import filesystem
+        return filesystem.last_modified(path)
+        
+    @staticmethod
+    async def get_async(path: str):
+        """Get the contents of a file without blocking the event loop."""
+        from core.filesystem.filesystem import filesystem
+        return await filesystem.get_async(path)
+        
+    @staticmethod
+    async def put_async(path: str, contents):
+        """Write contents to a file atomically without blocking the event loop."""
+        from core.filesystem.filesystem import filesystem
+        return await filesystem.put_async(path, contents)
+        
+    @staticmethod
+    def lines_async(path: str, encoding: str = 'utf-8'):
+        """Iterate over the lines of a file without blocking the event loop."""
+        from core.filesystem.filesystem import filesystem
+        return filesystem.lines_async(path, encoding)
+        
+    @staticmethod
+    def chunks_async(path: str, size: int = 64 * 1024):
+        """Iterate over a file in chunks without blocking the event loop."""
+        from core.filesystem.filesystem import filesystem
+        return filesystem.chunks_async(path, size)
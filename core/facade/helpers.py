@@ -199,23 +199,23 @@ def db_table(table: str) -> Any:
 # File helpers
 def file(path: str) -> Any:
     """Get a file instance."""
-    from core.filesystem import file as file_manager
+    from core.filesystem.filesystem import filesystem as file_manager
     return file_manager.get(path)
 
 def file_exists(path: str) -> bool:
     """Check if a file exists."""
-    from core.filesystem import file as file_manager
+    from core.filesystem.filesystem import filesystem as file_manager
     return file_manager.exists(path)
 
 def file_get(path: str) -> str:
     """Get the contents of a file."""
-    from core.filesystem import file as file_manager
-    return file_manager.get_contents(path)
+    from core.filesystem.filesystem import filesystem as file_manager
+    return file_manager.get(path)
 
-def file_put(path: str, contents: str) -> bool:
-    """Write contents to a file."""
-    from core.filesystem import file as file_manager
-    return file_manager.put_contents(path, contents)
+def file_put(path: str, contents: Any) -> bool:
+    """Write contents to a file atomically."""
+    from core.filesystem.filesystem import filesystem as file_manager
+    return file_manager.put(path, contents)
 
 # Hash helpers
 def hash_make(value: str) -> str:
@@ -260,12 +260,12 @@ def storage_disk(disk: str = None) -> Any:
     from core.filesystem import storage as storage_manager
     return storage_manager.disk(disk)
 
-def storage_put(path: str, contents: str, disk: str = None) -> bool:
+def storage_put(path: str, contents: Any, disk: str = None) -> bool:
     """Store a file on the disk."""
     from core.filesystem import storage as storage_manager
     return storage_manager.disk(disk).put(path, contents)
 
-def storage_get(path: str, disk: str = None) -> str:
+def storage_get(path: str, disk: str = None) -> bytes:
     """Get the contents of a file from the disk."""
     from core.filesystem import storage as storage_manager
     return storage_manager.disk(disk).get(path)
@@ -295,10 +295,10 @@ def view_exists(name: str) -> bool:
 # Asset helpers
 def asset(path: str) -> str:
     """Get the URL for an asset."""
-    from core.filesystem import asset as asset_manager
+    from core.filesystem.asset import asset as asset_manager
     return asset_manager.url(path)
 
 def secure_asset(path: str) -> str:
     """Get the secure URL for an asset."""
-    from core.filesystem import asset as asset_manager
+    from core.filesystem.asset import asset as asset_manager
     return asset_manager.secure_url(path) 
\ No newline at end of file
@@ -1,16 +1,50 @@
-from typing import Optional
-from core.facade.config import Config
-from core.facade.env import Env
+"""
+Asset URLs and the asset build pipeline
+
+`asset:build` copies every file under public/ to public/build/ with its
+content hash in the name, writes precompressed .gz (and optionally .br)
+siblings and records the mapping in public/build/manifest.json.
+asset() and secure_asset() resolve paths through that manifest, so the
+hashed URLs can be cached forever by browsers and proxies.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Union
+from core.config.loader import env
+from core.http import is_compressible_type
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BUILD_DIRECTORY = 'build'
+MANIFEST_NAME = 'manifest.json'
+
+# Variants are only kept when they save at least this much
+_MIN_SAVING = 0.9
+_MIN_COMPRESS_SIZE = 256
 
 class AssetManager:
-    def __init__(self):
-        self.asset_url = Config.get('app.asset_url', '/static')
-        self.secure = Env.get('HTTPS', False)
+    def __init__(self, public_path: Optional[Union[str, Path]] = None):
+        self.asset_url = env('ASSET_URL', '/static')
+        self.secure = env('HTTPS', False)
+        self.public_path = Path(public_path) if public_path else Path(__file__).parent.parent.parent / 'public'
+        self._manifest: Dict[str, str] = {}
+        self._manifest_mtime: Optional[float] = None
+        self._lock = threading.Lock()
 
     def url(self, path: str) -> str:
         """Get the URL for an asset."""
         # Clean the path
         path = path.lstrip('/')
+        path = self.manifest().get(path, path)
         base = self.asset_url.rstrip('/')
         return f"{base}/{path}"
 
@@ -23,5 +57,87 @@ class AssetManager:
             return url.replace('http://', 'https://')
         return url
 
+    def manifest(self) -> Dict[str, str]:
+        """Get the build manifest, reloading it when asset:build rewrites it."""
+        path = self.public_path / BUILD_DIRECTORY / MANIFEST_NAME
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return {}
+        if mtime != self._manifest_mtime:
+            with self._lock:
+                if mtime != self._manifest_mtime:
+                    self._manifest = json.loads(path.read_text())
+                    self._manifest_mtime = mtime
+        return self._manifest
+
+def is_compressible(path: Union[str, Path]) -> bool:
+    """Determine if a file's type benefits from compression"""
+    return is_compressible_type(mimetypes.guess_type(str(path))[0])
+
+def build_assets(public_path: Union[str, Path], use_brotli: bool = False) -> Dict[str, str]:
+    """
+    Fingerprint every file under public_path into the build directory.
+
+    Returns the manifest mapping source paths (relative to public_path) to
+    their hashed copies. Outputs of previous builds that are no longer
+    referenced are removed.
+    """
+    if use_brotli and brotli is None:
+        raise RuntimeError("Brotli compression requires the 'brotli' package")
+
+    public_path = Path(public_path)
+    build_path = public_path / BUILD_DIRECTORY
+    manifest: Dict[str, str] = {}
+    written = set()
+
+    for source in sorted(public_path.rglob('*')):
+        relative = source.relative_to(public_path)
+        if not source.is_file() or relative.parts[0] == BUILD_DIRECTORY or source.suffix in ('.gz', '.br'):
+            continue
+        if '__pycache__' in relative.parts or any(part.startswith('.') for part in relative.parts):
+            continue
+
+        content = source.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()[:16]
+        target_relative = relative.with_name(f"{relative.stem}.{digest}{relative.suffix}")
+        target = build_path / target_relative
+        if not target.exists():
+            _write_atomic(target, content)
+        written.add(target)
+
+        if len(content) >= _MIN_COMPRESS_SIZE and is_compressible(source):
+            variants = [('.gz', lambda data: gzip.compress(data, 9, mtime=0))]
+            if use_brotli:
+                variants.append(('.br', lambda data: brotli.compress(data, quality=11)))
+            for suffix, compress in variants:
+                variant = target.with_name(target.name + suffix)
+                if not variant.exists():
+                    compressed = compress(content)
+                    if len(compressed) > len(content) * _MIN_SAVING:
+                        continue
+                    _write_atomic(variant, compressed)
+                written.add(variant)
+
+        manifest[relative.as_posix()] = (Path(BUILD_DIRECTORY) / target_relative).as_posix()
+
+    manifest_path = build_path / MANIFEST_NAME
+    _write_atomic(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode())
+    written.add(manifest_path)
+
+    for stale in build_path.rglob('*'):
+        if stale.is_file() and stale not in written:
+            stale.unlink()
+    return manifest
+
+def _write_atomic(path: Path, content: bytes) -> None:
+    """Write a file so the server never serves it half written"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix='.asset')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(content)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+
 # Create a singleton instance
-asset = AssetManager() 
\ No newline at end of file
+asset = AssetManager()
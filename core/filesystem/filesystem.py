@@ -0,0 +1,286 @@
+"""
+Local filesystem service behind the File facade
+
+Large files are never read into one string: lines() and chunks() stream
+them, map() exposes a file as a read-only memory map, and hash() and
+find() work on that map without copying it into Python. put() and copy()
+are atomic, so readers see the old or the new file and never half of
+one. Every blocking operation has an *_async variant that runs on a
+dedicated I/O thread pool, so coroutine actions do not stall the event
+loop or share the loop's default executor.
+"""
+import asyncio
+import functools
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, List, Optional, Union
+from core.config.loader import env
+
+CHUNK_SIZE = 64 * 1024
+
+PathLike = Union[str, Path]
+
+class Filesystem:
+    def __init__(self, io_threads: Optional[int] = None):
+        self.io_threads = io_threads or env('FILESYSTEM_IO_THREADS', 4)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def exists(self, path: PathLike) -> bool:
+        """Determine if a file or directory exists"""
+        return os.path.exists(path)
+
+    def is_file(self, path: PathLike) -> bool:
+        """Determine if path is a regular file"""
+        return os.path.isfile(path)
+
+    def is_directory(self, path: PathLike) -> bool:
+        """Determine if path is a directory"""
+        return os.path.isdir(path)
+
+    def get(self, path: PathLike, encoding: str = 'utf-8') -> str:
+        """Get the contents of a text file; prefer lines() or chunks() for large files"""
+        with open(path, 'r', encoding=encoding) as f:
+            return f.read()
+
+    def get_bytes(self, path: PathLike) -> bytes:
+        """Get the contents of a file as bytes"""
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def lines(self, path: PathLike, encoding: str = 'utf-8') -> Iterator[str]:
+        """Iterate over the lines of a text file, without their line endings"""
+        with open(path, 'r', encoding=encoding, newline=None) as f:
+            for line in f:
+                yield line.rstrip('\n')
+
+    def chunks(self, path: PathLike, size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Iterate over a file in chunks of up to size bytes"""
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(size)
+                if not chunk:
+                    return
+                yield chunk
+
+    @contextmanager
+    def map(self, path: PathLike) -> Iterator[Union[mmap.mmap, bytes]]:
+        """
+        Map a file into memory, read-only.
+
+        Slicing, find() and hashing the map read straight from the page
+        cache, so a large file is never copied into a Python object. An
+        empty file, which cannot be mapped, is given as b''.
+        """
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b''
+                return
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield mapped
+            finally:
+                mapped.close()
+
+    def hash(self, path: PathLike, algorithm: str = 'sha256') -> str:
+        """Get the hex digest of a file, hashed from its memory map"""
+        with self.map(path) as mapped:
+            return hashlib.new(algorithm, mapped).hexdigest()
+
+    def find(self, path: PathLike, needle: bytes, start: int = 0) -> int:
+        """Get the offset of the first occurrence of needle in a file, or -1"""
+        with self.map(path) as mapped:
+            return mapped.find(needle, start)
+
+    def put(self, path: PathLike, contents: Union[str, bytes, Iterable[bytes]], encoding: str = 'utf-8') -> bool:
+        """
+        Write a file atomically: contents go to a temp file in the same
+        directory, which then replaces path. contents may be str, bytes or
+        an iterable of byte chunks.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(contents, str):
+            contents = (contents.encode(encoding),)
+        elif isinstance(contents, (bytes, bytearray, memoryview)):
+            contents = (contents,)
+        self._replace(path, lambda f: f.writelines(contents))
+        return True
+
+    def append(self, path: PathLike, contents: Union[str, bytes], encoding: str = 'utf-8') -> bool:
+        """Append to a file, creating it if needed"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'ab') as f:
+            f.write(contents.encode(encoding) if isinstance(contents, str) else contents)
+        return True
+
+    def delete(self, *paths: PathLike) -> bool:
+        """Delete files; returns False when any of them did not exist"""
+        deleted = True
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                deleted = False
+        return deleted
+
+    def copy(self, source: PathLike, destination: PathLike) -> bool:
+        """Copy a file atomically"""
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        with open(source, 'rb') as src:
+            self._replace(destination, lambda f: shutil.copyfileobj(src, f, CHUNK_SIZE))
+        shutil.copymode(source, destination)
+        return True
+
+    def move(self, source: PathLike, destination: PathLike) -> bool:
+        """Move a file, atomically when both paths are on the same filesystem"""
+        Path(destination).parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(source), str(destination))
+        return True
+
+    def size(self, path: PathLike) -> int:
+        """Get the size of a file in bytes"""
+        return os.path.getsize(path)
+
+    def last_modified(self, path: PathLike) -> float:
+        """Get the last modification time of a file, as a Unix timestamp"""
+        return os.path.getmtime(path)
+
+    def files(self, directory: PathLike, recursive: bool = False) -> List[Path]:
+        """List the files in a directory"""
+        directory = Path(directory)
+        entries = directory.rglob('*') if recursive else directory.iterdir()
+        return sorted(entry for entry in entries if entry.is_file())
+
+    def make_directory(self, path: PathLike) -> bool:
+        """Create a directory and its parents"""
+        Path(path).mkdir(parents=True, exist_ok=True)
+        return True
+
+    async def exists_async(self, path: PathLike) -> bool:
+        """exists() on the I/O thread pool"""
+        return await self.run_async(self.exists, path)
+
+    async def get_async(self, path: PathLike, encoding: str = 'utf-8') -> str:
+        """get() on the I/O thread pool"""
+        return await self.run_async(self.get, path, encoding)
+
+    async def get_bytes_async(self, path: PathLike) -> bytes:
+        """get_bytes() on the I/O thread pool"""
+        return await self.run_async(self.get_bytes, path)
+
+    async def hash_async(self, path: PathLike, algorithm: str = 'sha256') -> str:
+        """hash() on the I/O thread pool"""
+        return await self.run_async(self.hash, path, algorithm)
+
+    async def find_async(self, path: PathLike, needle: bytes, start: int = 0) -> int:
+        """find() on the I/O thread pool"""
+        return await self.run_async(self.find, path, needle, start)
+
+    async def put_async(self, path: PathLike, contents: Union[str, bytes, Iterable[bytes]], encoding: str = 'utf-8') -> bool:
+        """put() on the I/O thread pool"""
+        return await self.run_async(self.put, path, contents, encoding)
+
+    async def append_async(self, path: PathLike, contents: Union[str, bytes], encoding: str = 'utf-8') -> bool:
+        """append() on the I/O thread pool"""
+        return await self.run_async(self.append, path, contents, encoding)
+
+    async def delete_async(self, *paths: PathLike) -> bool:
+        """delete() on the I/O thread pool"""
+        return await self.run_async(self.delete, *paths)
+
+    async def copy_async(self, source: PathLike, destination: PathLike) -> bool:
+        """copy() on the I/O thread pool"""
+        return await self.run_async(self.copy, source, destination)
+
+    async def move_async(self, source: PathLike, destination: PathLike) -> bool:
+        """move() on the I/O thread pool"""
+        return await self.run_async(self.move, source, destination)
+
+    async def size_async(self, path: PathLike) -> int:
+        """size() on the I/O thread pool"""
+        return await self.run_async(self.size, path)
+
+    async def lines_async(self, path: PathLike, encoding: str = 'utf-8', batch: int = 256) -> AsyncIterator[str]:
+        """Iterate over the lines of a text file, reading batches of them on the I/O pool"""
+        lines = self.lines(path, encoding)
+        try:
+            while True:
+                block = await self.run_async(_take, lines, batch)
+                if not block:
+                    return
+                for line in block:
+                    yield line
+        finally:
+            await self.run_async(lines.close)
+
+    async def chunks_async(self, path: PathLike, size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Iterate over a file in chunks, each read on the I/O pool"""
+        chunks = self.chunks(path, size)
+        try:
+            while True:
+                chunk = await self.run_async(next, chunks, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            await self.run_async(chunks.close)
+
+    async def run_async(self, function: Callable, *args: Any) -> Any:
+        """Run a blocking function on the filesystem's I/O thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor(), functools.partial(function, *args))
+
+    def executor(self) -> ThreadPoolExecutor:
+        """Get the I/O thread pool, creating it again in a forked worker"""
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(self.io_threads, thread_name_prefix='file-io')
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def shutdown(self) -> None:
+        """Stop the I/O thread pool"""
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _replace(self, path: Path, write: Callable[[Any], Any]) -> None:
+        """Write through a temp file next to path, then rename it over path"""
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        fd, temp = tempfile.mkstemp(dir=str(path.parent), prefix=f'.{path.name}.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.chmod(temp, mode)
+            os.replace(temp, path)
+        except BaseException:
+            try:
+                os.unlink(temp)
+            except FileNotFoundError:
+                pass
+            raise
+
+def _take(iterator: Iterator[Any], count: int) -> List[Any]:
+    block = []
+    for item in iterator:
+        block.append(item)
+        if len(block) == count:
+            break
+    return block
+
+# Create a singleton instance
+filesystem = Filesystem()
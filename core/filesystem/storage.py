@@ -0,0 +1,326 @@
+"""
+Storage disks
+
+The local disk is content addressed: every distinct content is stored
+once, as a blob named by its SHA-256 under sharded directories
+(blobs/ab/cd/abcd...), and logical paths are rows in a SQLite index that
+point at blobs. Storing the same document under many paths keeps one
+copy; each blob counts the paths that reference it, and `storage:gc`
+removes the blobs nothing references any more. Reads and writes are
+streamed in chunks, so a file never has to fit in memory.
+"""
+import hashlib
+import os
+import posixpath
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from core.config.loader import env
+from core.http.upload import UploadedFile
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_ROOT = Path(__file__).parent.parent.parent / 'storage' / 'app'
+
+# Temp files of writes that never finished are removed by gc() after this many seconds
+_STALE_TEMP_AGE = 3600
+
+class ContentAddressedDisk:
+    """
+    Local disk storing each distinct content once, under its SHA-256.
+
+    put() streams the content into a temp file while hashing it, then
+    either renames it into place or, when the blob already exists, drops
+    it. The index is a WAL-mode SQLite database shared by every server
+    process; linking a path and collecting garbage both run in immediate
+    transactions, so gc() never removes a blob a concurrent put() is
+    about to reference.
+    """
+
+    def __init__(self, root: Optional[Union[str, Path]] = None, timeout: float = 5.0):
+        self.root = Path(root or env('STORAGE_PATH', None) or DEFAULT_ROOT)
+        self.blobs_path = self.root / 'blobs'
+        self.tmp_path = self.root / 'tmp'
+        self.index_path = self.root / 'index.sqlite'
+        self.timeout = timeout
+        self._local = threading.local()
+        self.blobs_path.mkdir(parents=True, exist_ok=True)
+        self.tmp_path.mkdir(parents=True, exist_ok=True)
+        self._connection()
+
+    def put(self, path: str, contents: Any) -> bool:
+        """
+        Store contents under path, replacing what was there.
+
+        contents may be bytes, str, a binary file object, an iterable of
+        byte chunks or an UploadedFile, whose hash is already known, so an
+        upload that is already stored is not written again.
+        """
+        path = _normalize(path)
+        if isinstance(contents, UploadedFile) and self._link(path, contents.hash, contents.size, None):
+            return True
+        if isinstance(contents, UploadedFile):
+            contents.file.seek(0)
+            contents = contents.file
+        temp, digest, size = self._write_temp(_chunks(contents))
+        self._link(path, digest, size, temp)
+        return True
+
+    def get(self, path: str) -> bytes:
+        """Get the contents of a file; prefer read_stream() for large ones"""
+        with self.open(path) as f:
+            return f.read()
+
+    def read_stream(self, path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Read a file in chunks"""
+        f = self.open(path)
+        try:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            f.close()
+
+    def open(self, path: str) -> BinaryIO:
+        """Open a file for reading"""
+        return open(self.path(path), 'rb')
+
+    def path(self, path: str) -> Path:
+        """Get the blob holding a file, e.g. to send it with sendfile()"""
+        return self._blob(self._entry(path)[0])
+
+    def exists(self, path: str) -> bool:
+        """Determine if a file exists"""
+        return self._find(_normalize(path)) is not None
+
+    def size(self, path: str) -> int:
+        """Get the size of a file in bytes"""
+        return self._entry(path)[1]
+
+    def hash(self, path: str) -> str:
+        """Get the SHA-256 of a file, as hex"""
+        return self._entry(path)[0]
+
+    def last_modified(self, path: str) -> float:
+        """Get the time a file was last stored, as a Unix timestamp"""
+        return self._entry(path)[2]
+
+    def files(self, directory: str = '') -> List[str]:
+        """List the files under a directory, recursively"""
+        prefix = _normalize(directory) + '/' if directory.strip('/') else ''
+        rows = self._connection().execute(
+            'SELECT path FROM files WHERE substr(path, 1, ?) = ? ORDER BY path', (len(prefix), prefix)
+        )
+        return [row[0] for row in rows]
+
+    def copy(self, source: str, destination: str) -> bool:
+        """Copy a file; only a new reference to its blob is written"""
+        digest, size, _ = self._entry(source)
+        return self._link(_normalize(destination), digest, size, None)
+
+    def move(self, source: str, destination: str) -> bool:
+        """Move a file"""
+        self.copy(source, destination)
+        self.delete(source)
+        return True
+
+    def delete(self, *paths: str) -> bool:
+        """Delete files; their blobs are removed by gc() once nothing references them"""
+        deleted = False
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for path in paths:
+                row = connection.execute('SELECT hash FROM files WHERE path = ?', (_normalize(path),)).fetchone()
+                if row is None:
+                    continue
+                connection.execute('DELETE FROM files WHERE path = ?', (_normalize(path),))
+                connection.execute('UPDATE blobs SET refs = refs - 1 WHERE hash = ?', (row[0],))
+                deleted = True
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return deleted
+
+    def gc(self) -> Tuple[int, int]:
+        """
+        Remove blobs no path references, blob files missing from the index
+        and stale temp files. Returns the number of blobs removed and the
+        bytes freed.
+        """
+        removed, freed = 0, 0
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for digest, size in connection.execute('SELECT hash, size FROM blobs WHERE refs <= 0').fetchall():
+                if self._unlink(self._blob(digest)):
+                    removed += 1
+                    freed += size
+            connection.execute('DELETE FROM blobs WHERE refs <= 0')
+
+            # Files left by a put() that died between placing its blob and committing
+            known = {row[0] for row in connection.execute('SELECT hash FROM blobs')}
+            for blob in self.blobs_path.glob('*/*/*'):
+                if blob.name not in known:
+                    size = blob.stat().st_size
+                    if self._unlink(blob):
+                        removed += 1
+                        freed += size
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+        stale = time.time() - _STALE_TEMP_AGE
+        for temp in self.tmp_path.glob('blob-*'):
+            try:
+                if temp.stat().st_mtime < stale:
+                    temp.unlink()
+            except OSError:
+                pass
+        return removed, freed
+
+    def __getstate__(self) -> Dict[str, object]:
+        return {'root': self.root, 'timeout': self.timeout}
+
+    def __setstate__(self, state: Dict[str, object]) -> None:
+        self.__init__(**state)
+
+    def _write_temp(self, chunks: Iterable[bytes]) -> Tuple[Path, str, int]:
+        """Stream chunks into a temp file, hashing them on the way"""
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp = tempfile.mkstemp(dir=str(self.tmp_path), prefix='blob-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            os.chmod(temp, 0o444)
+        except BaseException:
+            os.unlink(temp)
+            raise
+        return Path(temp), digest.hexdigest(), size
+
+    def _link(self, path: str, digest: str, size: int, temp: Optional[Path]) -> bool:
+        """
+        Point path at a blob, placing temp as the blob if it is missing.
+        Without a temp file, returns False when the blob does not exist.
+        """
+        blob = self._blob(digest)
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            if not blob.exists():
+                if temp is None:
+                    connection.execute('ROLLBACK')
+                    return False
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(temp, blob)
+                temp = None
+
+            row = connection.execute('SELECT hash FROM files WHERE path = ?', (path,)).fetchone()
+            connection.execute(
+                'INSERT INTO files (path, hash, size, modified) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(path) DO UPDATE SET hash = excluded.hash, size = excluded.size, '
+                'modified = excluded.modified',
+                (path, digest, size, time.time())
+            )
+            if row is None or row[0] != digest:
+                connection.execute(
+                    'INSERT INTO blobs (hash, size, refs) VALUES (?, ?, 1) '
+                    'ON CONFLICT(hash) DO UPDATE SET refs = refs + 1',
+                    (digest, size)
+                )
+                if row is not None:
+                    connection.execute('UPDATE blobs SET refs = refs - 1 WHERE hash = ?', (row[0],))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        finally:
+            if temp is not None:
+                # The same content was already stored
+                os.unlink(temp)
+        return True
+
+    def _entry(self, path: str) -> Tuple[str, int, float]:
+        entry = self._find(_normalize(path))
+        if entry is None:
+            raise FileNotFoundError(f"File not found on disk: {path}")
+        return entry
+
+    def _find(self, path: str) -> Optional[Tuple[str, int, float]]:
+        return self._connection().execute(
+            'SELECT hash, size, modified FROM files WHERE path = ?', (path,)
+        ).fetchone()
+
+    def _blob(self, digest: str) -> Path:
+        return self.blobs_path / digest[:2] / digest[2:4] / digest
+
+    def _unlink(self, blob: Path) -> bool:
+        try:
+            blob.unlink()
+        except FileNotFoundError:
+            return False
+        for directory in (blob.parent, blob.parent.parent):
+            try:
+                directory.rmdir()
+            except OSError:
+                break
+        return True
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the connection for this thread, reopening it after a fork"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        connection = sqlite3.connect(str(self.index_path), timeout=self.timeout, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'path TEXT PRIMARY KEY, hash TEXT NOT NULL, size INTEGER NOT NULL, modified REAL NOT NULL)'
+        )
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, size INTEGER NOT NULL, refs INTEGER NOT NULL)'
+        )
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+_disks: Dict[str, ContentAddressedDisk] = {}
+_disks_lock = threading.Lock()
+
+def disk(name: Optional[str] = None) -> ContentAddressedDisk:
+    """Get a storage disk by name, the one configured by STORAGE_DISK by default"""
+    name = name or env('STORAGE_DISK', 'local')
+    if name != 'local':
+        raise ValueError(f"Unsupported storage disk: {name}")
+    with _disks_lock:
+        if name not in _disks:
+            _disks[name] = ContentAddressedDisk()
+        return _disks[name]
+
+def _normalize(path: str) -> str:
+    """Turn a logical path into its index key: relative, with no '.' or '..' segments"""
+    normalized = posixpath.normpath('/' + path.replace('\\', '/')).lstrip('/')
+    if not normalized or normalized == '.':
+        raise ValueError(f"Invalid storage path: {path!r}")
+    return normalized
+
+def _chunks(contents: Any) -> Iterable[bytes]:
+    if isinstance(contents, str):
+        return (contents.encode(),)
+    if isinstance(contents, (bytes, bytearray, memoryview)):
+        return (bytes(contents),)
+    if hasattr(contents, 'read'):
+        return iter(lambda: contents.read(CHUNK_SIZE), b'')
+    return contents
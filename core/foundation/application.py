@@ -1,10 +1,32 @@
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+import inspect
 import os
 import sys
+import threading
+import time
+import typing
+
+_MISSING = object()
+
+# Constructor parameters of each autowired class, as (name, kind, dependency, default)
+_resolution_plans: Dict[type, List[Tuple[str, Any, Any, Any]]] = {}
+
+class BindingResolutionError(Exception):
+    """Raised when the container cannot build a binding or one of its dependencies"""
+    pass
 
 class Application:
-    """Application container"""
+    """
+    Application container
+
+    bind() builds a new instance on every make(), singleton() builds one
+    on first use and shares it, and scoped() shares one per request. A
+    binding's concrete may be a class, whose constructor dependencies are
+    resolved from the container through its type hints, a factory called
+    with the application, or, for singleton() and instance(), the shared
+    object itself. Once built, a singleton is resolved by a dict lookup.
+    """
     
     def __init__(self):
         self.base_path = Path(__file__).parent.parent.parent
@@ -15,66 +37,202 @@ class Application:
         self.resources_path = self.base_path / 'resources'
         self.storage_path = self.base_path / 'storage'
         self.public_path = self.base_path / 'public'
+        self.bootstrap_path = self.base_path / 'bootstrap'
         
         self._config: Dict[str, Any] = {}
-        self._services: Dict[str, Any] = {}
+        self._instances: Dict[Any, Any] = {'app': self, Application: self}
+        self._bindings: Dict[Any, Tuple[Any, str]] = {}
         self.providers = []
+        self._deferred_services: Dict[str, str] = {}
+        self._loading_providers = set()
+        # One reentrant lock for building instances and loading deferred
+        # providers, since either may need the other
+        self._lock = threading.RLock()
+        self._booted = False
+        # (phase, name, seconds) of each boot step, reported by boot:profile
+        self.boot_times: List[Tuple[str, str, float]] = []
         
-        self._load_environment()
-        self._load_config()
+        self._timed('environment', '.env', self._load_environment)
+        self._timed('config', 'config', self._load_config)
         self._register_providers()
         self._boot_providers()
         
+    def _timed(self, phase, name, function, *args):
+        """Run a boot step, recording how long it took"""
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.boot_times.append((phase, name, time.perf_counter() - start))
+        
     def _load_environment(self):
         """Load environment variables from .env file"""
         from dotenv import load_dotenv
         load_dotenv(self.base_path / '.env')
         
     def _load_config(self):
-        """Load configuration files"""
-        config_files = [
-            'app.py',
-            'database.py',
-            'cache.py',
-            'queue.py',
-            'mail.py',
-            'services.py'
-        ]
-        
-        for config_file in config_files:
-            config_path = self.config_path / config_file
-            if config_path.exists():
-                # Load config file
-                pass
+        """Load configuration files, or the config cache written by config:cache"""
+        from core.config.loader import config
+        config.load_config(str(self.config_path))
+        self._config = config.all()
                 
     def _register_providers(self):
-        """Register core service providers"""
+        """Register the eager core service providers; deferred ones wait for make()"""
         from core.providers import providers as core_providers
-        for provider in core_providers:
-            self._register_provider(provider)
+        from core.foundation.provider_manifest import provider_manifest, provider_manifest_path, resolve_provider
+        manifest = provider_manifest(core_providers, provider_manifest_path(self.base_path))
+        for name in manifest['eager']:
+            self._register_provider(resolve_provider(name))
+        self._deferred_services = dict(manifest['deferred'])
             
     def _register_provider(self, provider):
         """Register a service provider"""
         provider_instance = provider()
         self.providers.append(provider_instance)
-        provider_instance.register(self)
+        self._timed('register', provider.__name__, provider_instance.register, self)
+        return provider_instance
         
     def _boot_providers(self):
         """Boot all registered service providers"""
         for provider in self.providers:
-            provider.boot(self)
+            self._timed('boot', type(provider).__name__, provider.boot, self)
+        self._booted = True
+        
+    def _load_deferred_provider(self, abstract):
+        """Register and boot the deferred provider of a binding"""
+        from core.foundation.provider_manifest import resolve_provider
+        with self._lock:
+            name = self._deferred_services.get(abstract)
+            if name is None or name in self._loading_providers:
+                # Loaded by another thread meanwhile, or being loaded by this one
+                return
+            self._loading_providers.add(name)
+            try:
+                provider = self._register_provider(resolve_provider(name))
+                if self._booted:
+                    self._timed('boot', type(provider).__name__, provider.boot, self)
+            finally:
+                self._loading_providers.discard(name)
+            # Only now can other threads skip the lock and see the booted service
+            for binding in [binding for binding, owner in self._deferred_services.items() if owner == name]:
+                del self._deferred_services[binding]
+
+    def terminate(self):
+        """Shut down the service providers, most recently registered first"""
+        for provider in reversed(self.providers):
+            shutdown = getattr(provider, 'shutdown', None)
+            if shutdown is not None:
+                shutdown(self)
             
     def make(self, abstract, parameters=None):
-        """Resolve a service from the container"""
-        if abstract in self._services:
-            return self._services[abstract]
-        return None
+        """
+        Resolve a service from the container, loading its provider if it is
+        deferred. An unbound class is autowired; an unbound key gives None.
+        parameters override constructor arguments and always build afresh.
+        """
+        if abstract in self._deferred_services:
+            self._load_deferred_provider(abstract)
+        if not parameters:
+            instance = self._instances.get(abstract, _MISSING)
+            if instance is not _MISSING:
+                return instance
+                
+        binding = self._bindings.get(abstract)
+        if binding is None:
+            return self.build(abstract, parameters) if isinstance(abstract, type) else None
+        concrete, lifetime = binding
+        if parameters or lifetime == 'transient':
+            return self.build(concrete, parameters)
+            
+        if lifetime == 'scoped':
+            from core.http.request import Request
+            request = Request.current()
+            if request is None:
+                # Outside a request nothing can own the instance
+                return self.build(concrete)
+            with self._lock:
+                instances = request.scoped_instances()
+                if abstract not in instances:
+                    instances[abstract] = self.build(concrete)
+                return instances[abstract]
+                
+        with self._lock:
+            # Another thread may have built it while this one waited
+            if abstract not in self._instances:
+                self._instances[abstract] = self.build(concrete)
+            return self._instances[abstract]
+            
+    def build(self, concrete, parameters=None):
+        """
+        Instantiate a class, resolving its constructor parameters from the
+        container by their type hints, or call a factory with the application
+        """
+        if not isinstance(concrete, type):
+            return concrete(self, **(parameters or {}))
+            
+        plan = _resolution_plans.get(concrete)
+        if plan is None:
+            plan = _resolution_plans[concrete] = _resolution_plan(concrete)
+            
+        args, kwargs = [], {}
+        for name, kind, dependency, default in plan:
+            if parameters and name in parameters:
+                value = parameters[name]
+            elif dependency is not None:
+                value = self._resolve_dependency(concrete, name, dependency, default)
+                if value is _MISSING:
+                    continue
+            elif default is not inspect.Parameter.empty:
+                continue
+            else:
+                raise BindingResolutionError(
+                    f"Unresolvable parameter '{name}' of {concrete.__qualname__}: it has no class type hint or default"
+                )
+            if kind is inspect.Parameter.POSITIONAL_ONLY:
+                args.append(value)
+            else:
+                kwargs[name] = value
+        return concrete(*args, **kwargs)
+        
+    def _resolve_dependency(self, concrete, name, dependency, default):
+        """Resolve a type-hinted constructor parameter; one with a default is only injected when bound"""
+        if default is inspect.Parameter.empty or self.bound(dependency):
+            return self.make(dependency)
+        return _MISSING
+        
+    def bound(self, abstract) -> bool:
+        """Determine if the container has a binding or instance for abstract"""
+        return abstract in self._instances or abstract in self._bindings or abstract in self._deferred_services
+        
+    def bind(self, abstract, concrete=None):
+        """Register a binding built again on every make()"""
+        self._register_binding(abstract, concrete, 'transient')
         
     def singleton(self, abstract, concrete=None):
-        """Register a shared binding in the container"""
-        if concrete is None:
-            concrete = abstract
-        self._services[abstract] = concrete
+        """
+        Register a shared binding in the container. A class or factory is
+        built once, on first use; any other object is shared as it is.
+        """
+        if concrete is not None and not isinstance(concrete, type) and not inspect.isroutine(concrete):
+            self.instance(abstract, concrete)
+            return
+        self._register_binding(abstract, concrete, 'singleton')
+        
+    def scoped(self, abstract, concrete=None):
+        """Register a binding shared for the lifetime of the current request"""
+        self._register_binding(abstract, concrete, 'scoped')
+        
+    def instance(self, abstract, instance):
+        """Share an existing object in the container"""
+        with self._lock:
+            self._bindings.pop(abstract, None)
+            self._instances[abstract] = instance
+            
+    def _register_binding(self, abstract, concrete, lifetime):
+        with self._lock:
+            self._bindings[abstract] = (abstract if concrete is None else concrete, lifetime)
+            # A new binding replaces what the old one built
+            self._instances.pop(abstract, None)
         
     def get_config(self, key: str, default: Any = None) -> Any:
         """Get a configuration value"""
@@ -99,4 +257,26 @@ class Application:
         
     def is_production(self) -> bool:
         """Determine if the application is in production mode"""
-        return self.environment() == 'production' 
\ No newline at end of file
+        return self.environment() == 'production'
+
+def _resolution_plan(concrete: type) -> List[Tuple[str, Any, Any, Any]]:
+    """Read a class's constructor parameters and the classes they are hinted with"""
+    try:
+        hints = typing.get_type_hints(concrete.__init__)
+    except Exception:
+        hints = {}
+    try:
+        parameters = list(inspect.signature(concrete).parameters.values())
+    except (TypeError, ValueError):
+        return []
+        
+    plan = []
+    for parameter in parameters:
+        if parameter.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+            continue
+        dependency = hints.get(parameter.name)
+        if not isinstance(dependency, type) or dependency.__module__ == 'builtins':
+            # Only classes are autowired; str, int and friends need a default or a parameter
+            dependency = None
+        plan.append((parameter.name, parameter.kind, dependency, parameter.default))
+    return plan
@@ -0,0 +1,137 @@
+"""
+Boot profiler behind `boot:profile`
+
+The application is booted in a fresh interpreter run with -X importtime,
+so every module import is timed the way Python itself reports it, and the
+application's own timings of loading .env and config and of each
+provider's register() and boot() are collected alongside.
+
+The report is written as folded stacks, one "frame;frame;frame weight"
+line per leaf, the input format of flamegraph.pl, speedscope and inferno,
+weighted in microseconds. Imports are under boot;imports, nested as they
+were imported, and the boot steps under boot;application. The two are
+separate views of the same time: a provider's boot() includes the
+imports it triggers.
+"""
+import json
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+# Written to stderr once the interpreter has started; imports before it are not part of the boot
+BOOT_MARKER = '-- boot --'
+
+BOOT_SCRIPT = '''
+import json, sys, time
+sys.path.insert(0, {root!r})
+sys.stderr.write({marker!r} + '\\n')
+start = time.perf_counter()
+from core.foundation.application import Application
+app = Application()
+total = time.perf_counter() - start
+from core.config.loader import get
+print(json.dumps({{'total': total, 'steps': app.boot_times, 'budget': get('app.server.boot_budget', 0.0)}}))
+'''
+
+@dataclass
+class ImportRecord:
+    """One module import as reported by -X importtime, in microseconds"""
+    module: str
+    self_us: int
+    cumulative_us: int
+    children: List['ImportRecord'] = field(default_factory=list)
+
+@dataclass
+class BootProfile:
+    """Timings of one application boot"""
+    # Seconds from importing the application to the end of its boot
+    total: float
+    imports: List[ImportRecord]
+    # (phase, name, seconds) recorded by the application
+    steps: List[Tuple[str, str, float]]
+    # app.server.boot_budget of the booted application, in milliseconds
+    budget: float = 0.0
+
+    @property
+    def import_time(self) -> float:
+        """Seconds spent importing modules"""
+        return sum(record.cumulative_us for record in self.imports) / 1e6
+
+    def slowest_imports(self, count: int = 15) -> List[ImportRecord]:
+        """The modules with the largest import time of their own"""
+        records, pending = [], list(self.imports)
+        while pending:
+            record = pending.pop()
+            records.append(record)
+            pending.extend(record.children)
+        return sorted(records, key=lambda record: record.self_us, reverse=True)[:count]
+
+    def over_budget(self, budget_ms: Optional[float] = None) -> bool:
+        """
+        Determine if the boot took longer than budget_ms, or the configured
+        budget when it is None; a budget of 0 disables the check
+        """
+        budget_ms = self.budget if budget_ms is None else budget_ms
+        return budget_ms > 0 and self.total * 1000 > budget_ms
+
+    def folded(self) -> List[str]:
+        """The profile as folded stacks weighted in microseconds"""
+        lines = []
+        pending = [(('boot', 'imports', record.module), record) for record in reversed(self.imports)]
+        while pending:
+            stack, record = pending.pop()
+            if record.self_us:
+                lines.append(f"{';'.join(stack)} {record.self_us}")
+            pending.extend((stack + (child.module,), child) for child in reversed(record.children))
+        for phase, name, seconds in self.steps:
+            lines.append(f"boot;application;{phase};{name} {round(seconds * 1e6)}")
+        return lines
+
+    def write_folded(self, path: Union[str, Path]) -> Path:
+        """Write the folded stacks report"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('\n'.join(self.folded()) + '\n')
+        return path
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """
+    Build the import tree from -X importtime output. A module is listed
+    after the modules it imported, indented one level deeper than it.
+    """
+    roots: List[Tuple[int, ImportRecord]] = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # The header line
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        record = ImportRecord(name.strip(), int(fields[0]), int(fields[1]))
+        children = []
+        while roots and roots[-1][0] > depth:
+            children.append(roots.pop()[1])
+        record.children = children[::-1]
+        roots.append((depth, record))
+    return [record for _, record in roots]
+
+def profile_boot(python: Optional[str] = None, root: Optional[Union[str, Path]] = None) -> BootProfile:
+    """Boot the application in a fresh interpreter and collect its timings"""
+    code = BOOT_SCRIPT.format(root=str(root or PROJECT_ROOT), marker=BOOT_MARKER)
+    result = subprocess.run(
+        [python or sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, cwd=str(root or PROJECT_ROOT)
+    )
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError("The application failed to boot:\n" + '\n'.join(errors[-20:]))
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    steps = [tuple(step) for step in report['steps']]
+    _, _, booting = result.stderr.partition(BOOT_MARKER + '\n')
+    return BootProfile(report['total'], parse_importtime(booting), steps, float(report['budget'] or 0))
@@ -0,0 +1,90 @@
+"""
+Compiled service provider manifest
+
+A provider whose provides() names bindings is deferred: the application
+registers and boots it the first time make() resolves one of them, so a
+CLI command that never renders a view never imports the template engine.
+Knowing what a provider provides means importing it, so the answer is
+compiled once into bootstrap/cache/providers.json; later boots read the
+manifest and import the eager providers only. The manifest is compiled
+again when the provider list or one of the provider modules changes.
+"""
+import importlib
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+MANIFEST_VERSION = 1
+
+def provider_manifest_path(base_path: Optional[Union[str, Path]] = None) -> Path:
+    """Get the path of the compiled provider manifest"""
+    base_path = Path(base_path) if base_path else Path(__file__).parent.parent.parent
+    return base_path / 'bootstrap' / 'cache' / 'providers.json'
+
+def resolve_provider(name: str) -> type:
+    """Import a provider class from its dotted path"""
+    module, _, attribute = name.rpartition('.')
+    return getattr(importlib.import_module(module), attribute)
+
+def provider_manifest(providers: List[str], path: Union[str, Path]) -> Dict[str, Any]:
+    """Load the provider manifest, compiling it first when it is missing or stale"""
+    return load_provider_manifest(providers, path) or compile_provider_manifest(providers, path)
+
+def load_provider_manifest(providers: List[str], path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    """Load the provider manifest, or None when it is missing or stale"""
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('providers') != list(providers):
+        return None
+    if any(_fingerprint(source) != fingerprint for source, fingerprint in manifest['sources'].items()):
+        return None
+    return manifest
+
+def compile_provider_manifest(providers: List[str], path: Union[str, Path]) -> Dict[str, Any]:
+    """Import every provider, record which are deferred and write the manifest"""
+    manifest = {'version': MANIFEST_VERSION, 'providers': list(providers), 'sources': {}, 'eager': [], 'deferred': {}}
+    for name in providers:
+        provider = resolve_provider(name)
+        source = getattr(sys.modules[provider.__module__], '__file__', None)
+        if source:
+            manifest['sources'][source] = _fingerprint(source)
+        provides = provider().provides()
+        if provides:
+            manifest['deferred'].update((binding, name) for binding in provides)
+        else:
+            manifest['eager'].append(name)
+
+    # Write atomically so a booting worker never reads a partial file; a
+    # read-only deployment simply compiles the manifest on every boot
+    path = Path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix='.providers')
+    except OSError:
+        return manifest
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        # mkstemp creates the file 0600; workers may run as another user than the deploy step
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+    return manifest
+
+def _fingerprint(source: str) -> Optional[List[int]]:
+    """Size and mtime of a provider module, to tell when the manifest is stale"""
+    try:
+        stat = os.stat(source)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
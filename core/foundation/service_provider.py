@@ -16,6 +16,18 @@ class ServiceProvider(ABC):
         """Boot the service provider"""
         self.app = app
         self._boot()
+
+    def shutdown(self, app: Application):
+        """Release the provider's resources when the application stops"""
+        self.app = app
+        self._shutdown()
+        
+    def provides(self):
+        """
+        Bindings this provider registers. A provider that lists them is
+        deferred: it is only registered when one of them is resolved.
+        """
+        return []
         
     @abstractmethod
     def _register(self):
@@ -24,4 +36,8 @@ class ServiceProvider(ABC):
         
     def _boot(self):
         """Boot services"""
+        pass
+
+    def _shutdown(self):
+        """Release services"""
         pass 
\ No newline at end of file
@@ -2,7 +2,27 @@
 HTTP module with Controller, Request, and Response classes
 """
 
-from typing import Dict, Any, Optional
+from http import HTTPStatus
+from http.server import DEFAULT_ERROR_MESSAGE
+from typing import AsyncIterator, Dict, Any, Iterator, NamedTuple, Optional, Tuple, Union
+import asyncio
+import json
+
+# Media types worth compressing besides text/*
+COMPRESSIBLE_TYPES = {
+    'application/javascript',
+    'application/json',
+    'application/ld+json',
+    'application/manifest+json',
+    'application/wasm',
+    'application/xml',
+    'image/svg+xml',
+    'image/x-icon',
+    'font/ttf',
+    'font/otf',
+}
+
+_END = object()
 
 class Request:
     """HTTP request class"""
@@ -19,11 +39,234 @@ class Request:
 
 class Response:
     """HTTP response class"""
-    def __init__(self, data: dict = None, status_code: int = 200, headers: dict = None):
-        self.data = data or {}
+    def __init__(self, data: Any = None, status_code: int = 200, headers: dict = None):
+        self.data = data if data is not None else {}
         self.status_code = status_code
         self.headers = headers or {}
 
+class StreamedResponse(Response):
+    """
+    Response whose body is sent while it is being produced.
+
+    stream is an iterable or async iterable of bytes or str chunks, or a
+    callable returning one, so that a generator function only starts when
+    the server begins sending. The servers write each chunk with chunked
+    transfer encoding as soon as it is yielded, so large exports are never
+    built in memory.
+    """
+    def __init__(self, stream: Any, status_code: int = 200, headers: dict = None,
+                 content_type: str = 'text/plain; charset=utf-8'):
+        if callable(stream):
+            stream = stream()
+        if hasattr(stream, '__aiter__'):
+            stream = stream.__aiter__()
+        elif not is_stream(stream):
+            stream = iter(stream)
+        headers = dict(headers or {})
+        if not any(name.lower() == 'content-type' for name in headers):
+            headers['Content-Type'] = content_type
+        super().__init__(stream, status_code, headers)
+
+class ServerSentEvent(NamedTuple):
+    """One Server-Sent Event; dict and list data is sent as JSON"""
+    data: Any = ''
+    event: Optional[str] = None
+    id: Optional[str] = None
+    retry: Optional[int] = None
+
+    def encode(self) -> str:
+        data = json.dumps(self.data) if isinstance(self.data, (dict, list)) else str(self.data)
+        lines = []
+        if self.event is not None:
+            lines.append(f"event: {self.event}")
+        if self.id is not None:
+            lines.append(f"id: {self.id}")
+        if self.retry is not None:
+            lines.append(f"retry: {int(self.retry)}")
+        lines.extend(f"data: {line}" for line in data.split('\n'))
+        return '\n'.join(lines) + '\n\n'
+
+class EventStreamResponse(StreamedResponse):
+    """
+    Server-Sent Events (text/event-stream) response, for progress feeds
+    and other server pushes. events yields ServerSentEvent instances or
+    plain data (str, dict, list), each sent to the client as one event as
+    soon as it is produced.
+    """
+    def __init__(self, events: Any, status_code: int = 200, headers: dict = None):
+        if callable(events):
+            events = events()
+        if hasattr(events, '__aiter__'):
+            stream = _encode_events_async(events)
+        else:
+            stream = _encode_events(events)
+        headers = dict(headers or {})
+        headers.setdefault('Cache-Control', 'no-cache')
+        # Keep reverse proxies such as nginx from buffering the events
+        headers.setdefault('X-Accel-Buffering', 'no')
+        super().__init__(stream, status_code, headers, content_type='text/event-stream; charset=utf-8')
+
+class BodyError(Exception):
+    """The request body cannot be read or parsed; status_code is the response to send"""
+    status_code = 400
+
+class BodyTooLarge(BodyError):
+    """The request body exceeded the configured limit"""
+    status_code = 413
+
+def _encode_event(event: Any) -> str:
+    return (event if isinstance(event, ServerSentEvent) else ServerSentEvent(event)).encode()
+
+def _encode_events(events: Any) -> Iterator[str]:
+    for event in events:
+        yield _encode_event(event)
+
+async def _encode_events_async(events: Any) -> AsyncIterator[str]:
+    async for event in events:
+        yield _encode_event(event)
+
+def render_route_response(response: Any) -> Tuple[int, Dict[str, str], Union[bytes, Iterator, AsyncIterator]]:
+    """
+    Serialize the value returned by a route action into status, headers and
+    body. Iterators and async iterators are passed through as the body, to
+    be streamed by the server without a Content-Length.
+    """
+    status = 200
+    extra: Dict[str, str] = {}
+    if isinstance(response, Response):
+        status = response.status_code
+        extra = response.headers
+        response = response.data
+
+    if status in (204, 304):
+        # Never have a body, so neither a Content-Length for one
+        return status, dict(extra), b''
+
+    if is_stream(response):
+        headers = {'Content-Type': 'text/html; charset=utf-8'}
+        headers.update(extra)
+        return status, headers, response
+
+    if isinstance(response, dict):
+        body = json.dumps(response).encode()
+        content_type = 'application/json'
+    elif isinstance(response, bytes):
+        body = response
+        content_type = 'application/octet-stream'
+    else:
+        body = str(response).encode('utf-8')
+        content_type = 'text/html; charset=utf-8'
+
+    headers = {'Content-Type': content_type, 'Content-Length': str(len(body))}
+    headers.update(extra)
+    return status, headers, body
+
+def render_unmatched_route(method: str, allowed: Tuple[str, ...]) -> Tuple[int, Dict[str, str], bytes]:
+    """
+    Answer a request no route accepted: 404 for unknown paths, the
+    automatic OPTIONS response or 405 when the path exists for other
+    methods. allowed is RouteMatch.allowed.
+    """
+    if not allowed:
+        return render_error_response(404, "Route not found")
+    allow = ', '.join(allowed)
+    if method == 'OPTIONS':
+        return 204, {'Allow': allow}, b''
+    status, headers, body = render_error_response(405)
+    headers['Allow'] = allow
+    return status, headers, body
+
+def render_error_response(status: int, message: Optional[str] = None) -> Tuple[int, Dict[str, str], bytes]:
+    """Render an error page in the format http.server uses for send_error"""
+    try:
+        phrase, explain = HTTPStatus(status).phrase, HTTPStatus(status).description
+    except ValueError:
+        phrase, explain = '', ''
+    body = (DEFAULT_ERROR_MESSAGE % {
+        'code': status,
+        'message': message or phrase,
+        'explain': explain
+    }).encode('utf-8', 'replace')
+    return status, {'Content-Type': 'text/html;charset=utf-8', 'Content-Length': str(len(body))}, body
+
+def is_stream(data: Any) -> bool:
+    """Determine if a response body is produced incrementally"""
+    return hasattr(data, '__next__') or hasattr(data, '__anext__')
+
+def is_compressible_type(content_type: Optional[str]) -> bool:
+    """Determine if a media type benefits from compression"""
+    media_type = (content_type or '').split(';', 1)[0].strip().lower()
+    return media_type.startswith('text/') or media_type in COMPRESSIBLE_TYPES
+
+async def iterate_chunks(data: Any) -> AsyncIterator[bytes]:
+    """Iterate a streamed body on the event loop, pulling sync iterators from the executor and closing it when done"""
+    if hasattr(data, '__anext__'):
+        try:
+            async for chunk in data:
+                if chunk:
+                    yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+        finally:
+            if hasattr(data, 'aclose'):
+                await data.aclose()
+        return
+    try:
+        # Sync generators may block between chunks
+        while True:
+            chunk = await asyncio.to_thread(next, data, _END)
+            if chunk is _END:
+                return
+            if chunk:
+                yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+    finally:
+        if hasattr(data, 'close'):
+            try:
+                data.close()
+            except ValueError:
+                # Still running in the executor after a cancellation; it is closed when collected
+                pass
+
+async def close_chunks(data: Any) -> None:
+    """Close a streamed body that is never sent, as iterate_chunks does once it is done"""
+    if hasattr(data, 'aclose'):
+        await data.aclose()
+    elif hasattr(data, 'close'):
+        data.close()
+
+def close_chunks_sync(data: Any) -> None:
+    """Close a streamed body that is never sent from a blocking server thread"""
+    if hasattr(data, 'aclose'):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(data.aclose())
+        finally:
+            loop.close()
+    elif hasattr(data, 'close'):
+        data.close()
+
+def iterate_chunks_sync(data: Any) -> Iterator[bytes]:
+    """Iterate a streamed body from a blocking server thread, closing it when done"""
+    if hasattr(data, '__anext__'):
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                try:
+                    chunk = loop.run_until_complete(data.__anext__())
+                except StopAsyncIteration:
+                    return
+                if chunk:
+                    yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+        finally:
+            if hasattr(data, 'aclose'):
+                loop.run_until_complete(data.aclose())
+            loop.close()
+    try:
+        for chunk in data:
+            if chunk:
+                yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+    finally:
+        if hasattr(data, 'close'):
+            data.close()
+
 class Controller:
     """Base controller class"""
     def __init__(self):
@@ -0,0 +1,217 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+from core.http import close_chunks, iterate_chunks, render_error_response, render_route_response, render_unmatched_route
+from core.http.request import BodyError, BodyTooLarge
+
+logger = logging.getLogger('core.http.asgi')
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+class ASGIApplication:
+    """
+    ASGI application serving the framework's router.
+
+    Lets ASGI servers such as uvicorn run the application:
+
+        uvicorn bootstrap.asgi:application --workers 4
+
+    The lifespan protocol boots the service providers at startup and
+    terminates them at shutdown; without it the application is booted by
+    the first request. Routes are dispatched through Route.handle_async, so
+    coroutine actions and middleware are awaited on the server's loop.
+
+    Request bodies are read on demand: request.stream() is an async
+    iterable of chunks, and request.json() and request.form() read the body
+    the first time they are called. Responses whose data is an iterator or
+    async iterator are streamed chunk by chunk, and every send() waits on
+    the server's flow control.
+    """
+
+    def __init__(self, app: Any = None, app_factory: Optional[Callable[[], Any]] = None,
+                 max_body_size: int = 10 * 1024 * 1024):
+        self.app = app
+        self.app_factory = app_factory
+        self.max_body_size = max_body_size
+        self._boot_lock: Optional[asyncio.Lock] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def startup(self) -> Any:
+        """Boot the application once, off the event loop"""
+        if self.app is not None:
+            return self.app
+        if self._boot_lock is None:
+            self._boot_lock = asyncio.Lock()
+        async with self._boot_lock:
+            if self.app is None:
+                self.app = await asyncio.to_thread(self._create_app)
+        return self.app
+
+    async def shutdown(self) -> None:
+        """Terminate the application's service providers"""
+        if self.app is not None and hasattr(self.app, 'terminate'):
+            await asyncio.to_thread(self.app.terminate)
+
+    def _create_app(self) -> Any:
+        if self.app_factory is not None:
+            return self.app_factory()
+        from core.foundation.application import Application
+        return Application()
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as e:
+                    logger.exception("Application failed to boot")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                try:
+                    await self.shutdown()
+                except Exception as e:
+                    logger.exception("Application failed to shut down")
+                    await send({'type': 'lifespan.shutdown.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope: Scope, receive: Receive, send: Send) -> None:
+        from core.http.request import Request
+
+        app = await self.startup()
+        method = scope['method']
+        path = scope['path']
+        client = scope.get('client')
+
+        request = Request(
+            app=app,
+            method=method,
+            path=path,
+            headers=_decode_headers(scope['headers']),
+            client_address=client[0] if client else None,
+            query_string=scope.get('query_string', b'').decode('latin-1'),
+            stream=_BodyStream(receive, self.max_body_size)
+        )
+
+        # Oversized uploads are refused before any of the body is received
+        try:
+            length = int(request.header('Content-Length') or 0)
+        except ValueError:
+            await _send_buffered(send, *render_error_response(400))
+            return
+        if length > self.max_body_size:
+            await _send_buffered(send, *render_error_response(413))
+            return
+
+        request.set_current()
+        response = None
+        try:
+            match = app.make('router').lookup(method, path)
+            if match.route is None:
+                await _send_buffered(send, *render_unmatched_route(method, match.allowed))
+                return
+            response = await match.route.handle_async(request, match.parameters)
+        except BodyError as e:
+            await _send_buffered(send, *render_error_response(e.status_code, str(e)))
+            return
+        except Exception as e:
+            logger.error(f"Error handling {method} request: {str(e)}")
+            await _send_buffered(send, *render_error_response(500, str(e)))
+            return
+        finally:
+            request.clear_current()
+            if response is None:
+                request.close()
+
+        try:
+            await _send_response(send, response, head=method == 'HEAD')
+        finally:
+            # A streamed response may still read the uploaded files
+            request.close()
+
+class _BodyStream:
+    """Request body read from the ASGI receive channel as it is consumed"""
+
+    def __init__(self, receive: Receive, max_size: int):
+        # Sync actions in the thread pool read the body through this loop
+        self.loop = asyncio.get_running_loop()
+        self._receive = receive
+        self._max_size = max_size
+        self._received = 0
+        self._done = False
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._chunks()
+
+    async def _chunks(self) -> AsyncIterator[bytes]:
+        while not self._done:
+            message = await self._receive()
+            if message['type'] == 'http.disconnect':
+                self._done = True
+                return
+            chunk = message.get('body', b'')
+            self._done = not message.get('more_body', False)
+            self._received += len(chunk)
+            if self._received > self._max_size:
+                raise BodyTooLarge(f"Request body exceeds {self._max_size} bytes")
+            if chunk:
+                yield chunk
+
+    async def read(self) -> bytes:
+        """Read the rest of the body"""
+        return b''.join([chunk async for chunk in self._chunks()])
+
+def _decode_headers(raw: List[Tuple[bytes, bytes]]) -> Dict[str, str]:
+    headers: Dict[str, str] = {}
+    for name, value in raw:
+        key = name.decode('latin-1').title()
+        value = value.decode('latin-1')
+        headers[key] = f"{headers[key]}, {value}" if key in headers else value
+    return headers
+
+def _encode_headers(headers: Dict[str, str]) -> List[Tuple[bytes, bytes]]:
+    return [(name.lower().encode('latin-1'), str(value).encode('latin-1')) for name, value in headers.items()]
+
+async def _send_buffered(send: Send, status: int, headers: Dict[str, str], body: bytes) -> None:
+    await send({'type': 'http.response.start', 'status': status, 'headers': _encode_headers(headers)})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def _send_response(send: Send, response: Any, head: bool = False) -> None:
+    """Send a route result, streaming iterators instead of buffering them"""
+    status, headers, body = render_route_response(response)
+    if head:
+        # The headers GET would send; a streamed body is never started
+        if not isinstance(body, bytes):
+            await close_chunks(body)
+        await _send_buffered(send, status, headers, b'')
+        return
+    if isinstance(body, bytes):
+        await _send_buffered(send, status, headers, body)
+        return
+
+    await send({'type': 'http.response.start', 'status': status, 'headers': _encode_headers(headers)})
+    chunks = iterate_chunks(body)
+    try:
+        async for chunk in chunks:
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    except Exception as e:
+        # The status is already sent: let the server abort the response instead of completing it
+        logger.error(f"Error streaming response: {str(e)}")
+        raise
+    finally:
+        # Close the producer even when the client goes away mid-stream
+        await chunks.aclose()
+    await send({'type': 'http.response.body', 'body': b''})
@@ -0,0 +1,109 @@
+"""
+Streaming JSON encoders
+
+encode_json_array() writes `[`, then each row as it is pulled from the iterable
+(typically a database cursor), then `]`; encode_ndjson() writes one row per line.
+Encoded rows are gathered into chunks of about chunk_size bytes, so memory
+is bounded by the chunk size (plus one batch of rows) rather than by the
+size of the result.
+"""
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+from uuid import UUID
+import json
+from core.http import StreamedResponse
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# Rows handed to the C encoder at once
+BATCH_ROWS = 256
+
+def json_default(value: Any) -> Any:
+    """Serialize values the json module does not know, models first"""
+    json_attributes = getattr(value, '_json_attributes', None)
+    if json_attributes is not None:
+        return json_attributes()
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8', 'replace')
+    to_dict = getattr(value, 'to_dict', None)
+    if to_dict is not None:
+        return to_dict()
+    if hasattr(value, '__dict__'):
+        return {key: item for key, item in vars(value).items() if not key.startswith('_')}
+    return str(value)
+
+def _json_ready(row: Any) -> Any:
+    # Models skip to_dict(): only their cast columns are converted
+    json_attributes = getattr(row, '_json_attributes', None)
+    return json_attributes() if json_attributes is not None else row
+
+def _encoded_batches(rows: Iterable[Any], default: Optional[Callable[[Any], Any]]) -> Iterator[str]:
+    """
+    Encode rows BATCH_ROWS at a time, comma separated without brackets.
+    Encoding a list of rows in one call keeps the per-row work in the C
+    encoder while memory stays bounded by the batch.
+    """
+    encode = json.JSONEncoder(default=default or json_default, ensure_ascii=False, separators=(',', ':')).encode
+    batch = []
+    for row in rows:
+        batch.append(_json_ready(row))
+        if len(batch) == BATCH_ROWS:
+            yield encode(batch)[1:-1]
+            batch = []
+    if batch:
+        yield encode(batch)[1:-1]
+
+def encode_json_array(rows: Iterable[Any], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      default: Optional[Callable[[Any], Any]] = None) -> Iterator[bytes]:
+    """Encode rows as one JSON array, yielded in chunks of about chunk_size bytes"""
+    parts = ['[']
+    size = 1
+    separator = ''
+    for encoded in _encoded_batches(rows, default):
+        parts.append(separator)
+        parts.append(encoded)
+        separator = ','
+        size += len(encoded) + 1
+        if size >= chunk_size:
+            yield ''.join(parts).encode('utf-8')
+            parts, size = [], 0
+    parts.append(']')
+    yield ''.join(parts).encode('utf-8')
+
+def encode_ndjson(rows: Iterable[Any], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  default: Optional[Callable[[Any], Any]] = None) -> Iterator[bytes]:
+    """Encode rows as newline-delimited JSON, yielded in chunks of about chunk_size bytes"""
+    encode = json.JSONEncoder(default=default or json_default, ensure_ascii=False, separators=(',', ':')).encode
+    parts = []
+    size = 0
+    for row in rows:
+        encoded = encode(_json_ready(row))
+        parts.append(encoded)
+        parts.append('\n')
+        size += len(encoded) + 1
+        if size >= chunk_size:
+            yield ''.join(parts).encode('utf-8')
+            parts, size = [], 0
+    if parts:
+        yield ''.join(parts).encode('utf-8')
+
+class JSONStreamResponse(StreamedResponse):
+    """
+    Response streaming rows as a JSON array, or as NDJSON
+    (application/x-ndjson) when ndjson is true. rows may be a callable
+    returning the iterable, so the query only runs when sending starts:
+
+        return JSONStreamResponse(lambda: User.cursor())
+    """
+    def __init__(self, rows: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None,
+                 ndjson: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        encode = encode_ndjson if ndjson else encode_json_array
+        content_type = 'application/x-ndjson' if ndjson else 'application/json'
+
+        def stream():
+            yield from encode(rows() if callable(rows) else rows, chunk_size)
+        super().__init__(stream, status_code, headers, content_type=content_type)
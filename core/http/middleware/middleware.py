@@ -1,6 +1,24 @@
-from typing import Any, Callable, Dict, Optional, List
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, List, Tuple, Union
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import parse_qsl, urlencode
+import hashlib
+import threading
 import time
+import uuid
+import zlib
+from core.cache.cache import Cache, make_store
+from core.config.loader import env
+from core.http import Response, is_compressible_type, is_stream, render_route_response
+from core.http.static import accepted_encodings, not_modified
+from core.http.middleware.rate_limiter import (
+    RateLimiter,
+    RateLimitResult,
+    make_limiter,
+    retry_after_seconds
+)
 
 class Middleware(ABC):
     """Base middleware class"""
@@ -38,49 +56,65 @@ class ShareErrorsFromSession(Middleware):
 
 class ThrottleRequests(Middleware):
     """Rate limiting middleware"""
-    def __init__(self, max_attempts: int = 60, decay_minutes: int = 1):
+    def __init__(self, max_attempts: int = 60, decay_minutes: int = 1,
+                 by: Union[str, Callable[[Any], str]] = 'user', per_route: bool = True,
+                 limiter: Optional[RateLimiter] = None):
         self.max_attempts = max_attempts
         self.decay_minutes = decay_minutes
-        self._requests: Dict[str, List[float]] = {}
+        self.by = by
+        self.per_route = per_route
+        self.limiter = limiter if limiter is not None else make_limiter()
 
     def handle(self, request: Any, next: Callable) -> Any:
         key = self._get_request_key(request)
-        now = time.time()
-        
-        # Clean up old requests
-        self._clean_old_requests(key, now)
-        
-        # Check if rate limit exceeded
-        if self._is_rate_limited(key):
-            return {
+        result = self.limiter.attempt(key, self.max_attempts, self.decay_minutes * 60)
+
+        if not result.allowed:
+            retry_after = retry_after_seconds(result)
+            headers = self._rate_limit_headers(result)
+            headers['Retry-After'] = str(retry_after)
+            headers['X-RateLimit-Reset'] = str(int(time.time()) + retry_after)
+            return Response({
                 'success': False,
                 'status': 429,
                 'message': 'Too Many Requests'
-            }
-        
-        # Add current request
-        if key not in self._requests:
-            self._requests[key] = []
-        self._requests[key].append(now)
-        
-        return next(request)
+            }, 429, headers)
+
+        response = next(request)
+        if not isinstance(response, Response):
+            response = Response(response)
+        response.headers.update(self._rate_limit_headers(result))
+        return response
 
     def _get_request_key(self, request: Any) -> str:
-        """Get unique key for request (e.g. IP address)"""
-        # TODO: Implement proper request key generation
-        return 'default'
-
-    def _clean_old_requests(self, key: str, now: float) -> None:
-        """Remove requests older than decay_minutes"""
-        if key not in self._requests:
-            return
-        
-        cutoff = now - (self.decay_minutes * 60)
-        self._requests[key] = [t for t in self._requests[key] if t > cutoff]
-
-    def _is_rate_limited(self, key: str) -> bool:
-        """Check if rate limit is exceeded"""
-        return key in self._requests and len(self._requests[key]) >= self.max_attempts
+        """Get unique key for request (client identity, optionally scoped to the route)"""
+        if callable(self.by):
+            client = str(self.by(request))
+        elif self.by == 'user' and getattr(getattr(request, 'user', None), 'id', None) is not None:
+            client = f"user:{request.user.id}"
+        else:
+            client = f"ip:{self._client_ip(request)}"
+
+        if not self.per_route:
+            return client
+
+        route = getattr(request, 'route', None)
+        uri = route.uri if route is not None else getattr(request, 'path', '')
+        return f"{getattr(request, 'method', '')}|{uri}|{client}"
+
+    def _client_ip(self, request: Any) -> str:
+        """Get the client IP address for the request"""
+        ip = getattr(request, 'ip', None)
+        if callable(ip):
+            ip = ip()
+        return ip or 'unknown'
+
+    def _rate_limit_headers(self, result: RateLimitResult) -> Dict[str, str]:
+        """Build the standard rate limit headers"""
+        return {
+            'X-RateLimit-Limit': str(result.limit),
+            'X-RateLimit-Remaining': str(result.remaining)
+        }
 
 class EncryptCookies(Middleware):
     def handle(self, request: Dict[str, Any], next: Callable) -> Any:
@@ -92,4 +126,326 @@ class SubstituteBindings(Middleware):
     def handle(self, request: Dict[str, Any], next: Callable) -> Any:
         """Handle the request"""
         # Implement route parameter binding
-        return next(request) 
\ No newline at end of file
+        return next(request) 
+
+class CompressResponse(Middleware):
+    """
+    Compress responses on the fly with gzip or deflate.
+
+    The coding is negotiated from Accept-Encoding. Bodies smaller than
+    min_size, already encoded, marked no-transform or of incompressible
+    types (images, archives, event streams) are sent as they are. Bodies up
+    to stream_threshold are compressed in one go; larger ones and streamed
+    responses are compressed chunk by chunk as they are sent, so the
+    compressed response is never held in memory.
+    """
+    # zlib window bits for each content coding
+    CODINGS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+    SKIPPED_STATUSES = (204, 206, 304)
+
+    def __init__(self, level: Optional[int] = None, min_size: Optional[int] = None,
+                 chunk_size: int = 64 * 1024, stream_threshold: int = 1024 * 1024):
+        self.level = int(level if level is not None else env('COMPRESSION_LEVEL', 6))
+        self.min_size = int(min_size if min_size is not None else env('COMPRESSION_MIN_SIZE', 1024))
+        self.chunk_size = chunk_size
+        self.stream_threshold = stream_threshold
+
+    def handle(self, request: Any, next: Callable) -> Any:
+        response = next(request)
+        coding = self._negotiate(_request_header(request, 'Accept-Encoding'))
+        if coding is None:
+            return response
+
+        status, headers, body = render_route_response(response)
+        if not self._should_compress(status, headers, body):
+            return response
+
+        headers.pop('Content-Length', None)
+        headers['Content-Encoding'] = coding
+        vary = headers.get('Vary')
+        if vary is None:
+            headers['Vary'] = 'Accept-Encoding'
+        elif 'accept-encoding' not in vary.lower() and vary.strip() != '*':
+            headers['Vary'] = f"{vary}, Accept-Encoding"
+
+        if isinstance(body, bytes) and len(body) <= self.stream_threshold:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, self.CODINGS[coding])
+            return Response(compressor.compress(body) + compressor.flush(), status, headers)
+        if isinstance(body, bytes):
+            body = self._slices(body)
+        if hasattr(body, '__anext__'):
+            return Response(self._compress_async(body, coding), status, headers)
+        return Response(self._compress(body, coding), status, headers)
+
+    def _negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """Pick the accepted coding with the highest q-value, preferring gzip on ties"""
+        if not accept_encoding:
+            return None
+        accepted = accepted_encodings(accept_encoding)
+        best, best_quality = None, 0.0
+        for coding in self.CODINGS:
+            quality = accepted.get(coding, accepted.get('*', 0.0))
+            if quality > best_quality:
+                best, best_quality = coding, quality
+        return best
+
+    def _should_compress(self, status: int, headers: Dict[str, str], body: Any) -> bool:
+        fields = {name.lower(): value for name, value in headers.items()}
+        if status < 200 or status >= 300 or status in self.SKIPPED_STATUSES:
+            return False
+        if 'content-encoding' in fields or 'no-transform' in fields.get('cache-control', '').lower():
+            return False
+        content_type = fields.get('content-type', '')
+        # Event streams must reach the client as each event is written
+        if content_type.startswith('text/event-stream') or not is_compressible_type(content_type):
+            return False
+        return not isinstance(body, bytes) or len(body) >= self.min_size
+
+    def _slices(self, body: bytes) -> Iterator[bytes]:
+        view = memoryview(body)
+        for start in range(0, len(body), self.chunk_size):
+            yield view[start:start + self.chunk_size]
+
+    def _compress(self, chunks: Iterator, coding: str) -> Iterator[bytes]:
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, self.CODINGS[coding])
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    async def _compress_async(self, chunks: AsyncIterator, coding: str) -> AsyncIterator[bytes]:
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, self.CODINGS[coding])
+        async for chunk in chunks:
+            data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+class CacheResponse(Middleware):
+    """
+    Cache whole responses to GET and HEAD requests in a cache store.
+
+    The key is made of the method, the path, the query parameters listed in
+    query (all of them when None) and the request headers listed in vary.
+    Hits are answered with the stored status, headers and body plus Age
+    and X-Cache headers without running the action. Requests carrying a
+    session cookie or Authorization header bypass the cache, and responses
+    that set cookies, are private or no-store, or are streamed are never
+    stored.
+
+    Concurrent misses for one key are coalesced with a threading.Lock, so
+    only one thread of a process renders the page. The lock is not shared
+    through the store: each worker process (or server instance) still
+    renders a cold page once, so a stampede is bounded by the number of
+    processes, not removed.
+
+    Entries are tagged; purge(*tags) invalidates every entry carrying one
+    of the tags in every process sharing the store.
+    """
+    CACHEABLE_STATUSES = (200, 203, 204, 300, 301, 404, 410)
+
+    def __init__(self, ttl: int = 60, tags: Iterable[str] = (), query: Optional[Iterable[str]] = None,
+                 vary: Iterable[str] = ('Accept-Encoding',), bypass_cookies: Optional[Iterable[str]] = None,
+                 store: Optional[Cache] = None, prefix: str = 'response:'):
+        self.ttl = ttl
+        self.tags = tuple(tags)
+        self.query = None if query is None else frozenset(query)
+        self.vary = tuple(vary)
+        self.bypass_cookies = tuple(
+            bypass_cookies if bypass_cookies is not None else (env('SESSION_COOKIE', 'pylevel_session'),)
+        )
+        self.store = store if store is not None else make_store()
+        self.prefix = prefix
+        self._locks: Dict[str, Tuple[threading.Lock, int]] = {}
+        self._locks_lock = threading.Lock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Miss locks are per process
+        state = self.__dict__.copy()
+        del state['_locks'], state['_locks_lock']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def handle(self, request: Any, next: Callable) -> Any:
+        if getattr(request, 'method', 'GET') not in ('GET', 'HEAD') or self._bypass(request):
+            return self._with_headers(next(request), {'X-Cache': 'BYPASS'})
+
+        key = self._key(request)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        with self._coalesce(key):
+            # Another request may have rendered the page while this one waited
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            response = next(request)
+            status, headers, body = render_route_response(response)
+            if not self._storable(status, headers, body):
+                return self._with_headers(response, {'X-Cache': 'MISS'})
+            self.store.put(key, {
+                'status': status,
+                'headers': headers,
+                'body': body,
+                'created': time.time(),
+                'tags': self._tag_versions(self.tags)
+            }, self.ttl)
+        return Response(body, status, dict(headers, **{'Age': '0', 'X-Cache': 'MISS'}))
+
+    def purge(self, *tags: str) -> None:
+        """Invalidate every cached response carrying one of the tags"""
+        for tag in tags:
+            self.store.forever(self._tag_key(tag), uuid.uuid4().hex)
+
+    def _lookup(self, key: str) -> Optional[Response]:
+        entry = self.store.get(key)
+        if entry is None or self._tag_versions(entry['tags']) != entry['tags']:
+            return None
+        age = max(0, int(time.time() - entry['created']))
+        headers = dict(entry['headers'], **{'Age': str(age), 'X-Cache': 'HIT'})
+        return Response(entry['body'], entry['status'], headers)
+
+    def _tag_versions(self, tags: Iterable[str]) -> Dict[str, str]:
+        """Current version of each tag, created on first use"""
+        versions = {}
+        for tag in tags:
+            version = self.store.get(self._tag_key(tag))
+            if version is None:
+                version = uuid.uuid4().hex
+                self.store.forever(self._tag_key(tag), version)
+            versions[tag] = version
+        return versions
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    def _key(self, request: Any) -> str:
+        pairs = parse_qsl(getattr(request, 'query_string', ''), keep_blank_values=True)
+        if self.query is not None:
+            pairs = [(name, value) for name, value in pairs if name in self.query]
+        parts = [getattr(request, 'method', 'GET'), getattr(request, 'path', ''), urlencode(sorted(pairs))]
+        parts.extend(_request_header(request, name) or '' for name in self.vary)
+        digest = hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+        return f"{self.prefix}{digest}"
+
+    def _bypass(self, request: Any) -> bool:
+        """Personalised requests are never served from or stored in the cache"""
+        if _request_header(request, 'Authorization'):
+            return True
+        cookies = _request_header(request, 'Cookie') or ''
+        names = {part.split('=', 1)[0].strip() for part in cookies.split(';')}
+        return any(name in names for name in self.bypass_cookies)
+
+    def _storable(self, status: int, headers: Dict[str, str], body: Any) -> bool:
+        if status not in self.CACHEABLE_STATUSES or is_stream(body):
+            return False
+        fields = {name.lower(): value.lower() for name, value in headers.items()}
+        cache_control = fields.get('cache-control', '')
+        return 'set-cookie' not in fields and 'no-store' not in cache_control and 'private' not in cache_control
+
+    @contextmanager
+    def _coalesce(self, key: str):
+        """Hold the per-key lock, so one miss renders while the others wait"""
+        with self._locks_lock:
+            lock, waiters = self._locks.get(key, (None, 0))
+            lock = lock or threading.Lock()
+            self._locks[key] = (lock, waiters + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._locks_lock:
+                lock, waiters = self._locks[key]
+                if waiters == 1:
+                    del self._locks[key]
+                else:
+                    self._locks[key] = (lock, waiters - 1)
+
+    def _with_headers(self, response: Any, headers: Dict[str, str]) -> Response:
+        if not isinstance(response, Response):
+            response = Response(response)
+        response.headers.update(headers)
+        return response
+
+class ConditionalGet(Middleware):
+    """
+    Answer conditional GETs for dynamic responses with 304 Not Modified.
+
+    Successful responses get a weak ETag hashed from the body with CRC-32,
+    unless the action set its own ETag or Last-Modified. When a validator
+    is given it is called with the request before the action runs; it
+    returns a version (any value, turned into an ETag) or an updated_at
+    datetime (sent as Last-Modified), and a matching If-None-Match or
+    If-Modified-Since is answered without running or serializing the
+    action at all.
+    """
+    def __init__(self, validator: Optional[Callable[[Any], Any]] = None):
+        self.validator = validator
+
+    def handle(self, request: Any, next: Callable) -> Any:
+        if getattr(request, 'method', 'GET') not in ('GET', 'HEAD'):
+            return next(request)
+        if_none_match = _request_header(request, 'If-None-Match')
+        if_modified_since = _request_header(request, 'If-Modified-Since')
+
+        validators: Dict[str, str] = {}
+        if self.validator is not None:
+            validators, mtime = self._validators(self.validator(request))
+            if validators and not_modified(if_none_match, if_modified_since, validators.get('ETag'), mtime):
+                return Response('', 304, validators)
+
+        response = next(request)
+        status, headers, body = render_route_response(response)
+        if status != 200 or is_stream(body):
+            return response
+
+        fields = {name.lower(): value for name, value in headers.items()}
+        if 'etag' in fields or 'last-modified' in fields:
+            validators = {}
+        elif not validators:
+            validators = {'ETag': body_etag(body)}
+        headers.update(validators)
+
+        etag = fields.get('etag', validators.get('ETag'))
+        last_modified = fields.get('last-modified', validators.get('Last-Modified'))
+        if not_modified(if_none_match, if_modified_since, etag, self._timestamp(last_modified)):
+            kept = ('etag', 'last-modified', 'cache-control', 'expires', 'vary')
+            return Response('', 304, {name: value for name, value in headers.items() if name.lower() in kept})
+        return Response(body, status, headers)
+
+    def _validators(self, value: Any) -> Tuple[Dict[str, str], Optional[float]]:
+        """Turn what the validator returned into response headers and a modification time"""
+        if value is None:
+            return {}, None
+        if isinstance(value, datetime):
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            mtime = value.timestamp()
+            return {'Last-Modified': formatdate(mtime, usegmt=True)}, mtime
+        return {'ETag': body_etag(str(value).encode('utf-8'))}, None
+
+    def _timestamp(self, last_modified: Optional[str]) -> Optional[float]:
+        if not last_modified:
+            return None
+        try:
+            return parsedate_to_datetime(last_modified).timestamp()
+        except (TypeError, ValueError):
+            return None
+
+def body_etag(body: bytes) -> str:
+    """Weak ETag from a fast non-cryptographic hash of the body"""
+    return f'W/"{len(body):x}-{zlib.crc32(body):08x}"'
+
+def _request_header(request: Any, name: str) -> Optional[str]:
+    """Get a request header regardless of the case it was sent in"""
+    headers = getattr(request, 'headers', None) or {}
+    for key, value in headers.items():
+        if key.lower() == name.lower():
+            return value
+    return None
@@ -0,0 +1,249 @@
+from typing import Dict, List, NamedTuple, Optional
+from abc import ABC, abstractmethod
+from pathlib import Path
+import math
+import os
+import sqlite3
+import threading
+import time
+from core.config.loader import get as config
+
+class RateLimitResult(NamedTuple):
+    """Outcome of a single rate limiter attempt"""
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+
+class RateLimiter(ABC):
+    """Base rate limiter class"""
+    @abstractmethod
+    def attempt(self, key: str, max_attempts: int, decay_seconds: float, now: float = None) -> RateLimitResult:
+        """Record a hit for the key and report whether it is allowed"""
+        pass
+
+    @abstractmethod
+    def clear(self, key: str) -> None:
+        """Forget all hits recorded for the key"""
+        pass
+
+class _MemoryRateLimiter(RateLimiter):
+    """In-process limiter state guarded by a lock and purged periodically"""
+    def __init__(self, purge_interval: float = None):
+        self.purge_interval = purge_interval
+        self._entries: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+
+    def attempt(self, key: str, max_attempts: int, decay_seconds: float, now: float = None) -> RateLimitResult:
+        if now is None:
+            now = time.time()
+        with self._lock:
+            if now >= self._next_purge:
+                self._purge(now, decay_seconds)
+                self._next_purge = now + (self.purge_interval or decay_seconds)
+            return self._hit(key, max_attempts, decay_seconds, now)
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __getstate__(self) -> Dict[str, object]:
+        # Counters are runtime state; a restored limiter starts empty
+        return {'purge_interval': self.purge_interval}
+
+    def __setstate__(self, state: Dict[str, object]) -> None:
+        self.__init__(**state)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _purge(self, now: float, decay_seconds: float) -> None:
+        """Drop entries that no longer affect any decision"""
+        idle = [key for key, entry in self._entries.items() if self._is_idle(entry, now, decay_seconds)]
+        for key in idle:
+            del self._entries[key]
+
+    @abstractmethod
+    def _hit(self, key: str, max_attempts: int, decay_seconds: float, now: float) -> RateLimitResult:
+        pass
+
+    @abstractmethod
+    def _is_idle(self, entry: List[float], now: float, decay_seconds: float) -> bool:
+        pass
+
+class SlidingWindowLimiter(_MemoryRateLimiter):
+    """
+    Sliding window counter limiter.
+
+    Each key keeps the start of the current fixed window, its hit count and
+    the previous window's count. The previous count is weighted by how much
+    of it still overlaps the sliding window, so every hit is O(1).
+    """
+    def _hit(self, key: str, max_attempts: int, decay_seconds: float, now: float) -> RateLimitResult:
+        window_start = now - (now % decay_seconds)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            entry = self._entries[key] = [window_start, 0, 0]
+        elif entry[0] != window_start:
+            entry[2] = entry[1] if entry[0] == window_start - decay_seconds else 0
+            entry[1] = 0
+            entry[0] = window_start
+
+        result = sliding_window_decision(entry[1], entry[2], window_start, max_attempts, decay_seconds, now)
+        if result.allowed:
+            entry[1] += 1
+        return result
+
+    def _is_idle(self, entry: List[float], now: float, decay_seconds: float) -> bool:
+        return entry[0] + 2 * decay_seconds <= now
+
+class TokenBucketLimiter(_MemoryRateLimiter):
+    """
+    Token bucket limiter.
+
+    Buckets hold up to max_attempts tokens and refill continuously at
+    max_attempts per decay period, which allows short bursts.
+    """
+    def _hit(self, key: str, max_attempts: int, decay_seconds: float, now: float) -> RateLimitResult:
+        rate = max_attempts / decay_seconds
+        entry = self._entries.get(key)
+
+        if entry is None:
+            tokens = float(max_attempts)
+            entry = self._entries[key] = [tokens, now, rate, max_attempts]
+        else:
+            tokens = min(float(max_attempts), entry[0] + (now - entry[1]) * rate)
+            entry[2] = rate
+            entry[3] = max_attempts
+
+        entry[1] = now
+        if tokens >= 1:
+            entry[0] = tokens - 1
+            return RateLimitResult(True, max_attempts, int(entry[0]), 0.0)
+
+        entry[0] = tokens
+        return RateLimitResult(False, max_attempts, 0, (1 - tokens) / rate)
+
+    def _is_idle(self, entry: List[float], now: float, decay_seconds: float) -> bool:
+        # A bucket that has refilled completely is indistinguishable from a new one
+        return entry[0] + (now - entry[1]) * entry[2] >= entry[3]
+
+class SQLiteSlidingWindowLimiter(RateLimiter):
+    """
+    Sliding window counter limiter stored in a SQLite database.
+
+    Every server process on the host opens the same WAL-mode database, so a
+    client's budget is shared by all workers instead of multiplied by them.
+    Each hit is a single row read and upsert inside an immediate transaction.
+    """
+    def __init__(self, path: Optional[str] = None, purge_interval: float = 60, timeout: float = 5.0):
+        self.path = str(path or Path('storage') / 'framework' / 'cache' / 'rate_limiter.sqlite')
+        self.purge_interval = purge_interval
+        self.timeout = timeout
+        self._local = threading.local()
+        self._next_purge = 0.0
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection()
+
+    def attempt(self, key: str, max_attempts: int, decay_seconds: float, now: float = None) -> RateLimitResult:
+        if now is None:
+            now = time.time()
+        window_start = now - (now % decay_seconds)
+        connection = self._connection()
+
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            if now >= self._next_purge:
+                connection.execute('DELETE FROM rate_limits WHERE window_start + 2 * decay <= ?', (now,))
+                self._next_purge = now + self.purge_interval
+
+            row = connection.execute(
+                'SELECT window_start, current, previous FROM rate_limits WHERE key = ?', (key,)
+            ).fetchone()
+            current, previous = 0, 0
+            if row is not None:
+                if row[0] == window_start:
+                    current, previous = row[1], row[2]
+                elif row[0] == window_start - decay_seconds:
+                    previous = row[1]
+
+            result = sliding_window_decision(current, previous, window_start, max_attempts, decay_seconds, now)
+            if result.allowed:
+                current += 1
+            connection.execute(
+                'INSERT INTO rate_limits (key, window_start, current, previous, decay) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET window_start = excluded.window_start, '
+                'current = excluded.current, previous = excluded.previous, decay = excluded.decay',
+                (key, window_start, current, previous, decay_seconds)
+            )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return result
+
+    def clear(self, key: str) -> None:
+        self._connection().execute('DELETE FROM rate_limits WHERE key = ?', (key,))
+
+    def __getstate__(self) -> Dict[str, object]:
+        return {'path': self.path, 'purge_interval': self.purge_interval, 'timeout': self.timeout}
+
+    def __setstate__(self, state: Dict[str, object]) -> None:
+        self.__init__(**state)
+
+    def __len__(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM rate_limits').fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the connection for this thread, reopening it after a fork"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS rate_limits ('
+            'key TEXT PRIMARY KEY, window_start REAL NOT NULL, current INTEGER NOT NULL, '
+            'previous INTEGER NOT NULL, decay REAL NOT NULL)'
+        )
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+def make_limiter(driver: Optional[str] = None) -> RateLimiter:
+    """Create the rate limiter configured in cache.limiter"""
+    driver = driver or config('cache.limiter.driver', 'memory')
+    if driver == 'sqlite':
+        return SQLiteSlidingWindowLimiter(config('cache.limiter.path') or None)
+    if driver == 'token_bucket':
+        return TokenBucketLimiter()
+    if driver == 'memory':
+        return SlidingWindowLimiter()
+    raise ValueError(f"Unsupported rate limiter driver: {driver}")
+
+def sliding_window_decision(current: int, previous: int, window_start: float, max_attempts: int,
+                            decay_seconds: float, now: float) -> RateLimitResult:
+    """Decide a sliding window hit from the current and previous window counts"""
+    weight = 1 - (now - window_start) / decay_seconds
+    estimated = previous * weight + current
+
+    if estimated + 1 <= max_attempts:
+        remaining = int(max_attempts - estimated - 1)
+        return RateLimitResult(True, max_attempts, max(remaining, 0), 0.0)
+
+    if current + 1 <= max_attempts:
+        # The previous window is what holds us back; wait for it to slide out
+        available_at = window_start + decay_seconds * (1 - (max_attempts - current - 1) / previous)
+    else:
+        # Wait until this window's hits have slid far enough into the past
+        available_at = window_start + decay_seconds * (2 - (max_attempts - 1) / current)
+
+    return RateLimitResult(False, max_attempts, 0, max(available_at - now, 0.0))
+
+def retry_after_seconds(result: RateLimitResult) -> int:
+    """Whole seconds a client should wait, as sent in Retry-After"""
+    return max(1, math.ceil(result.retry_after))
@@ -1,20 +1,112 @@
-from typing import Dict, Any, List, Optional
+from contextvars import ContextVar
+from http.cookies import CookieError, SimpleCookie
+from typing import Dict, Any, Iterator, List, Optional, Union
+from urllib.parse import parse_qsl
+import asyncio
+import json
 from core.foundation.application import Application
+from core.http import BodyError, BodyTooLarge
+from core.http.upload import MultipartReader, UploadedFile, is_multipart
 from core.exceptions.validation import ValidationException
 
+# Per thread and per asyncio task, so concurrent requests never see each other
+_current_request: ContextVar[Optional['Request']] = ContextVar('current_request', default=None)
+
+_UNSET = object()
+
+class BodyReader:
+    """Request body read from a blocking file object as it is consumed"""
+
+    def __init__(self, file: Any, length: int, chunk_size: int = 64 * 1024):
+        self._file = file
+        self._chunk_size = chunk_size
+        # Bytes of the body still in the connection
+        self.remaining = length
+
+    def __iter__(self) -> Iterator[bytes]:
+        while self.remaining:
+            chunk = self._file.read(min(self.remaining, self._chunk_size))
+            if not chunk:
+                raise BodyError("Request body ended before Content-Length")
+            self.remaining -= len(chunk)
+            yield chunk
+
+    def read(self) -> bytes:
+        """Read the rest of the body"""
+        return b''.join(self)
+
+class _BufferedStream:
+    """A body that was already read, iterable like the stream it came from"""
+
+    def __init__(self, body: bytes):
+        self._body = body
+
+    def __iter__(self) -> Iterator[bytes]:
+        if self._body:
+            yield self._body
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        if self._body:
+            yield self._body
+
+    async def read(self) -> bytes:
+        return self._body
+
+def _ensure_off_loop(loop: asyncio.AbstractEventLoop) -> None:
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        # Blocking here would stop the loop that has to deliver the body
+        raise RuntimeError("Read the body of an async request with 'await request.read()' first")
+
+def _pull_chunks(stream: Any) -> Iterator[bytes]:
+    chunks = stream.__aiter__()
+    while True:
+        chunk = asyncio.run_coroutine_threadsafe(_next_chunk(chunks), stream.loop).result()
+        if chunk is None:
+            return
+        yield chunk
+
+async def _next_chunk(chunks: Any) -> Optional[bytes]:
+    try:
+        return await chunks.__anext__()
+    except StopAsyncIteration:
+        return None
+
 class Request:
     """
     Base request class for handling form requests and validation
     """
-    _current_request = None
     
-    def __init__(self, app: Application, method: str, path: str, headers: Dict[str, str], body: Optional[str] = None):
+    def __init__(self, app: Application, method: str, path: str, headers: Dict[str, str],
+                 body: Optional[Union[bytes, str]] = None, client_address: Optional[str] = None,
+                 query_string: str = '', stream: Any = None):
         self.app = app
         self.method = method
         self.path = path
+        # Any mapping the server parsed the headers into; see header() for lookups
         self.headers = headers
-        self.body = body
-        self._previous = None
+        self.client_address = client_address
+        # Raw query string of the URL, without the leading '?'
+        self.query_string = query_string
+        self.route = None
+        # The body is read from the stream (a BodyReader, or an async iterable
+        # with an async read() and the loop it belongs to) on first access
+        self._body = body.encode() if isinstance(body, str) else body
+        self._stream = stream
+        self._json = _UNSET
+        self._form = None
+        self._files = None
+        self._query = None
+        self._cookies = None
+        self._header_fields = None
+        self._current_token = None
+        self._scoped_instances = None
         self._validated_data = {}
         self._errors = {}
         self._authorized = True
@@ -22,16 +114,174 @@ class Request:
     @classmethod
     def current(cls) -> 'Request':
         """Get the current request instance"""
-        return cls._current_request
+        return _current_request.get()
         
     def set_current(self):
         """Set this request as the current request"""
-        self._previous = self._current_request
-        self.__class__._current_request = self
+        self._current_token = _current_request.set(self)
         
     def clear_current(self):
         """Clear the current request"""
-        self.__class__._current_request = self._previous 
+        if self._current_token is not None:
+            _current_request.reset(self._current_token)
+            self._current_token = None
+
+    def ip(self) -> Optional[str]:
+        """Get the client IP address"""
+        return self.client_address
+
+    def header(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Get a request header, ignoring the case of its name"""
+        if self._header_fields is None:
+            self._header_fields = {key.lower(): value for key, value in self.headers.items()}
+        return self._header_fields.get(name.lower(), default)
+
+    def query(self, name: Optional[str] = None, default: Any = None) -> Any:
+        """Get a query string parameter, or all of them without a name"""
+        if self._query is None:
+            self._query = dict(parse_qsl(self.query_string, keep_blank_values=True))
+        if name is None:
+            return self._query
+        return self._query.get(name, default)
+
+    def cookies(self) -> Dict[str, str]:
+        """Get the cookies sent with the request"""
+        if self._cookies is None:
+            cookie = SimpleCookie()
+            try:
+                cookie.load(self.header('Cookie', ''))
+            except CookieError:
+                pass
+            self._cookies = {name: morsel.value for name, morsel in cookie.items()}
+        return self._cookies
+
+    def cookie(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Get a cookie sent with the request"""
+        return self.cookies().get(name, default)
+
+    def body(self) -> bytes:
+        """Get the raw request body, reading it on first access"""
+        if self._body is None:
+            self._body = self._read_stream()
+        return self._body
+
+    async def read(self) -> bytes:
+        """
+        Receive the body without blocking the event loop, so json(), form()
+        and files() can be used in async actions. A multipart body is parsed
+        as it arrives instead of being buffered, and b'' is returned for it.
+        """
+        if self._body is None and hasattr(self._stream, '__aiter__'):
+            if self._files is None and is_multipart(self.header('Content-Type')):
+                reader = MultipartReader(self.header('Content-Type'))
+                try:
+                    async for chunk in self.stream():
+                        reader.write(chunk)
+                except BaseException:
+                    reader.close()
+                    raise
+                self._form, self._files = reader.finish()
+            else:
+                self._body = await self._stream.read()
+        return self.body()
+
+    def stream(self) -> Any:
+        """
+        Get the body as chunks while they arrive, without buffering it.
+
+        On the threaded server this is an iterator; on the asyncio server
+        and ASGI it is an async iterable with an awaitable read(). A body
+        that was already read is replayed as one chunk.
+        """
+        if self._body is not None:
+            return _BufferedStream(self._body)
+        stream, self._stream = self._stream, None
+        if stream is None:
+            # Streamed once already; the connection has nothing left to give
+            self._body = b''
+            return _BufferedStream(b'')
+        return stream
+
+    def json(self) -> Any:
+        """Get the body decoded as JSON, an empty dict when there is none"""
+        if self._json is _UNSET:
+            body = self.body()
+            if not body.strip():
+                self._json = {}
+            else:
+                try:
+                    self._json = json.loads(body)
+                except ValueError:
+                    raise BodyError("Invalid JSON in request body") from None
+        return self._json
+
+    def form(self) -> Dict[str, str]:
+        """Get the fields of an application/x-www-form-urlencoded or multipart/form-data body"""
+        if self._form is None:
+            content_type = self.header('Content-Type')
+            if is_multipart(content_type):
+                self._parse_multipart()
+            elif (content_type or '').partition(';')[0].strip().lower() not in ('', 'application/x-www-form-urlencoded'):
+                self._form = {}
+            else:
+                try:
+                    self._form = dict(parse_qsl(self.body().decode(), keep_blank_values=True))
+                except UnicodeDecodeError:
+                    raise BodyError("Invalid form data in request body") from None
+        return self._form
+
+    def files(self) -> Dict[str, UploadedFile]:
+        """Get the files of a multipart/form-data body, parsed as the body streams in"""
+        if self._files is None:
+            if is_multipart(self.header('Content-Type')):
+                self._parse_multipart()
+            else:
+                self._files = {}
+        return self._files
+
+    def file(self, name: str) -> Optional[UploadedFile]:
+        """Get an uploaded file by its field name"""
+        return self.files().get(name)
+
+    def scoped_instances(self) -> Dict[Any, Any]:
+        """Instances of the container's scoped bindings, which live as long as this request"""
+        if self._scoped_instances is None:
+            self._scoped_instances = {}
+        return self._scoped_instances
+
+    def close(self) -> None:
+        """Release the uploaded files and scoped instances once the response has been sent"""
+        for upload in (self._files or {}).values():
+            upload.close()
+        self._scoped_instances = None
+
+    def _parse_multipart(self) -> None:
+        reader = MultipartReader(self.header('Content-Type'))
+        try:
+            for chunk in self._sync_chunks():
+                reader.write(chunk)
+        except BaseException:
+            reader.close()
+            raise
+        self._form, self._files = reader.finish()
+
+    def _read_stream(self) -> bytes:
+        stream = self._stream
+        self._stream = None
+        if stream is None:
+            return b''
+        if not hasattr(stream, '__aiter__'):
+            return stream.read()
+        _ensure_off_loop(stream.loop)
+        return asyncio.run_coroutine_threadsafe(stream.read(), stream.loop).result()
+
+    def _sync_chunks(self) -> Iterator[bytes]:
+        """The body chunks as they arrive, pulled through the server loop when the stream is async"""
+        stream = self.stream()
+        if hasattr(stream, '__iter__'):
+            return iter(stream)
+        _ensure_off_loop(stream.loop)
+        return _pull_chunks(stream)
 
     def rules(self) -> Dict[str, List[str]]:
         """
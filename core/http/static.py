@@ -0,0 +1,262 @@
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple, Union
+import mimetypes
+import os
+import re
+import threading
+import time
+
+class StaticFile(NamedTuple):
+    """Metadata of a file served from a static directory"""
+    path: str
+    size: int
+    mtime: float
+    etag: str
+    last_modified: str
+    content_type: str
+    # Precompressed siblings (.br, .gz) as (content coding, file) pairs, preferred first
+    encodings: Tuple[Tuple[str, 'StaticFile'], ...] = ()
+
+class StaticResponse(NamedTuple):
+    """How to answer a static file request: status, headers and the byte range to send"""
+    status: int
+    headers: Dict[str, str]
+    file: Optional[StaticFile]
+    offset: int
+    length: int
+
+# Precompressed variants written by asset:build, in order of preference
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+# Names asset:build gives its outputs: name.<16 hex digits of the content hash>.ext
+FINGERPRINTED = re.compile(r'\.[0-9a-f]{16}(\.[^./]+)?$')
+
+class StaticFiles:
+    """
+    Static files served from a directory.
+
+    File metadata (size, mtime, ETag, content type, precompressed siblings)
+    is cached in memory so a hit does not stat or hash the file; entries are
+    revalidated against the file's mtime at most once per revalidate
+    seconds. prepare() picks the .br/.gz variant the client accepts and
+    answers conditional (If-None-Match / If-Modified-Since) and Range
+    requests; sending the bytes is left to the server, which can use
+    sendfile(). Files under immutable_prefix whose names carry a content
+    hash are cached by clients for a year; other files there, such as the
+    build manifest, must be revalidated on every use.
+    """
+
+    def __init__(self, directory: Union[str, Path], max_entries: int = 1024, revalidate: float = 1.0,
+                 max_age: Optional[int] = None, immutable_prefix: Optional[str] = 'build/'):
+        self.directory = os.path.realpath(directory)
+        self.max_entries = max_entries
+        self.revalidate = revalidate
+        self.max_age = max_age
+        self.immutable_prefix = immutable_prefix
+        self._entries: 'OrderedDict[str, Tuple[float, StaticFile]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, relative_path: str) -> Optional[str]:
+        """Absolute path of a file inside the directory, or None if it escapes it"""
+        path = os.path.realpath(os.path.join(self.directory, relative_path.lstrip('/')))
+        if os.path.commonpath([self.directory, path]) != self.directory:
+            return None
+        return path
+
+    def lookup(self, path: str) -> Optional[StaticFile]:
+        """Get the metadata of a resolved path, or None if it is not a file"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and now - cached[0] < self.revalidate:
+                self._entries.move_to_end(path)
+                return cached[1]
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._forget(path)
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        if cached is not None and cached[1].mtime == stat.st_mtime and cached[1].size == stat.st_size:
+            file = cached[1]
+        else:
+            content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            encodings = []
+            for coding, suffix in PRECOMPRESSED:
+                try:
+                    variant = os.stat(path + suffix)
+                except OSError:
+                    continue
+                encodings.append((coding, StaticFile(
+                    path=path + suffix,
+                    size=variant.st_size,
+                    mtime=stat.st_mtime,
+                    etag=f'"{variant.st_size:x}-{variant.st_mtime_ns:x}-{coding}"',
+                    last_modified=formatdate(stat.st_mtime, usegmt=True),
+                    content_type=content_type
+                )))
+            file = StaticFile(
+                path=path,
+                size=stat.st_size,
+                mtime=stat.st_mtime,
+                etag=f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"',
+                last_modified=formatdate(stat.st_mtime, usegmt=True),
+                content_type=content_type,
+                encodings=tuple(encodings)
+            )
+
+        with self._lock:
+            self._entries[path] = (now, file)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return file
+
+    def prepare(self, relative_path: str, headers: Dict[str, str]) -> StaticResponse:
+        """Decide the response to a GET for the file, honouring conditional and Range headers"""
+        path = self.resolve(relative_path)
+        if path is None:
+            return StaticResponse(403, {}, None, 0, 0)
+        file = self.lookup(path)
+        if file is None:
+            return StaticResponse(404, {}, None, 0, 0)
+
+        fields = {name.lower(): value for name, value in headers.items()}
+        response_headers = {'Content-Type': file.content_type}
+        if file.encodings:
+            response_headers['Vary'] = 'Accept-Encoding'
+            coding, variant = self._negotiate(file, fields.get('accept-encoding', ''))
+            if variant is not None:
+                response_headers['Content-Encoding'] = coding
+                file = variant
+        response_headers['ETag'] = file.etag
+        response_headers['Last-Modified'] = file.last_modified
+        response_headers['Accept-Ranges'] = 'bytes'
+
+        relative_path = relative_path.lstrip('/')
+        if self.immutable_prefix and relative_path.startswith(self.immutable_prefix):
+            if FINGERPRINTED.search(os.path.basename(relative_path)):
+                response_headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+            else:
+                response_headers['Cache-Control'] = 'no-cache'
+        elif self.max_age is not None:
+            response_headers['Cache-Control'] = f'public, max-age={self.max_age}'
+
+        if self._not_modified(file, fields):
+            return StaticResponse(304, response_headers, file, 0, 0)
+
+        requested = fields.get('range')
+        if requested and self._if_range_matches(file, fields.get('if-range')):
+            byte_range = parse_range(requested, file.size)
+            if byte_range is None:
+                response_headers['Content-Range'] = f'bytes */{file.size}'
+                response_headers['Content-Length'] = '0'
+                return StaticResponse(416, response_headers, None, 0, 0)
+            if byte_range is not NotImplemented:
+                start, end = byte_range
+                response_headers['Content-Range'] = f'bytes {start}-{end}/{file.size}'
+                response_headers['Content-Length'] = str(end - start + 1)
+                return StaticResponse(206, response_headers, file, start, end - start + 1)
+
+        response_headers['Content-Length'] = str(file.size)
+        return StaticResponse(200, response_headers, file, 0, file.size)
+
+    def _forget(self, path: str) -> None:
+        with self._lock:
+            self._entries.pop(path, None)
+
+    def _negotiate(self, file: StaticFile, accept_encoding: str) -> Tuple[Optional[str], Optional[StaticFile]]:
+        """Pick the preferred precompressed variant the client accepts"""
+        accepted = accepted_encodings(accept_encoding)
+        for coding, variant in file.encodings:
+            if accepted.get(coding, accepted.get('*', 0)) > 0:
+                return coding, variant
+        return None, None
+
+    def _not_modified(self, file: StaticFile, fields: Dict[str, str]) -> bool:
+        return not_modified(fields.get('if-none-match'), fields.get('if-modified-since'), file.etag, file.mtime)
+
+    def _if_range_matches(self, file: StaticFile, if_range: Optional[str]) -> bool:
+        """A Range is only honoured if the client's copy is still current"""
+        if not if_range:
+            return True
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            return if_range == file.etag
+        return if_range == file.last_modified
+
+def not_modified(if_none_match: Optional[str], if_modified_since: Optional[str],
+                 etag: Optional[str], mtime: Optional[float]) -> bool:
+    """
+    Determine if a client's cached copy is current, so 304 can be sent.
+
+    If-None-Match takes precedence and uses weak comparison;
+    If-Modified-Since is only consulted without it.
+    """
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or any(tag.removeprefix('W/') == etag.removeprefix('W/') for tag in tags)
+
+    if if_modified_since and mtime is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Parse Accept-Encoding into content codings and their q-values"""
+    accepted: Dict[str, float] = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+def parse_range(header: str, size: int):
+    """
+    Parse a single byte range into inclusive (start, end) offsets.
+
+    Returns None when the range cannot be satisfied and NotImplemented for
+    headers that are ignored (other units, multiple ranges), which are
+    answered with the full file.
+    """
+    unit, _, ranges = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in ranges:
+        return NotImplemented
+
+    first, sep, last = ranges.strip().partition('-')
+    if not sep:
+        return NotImplemented
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                return None
+            return max(size - suffix, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return NotImplemented
+
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
@@ -0,0 +1,215 @@
+"""
+Streaming multipart/form-data parsing
+
+MultipartReader is fed the request body chunk by chunk as it arrives.
+Text fields are kept in memory up to max_field_size; files are written
+to a SpooledTemporaryFile that stays in memory up to spool_size and then
+moves to storage/app/tmp, while their size and SHA-256 are computed on
+the way through. Memory per upload is bounded by those two limits, not
+by the size of the files.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+from core.config.loader import env
+from core.http import BodyError, BodyTooLarge
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:
+    try:
+        from multipart.multipart import MultipartParser, parse_options_header
+    except ImportError:
+        MultipartParser = parse_options_header = None
+
+DEFAULT_SPOOL_SIZE = 1024 * 1024
+DEFAULT_MAX_FIELD_SIZE = 1024 * 1024
+DEFAULT_TMP_PATH = Path(__file__).parent.parent.parent / 'storage' / 'app' / 'tmp'
+
+_COPY_CHUNK_SIZE = 64 * 1024
+
+def is_multipart(content_type: Optional[str]) -> bool:
+    """Determine if a Content-Type is multipart/form-data"""
+    return (content_type or '').partition(';')[0].strip().lower() == 'multipart/form-data'
+
+class UploadedFile:
+    """A file from a multipart upload, in memory or spooled to disk"""
+
+    def __init__(self, name: str, filename: str, content_type: str, spool_size: int = DEFAULT_SPOOL_SIZE,
+                 directory: Optional[Union[str, Path]] = None):
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.size = 0
+        self.spool_size = spool_size
+        self.file = tempfile.SpooledTemporaryFile(max_size=spool_size, prefix='upload-', dir=directory)
+        self._hash = hashlib.sha256()
+
+    @property
+    def hash(self) -> str:
+        """SHA-256 of the content, as hex"""
+        return self._hash.hexdigest()
+
+    @property
+    def in_memory(self) -> bool:
+        """Determine if the content is still held in memory rather than in a temp file"""
+        return self.size <= self.spool_size
+
+    def write(self, data: bytes) -> None:
+        """Append a chunk of the upload"""
+        self.file.write(data)
+        self.size += len(data)
+        self._hash.update(data)
+
+    def read(self) -> bytes:
+        """Read the whole content; prefer save() or file for large uploads"""
+        self.file.seek(0)
+        return self.file.read()
+
+    def save(self, path: Union[str, Path]) -> Path:
+        """Copy the content to path, chunk by chunk"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.file.seek(0)
+        with open(path, 'wb') as target:
+            shutil.copyfileobj(self.file, target, _COPY_CHUNK_SIZE)
+        return path
+
+    def close(self) -> None:
+        """Release the memory or temp file holding the content"""
+        self.file.close()
+
+    def __repr__(self) -> str:
+        return f"<UploadedFile {self.name}={self.filename!r} ({self.size} bytes)>"
+
+class MultipartReader:
+    """
+    Incremental multipart/form-data parser: write() the body chunks as they
+    arrive, then finish() to get the fields and files.
+
+    A field or file name sent more than once keeps its last value.
+    """
+
+    def __init__(self, content_type: str, spool_size: Optional[int] = None, max_field_size: int = DEFAULT_MAX_FIELD_SIZE,
+                 directory: Optional[Union[str, Path]] = None):
+        if MultipartParser is None:
+            raise RuntimeError("Multipart uploads require the 'python-multipart' package")
+        _, params = parse_options_header(content_type)
+        boundary = params.get(b'boundary')
+        if not boundary:
+            raise BodyError("Missing multipart boundary")
+
+        self.spool_size = spool_size if spool_size is not None else env('UPLOAD_SPOOL_SIZE', DEFAULT_SPOOL_SIZE)
+        self.max_field_size = max_field_size
+        self.directory = Path(directory or env('UPLOAD_TMP_PATH', None) or DEFAULT_TMP_PATH)
+        self.fields: Dict[str, str] = {}
+        self.files: Dict[str, UploadedFile] = {}
+        self._directory_ready = False
+        self._ended = False
+        self._headers: Dict[str, str] = {}
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._name = ''
+        self._value = bytearray()
+        self._file: Optional[UploadedFile] = None
+        self._parser = MultipartParser(boundary, {
+            'on_part_begin': self._on_part_begin,
+            'on_header_field': self._on_header_field,
+            'on_header_value': self._on_header_value,
+            'on_header_end': self._on_header_end,
+            'on_headers_finished': self._on_headers_finished,
+            'on_part_data': self._on_part_data,
+            'on_part_end': self._on_part_end,
+            'on_end': self._on_end,
+        })
+
+    def write(self, chunk: bytes) -> None:
+        """Parse the next chunk of the body"""
+        try:
+            self._parser.write(chunk)
+        except BodyError:
+            self.close()
+            raise
+        except ValueError:
+            self.close()
+            raise BodyError("Malformed multipart body") from None
+
+    def finish(self) -> Tuple[Dict[str, str], Dict[str, UploadedFile]]:
+        """Check the body ended properly and get its fields and files"""
+        self._parser.finalize()
+        if not self._ended:
+            self.close()
+            raise BodyError("Multipart body ended before its closing boundary")
+        return self.fields, self.files
+
+    def close(self) -> None:
+        """Release the uploads parsed so far"""
+        for upload in self.files.values():
+            upload.close()
+        if self._file is not None:
+            self._file.close()
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+        self._name = ''
+        self._value = bytearray()
+        self._file = None
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.decode('latin-1').lower()] = self._header_value.decode('latin-1')
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+
+    def _on_headers_finished(self) -> None:
+        _, params = parse_options_header(self._headers.get('content-disposition', ''))
+        self._name = params.get(b'name', b'').decode('utf-8', 'replace')
+        filename = params.get(b'filename')
+        if filename is not None:
+            if not self._directory_ready:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._directory_ready = True
+            self._file = UploadedFile(
+                self._name,
+                os.path.basename(filename.decode('utf-8', 'replace')),
+                self._headers.get('content-type', 'application/octet-stream'),
+                self.spool_size,
+                self.directory
+            )
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._file is not None:
+            self._file.write(data[start:end])
+            return
+        self._value += data[start:end]
+        if len(self._value) > self.max_field_size:
+            raise BodyTooLarge(f"Form field '{self._name}' exceeds {self.max_field_size} bytes")
+
+    def _on_part_end(self) -> None:
+        if self._file is not None:
+            self._file.file.seek(0)
+            previous = self.files.pop(self._name, None)
+            if previous is not None:
+                previous.close()
+            # A file input left empty is sent with no filename and no content
+            if self._file.filename or self._file.size:
+                self.files[self._name] = self._file
+            else:
+                self._file.close()
+            self._file = None
+            return
+        try:
+            self.fields[self._name] = self._value.decode('utf-8')
+        except UnicodeDecodeError:
+            raise BodyError(f"Form field '{self._name}' is not valid UTF-8") from None
+
+    def _on_end(self) -> None:
+        self._ended = True
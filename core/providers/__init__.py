@@ -1,7 +1,6 @@
-from core.providers.template_service_provider import TemplateServiceProvider
-from core.providers.route_service_provider import RouteServiceProvider
-
+# Dotted paths, so that importing the list does not import deferred providers
 providers = [
-    TemplateServiceProvider,
-    RouteServiceProvider,
-] 
\ No newline at end of file
+    'core.providers.template_service_provider.TemplateServiceProvider',
+    'core.providers.route_service_provider.RouteServiceProvider',
+    'core.providers.filesystem_service_provider.FilesystemServiceProvider',
+]
@@ -0,0 +1,15 @@
+from core.foundation.service_provider import ServiceProvider
+from core.filesystem.filesystem import filesystem
+
+class FilesystemServiceProvider(ServiceProvider):
+    def provides(self):
+        """Defer the filesystem service until the File facade is used."""
+        return ['file']
+
+    def _register(self):
+        """Register the filesystem service behind the File facade."""
+        self.app.singleton('file', filesystem)
+
+    def _shutdown(self):
+        """Stop the filesystem's I/O thread pool."""
+        filesystem.shutdown()
@@ -1,4 +1,4 @@
-from typing import Any, Dict
+from typing import Any, Dict, List
 from abc import ABC, abstractmethod
 
 class ServiceProvider(ABC):
@@ -20,6 +20,10 @@ class ServiceProvider(ABC):
         self._app = app
         self._boot()
         
+    def provides(self) -> List[str]:
+        """Bindings this provider registers; listing them defers the provider"""
+        return []
+        
     @abstractmethod
     def _register(self):
         """Register bindings in the container"""
@@ -1,7 +1,6 @@
 from core.foundation.service_provider import ServiceProvider
 from core.routing.router import Router
-from routes.web import register_web_routes
-from routes.api import register_api_routes
+from core.routing.cache import cached_routes_path, load_cached_routes
 
 class RouteServiceProvider(ServiceProvider):
     def _register(self):
@@ -10,6 +9,21 @@ class RouteServiceProvider(ServiceProvider):
         
     def _boot(self):
         """Boot the router service."""
+        cached = load_cached_routes(cached_routes_path(self.app.base_path))
+        if cached is not None:
+            # Routes were cached by route:cache; skip the route files entirely
+            self.app.singleton('router', cached)
+            return
+            
         router = self.app.make('router')
+        self.map_routes(router)
+        router.freeze()
+        
+    @staticmethod
+    def map_routes(router: Router) -> Router:
+        """Register the application's web and API routes."""
+        from routes.web import register_web_routes
+        from routes.api import register_api_routes
         register_web_routes(router)
-        register_api_routes(router) 
\ No newline at end of file
+        register_api_routes(router)
+        return router
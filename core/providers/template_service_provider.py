@@ -2,6 +2,10 @@ from core.providers.provider import ServiceProvider
 from core.services.template_engine import TemplateEngine
 
 class TemplateServiceProvider(ServiceProvider):
+    def provides(self):
+        """Defer the template engine until a view is rendered."""
+        return ['template']
+        
     def _register(self):
         """Register the template engine service."""
         self.app.singleton('template', TemplateEngine())
@@ -0,0 +1,67 @@
+"""
+Serialized route cache
+
+The frozen router (flattened URIs, merged group middleware and the
+compiled matcher) is pickled once by `route:cache` so workers can load it
+at boot instead of executing the route files.
+"""
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Optional, Union
+from core.routing.router import Router
+
+# Bump when the layout of a pickled Router changes; older cache files are then ignored
+CACHE_VERSION = 1
+
+def cached_routes_path(base_path: Optional[Union[str, Path]] = None) -> Path:
+    """Get the path of the serialized route cache"""
+    base_path = Path(base_path) if base_path else Path(__file__).parent.parent.parent
+    return base_path / 'bootstrap' / 'cache' / 'routes.pickle'
+
+class RouteCacheError(Exception):
+    """Raised when the routes cannot be serialized"""
+    pass
+
+def cache_routes(router: Router, path: Union[str, Path]) -> Path:
+    """Freeze the router and write it to the cache file"""
+    path = Path(path)
+    router.freeze()
+    try:
+        payload = pickle.dumps((CACHE_VERSION, router), protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        raise RouteCacheError(
+            f"Unable to cache routes: {e}. Route actions and middleware must be importable "
+            f"(no lambdas or closures)."
+        ) from e
+
+    # Write atomically so a booting worker never reads a partial file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix='.routes')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(payload)
+    # Workers may run as another user than the deploy step
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+    return path
+
+def load_cached_routes(path: Union[str, Path]) -> Optional[Router]:
+    """Load the cached router, or None when routes are not cached"""
+    try:
+        with open(path, 'rb') as f:
+            cached = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    if not isinstance(cached, tuple) or len(cached) != 2 or cached[0] != CACHE_VERSION:
+        # Written by a version with another router layout; the route files are used until route:cache runs again
+        return None
+    return cached[1].freeze()
+
+def clear_routes(path: Union[str, Path]) -> bool:
+    """Remove the route cache file"""
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
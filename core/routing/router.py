@@ -1,6 +1,12 @@
-from typing import Any, Dict, List, Optional, Callable
+from typing import Any, Awaitable, Dict, List, NamedTuple, Optional, Callable, Tuple
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import copy
+import functools
 import re
+import threading
 import uuid
 from core.http.middleware.middleware import Middleware
 from core.http import Request
@@ -12,11 +18,15 @@ class Route:
         self.method = method
         self.action = action
         self._middleware: List[Middleware] = []
-        self._parameters: Dict[str, Any] = {}
+        self._segments = uri.split('/')
+        self._pipeline: Optional[Callable[[Request], Any]] = None
+        self._async_pipeline: Optional[Callable[[Request], Awaitable[Any]]] = None
 
     def add_middleware(self, middleware_list: List[Middleware]) -> 'Route':
         """Add middleware to the route"""
         self._middleware.extend(middleware_list)
+        self._pipeline = None
+        self._async_pipeline = None
         return self
 
     @property
@@ -24,39 +34,121 @@ class Route:
         """Get middleware list"""
         return self._middleware
 
-    def handle(self, request: Request) -> Any:
+    def handle(self, request: Request, parameters: Optional[Dict[str, str]] = None) -> Any:
         """Handle the request through middleware and execute the action"""
-        # Extract route parameters
-        self._parameters = self._extract_parameters(request.path)
-        
-        # Create middleware chain
-        def run_action(req: Request) -> Any:
-            # Check if action is a bound method
-            if hasattr(self.action, '__self__'):
-                # Set request on controller instance
-                self.action.__self__.request = req
-                # Call method with parameters
-                if len(self._parameters) > 0:
-                    return self.action(**self._parameters)
-                return self.action()
-            else:
-                # Regular function call
-                if len(self._parameters) > 0:
-                    return self.action(req, **self._parameters)
-                return self.action(req)
+        # Route parameters travel with the request, never on the shared route
+        request.route = self
+        request.route_parameters = self._extract_parameters(request.path) if parameters is None else parameters
+
+        pipeline = self._pipeline
+        if pipeline is None:
+            pipeline = self.compile()
+        return pipeline(request)
+
+    async def handle_async(self, request: Request, parameters: Optional[Dict[str, str]] = None) -> Any:
+        """Handle the request on the event loop, awaiting coroutine actions and middleware"""
+        request.route = self
+        request.route_parameters = self._extract_parameters(request.path) if parameters is None else parameters
+
+        pipeline = self._async_pipeline
+        if pipeline is None:
+            pipeline = self.compile_async()
+        return await pipeline(request)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state['_pipeline'] = None
+        state['_async_pipeline'] = None
+        return state
 
-        # Build middleware chain
-        handler = run_action
+    def compile(self) -> Callable[[Request], Any]:
+        """Build the middleware pipeline once and reuse it for every request"""
+        handler = self._compile_action()
         for middleware in reversed(self._middleware):
-            next_handler = handler
-            handler = lambda req, m=middleware, n=next_handler: m.handle(req, n)
+            handler = _bind_middleware(middleware, handler)
+        self._pipeline = handler
+        return handler
+
+    def compile_async(self) -> Callable[[Request], Awaitable[Any]]:
+        """
+        Build the pipeline used by the asyncio server. Coroutine middleware
+        and actions are awaited on the event loop; blocking ones run off the
+        loop so they cannot stall other connections.
+
+        A blocking action and the blocking middleware directly around it run
+        in one executor call. A run of blocking middleware around coroutine
+        code must park a thread until that code finishes on the loop, so it
+        runs in a bridge executor of its own rather than the loop's default
+        one, which the code it waits for may need.
+        """
+        middleware = self._middleware
+        inner = len(middleware)
+        if asyncio.iscoroutinefunction(self.action):
+            handler = self._bind_action()
+        else:
+            pipeline = self._compile_action()
+            while inner and not asyncio.iscoroutinefunction(middleware[inner - 1].handle):
+                inner -= 1
+                pipeline = _bind_middleware(middleware[inner], pipeline)
+
+            async def run_pipeline(req: Request) -> Any:
+                return await asyncio.to_thread(pipeline, req)
+            handler = run_pipeline
+
+        # Group the remaining middleware into coroutines and runs of blocking ones, outermost first
+        layers: List[Tuple[bool, List[Middleware]]] = []
+        for outer in middleware[:inner]:
+            is_async = asyncio.iscoroutinefunction(outer.handle)
+            if layers and not is_async and not layers[-1][0]:
+                layers[-1][1].append(outer)
+            else:
+                layers.append((is_async, [outer]))
+
+        # Each blocking run only waits on runs nested deeper than itself, never on its own executor
+        depth = sum(not is_async for is_async, _ in layers)
+        for is_async, group in reversed(layers):
+            if is_async:
+                handler = _bind_async_middleware(group[0], handler)
+            else:
+                depth -= 1
+                handler = _bind_blocking_middleware(group, handler, _bridge_executor(depth))
+        self._async_pipeline = handler
+        return handler
+
+    def _compile_action(self) -> Callable[[Request], Any]:
+        """Build the innermost handler that calls the route action"""
+        action = self._bind_action()
+        if asyncio.iscoroutinefunction(self.action):
+            def run_action(req: Request) -> Any:
+                # Blocking servers run coroutine actions to completion
+                return asyncio.run(action(req))
+            return run_action
+        return action
 
-        return handler(request)
+    def _bind_action(self) -> Callable[[Request], Any]:
+        """Adapt the route action to take the request and its route parameters"""
+        action = self.action
+        if hasattr(action, '__self__'):
+            controller, method = action.__self__, getattr(action, '__func__', None)
+            if method is not None and not isinstance(controller, type):
+                def run_action(req: Request) -> Any:
+                    # A shallow copy per request, so concurrent requests never share controller.request
+                    instance = copy.copy(controller)
+                    instance.request = req
+                    return method(instance, **req.route_parameters)
+            else:
+                def run_action(req: Request) -> Any:
+                    return action(**req.route_parameters)
+        else:
+            def run_action(req: Request) -> Any:
+                # Regular function call
+                return action(req, **req.route_parameters)
+        return run_action
 
     def _extract_parameters(self, path: str) -> Dict[str, str]:
         """Extract parameters from the request path"""
         params = {}
-        route_parts = self.uri.split('/')
+        route_parts = self._segments
         path_parts = path.split('/')
 
         if len(route_parts) != len(path_parts):
@@ -69,6 +161,92 @@ class Route:
 
         return params
 
+def _match_segments(node: list, parts: List[str], index: int, values: List[str], method: str,
+                    allowed: set) -> Optional[Tuple[Route, Tuple[str, ...]]]:
+    """
+    Walk the segment tree, trying literal segments before parameters.
+    Paths that match without accepting the method add their methods to allowed.
+    """
+    if index == len(parts):
+        methods = node[2]
+        if not methods:
+            return None
+        found = methods.get(method)
+        if found is None and method == 'HEAD':
+            found = methods.get('GET')
+        if found is None:
+            allowed.update(methods)
+        return found
+
+    child = node[0].get(parts[index])
+    if child is not None:
+        found = _match_segments(child, parts, index + 1, values, method, allowed)
+        if found is not None:
+            return found
+
+    if node[1] is not None:
+        values.append(parts[index])
+        found = _match_segments(node[1], parts, index + 1, values, method, allowed)
+        if found is not None:
+            return found
+        values.pop()
+    return None
+
+def _bind_middleware(middleware: Middleware, next_handler: Callable[[Request], Any]) -> Callable[[Request], Any]:
+    """Bind a middleware to the handler that follows it in the pipeline"""
+    handle = middleware.handle
+
+    def run_middleware(req: Request) -> Any:
+        return handle(req, next_handler)
+    return run_middleware
+
+def _bind_async_middleware(middleware: Middleware,
+                           next_handler: Callable[[Request], Awaitable[Any]]) -> Callable[[Request], Awaitable[Any]]:
+    """Bind a coroutine middleware to the awaitable handler that follows it in the asyncio pipeline"""
+    handle = middleware.handle
+
+    async def run_middleware(req: Request) -> Any:
+        return await handle(req, next_handler)
+    return run_middleware
+
+def _bind_blocking_middleware(middleware_list: List[Middleware], next_handler: Callable[[Request], Awaitable[Any]],
+                              executor: ThreadPoolExecutor) -> Callable[[Request], Awaitable[Any]]:
+    """Bind a run of blocking middleware to the awaitable handler that follows it, in one executor call"""
+    async def run_blocking_middleware(req: Request) -> Any:
+        loop = asyncio.get_running_loop()
+
+        def call_next(next_req: Request) -> Any:
+            # Called from the bridge thread: hand the rest of the pipeline back to the loop
+            return asyncio.run_coroutine_threadsafe(next_handler(next_req), loop).result()
+
+        pipeline = call_next
+        for middleware in reversed(middleware_list):
+            pipeline = _bind_middleware(middleware, pipeline)
+        # Like asyncio.to_thread, run with the caller's context variables
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(executor, functools.partial(context.run, pipeline, req))
+    return run_blocking_middleware
+
+# Bridge executors by nesting depth, shared by every route
+_bridge_executors: Dict[int, ThreadPoolExecutor] = {}
+_bridge_lock = threading.Lock()
+
+def _bridge_executor(depth: int) -> ThreadPoolExecutor:
+    """Executor for blocking middleware wrapping coroutine code, nested depth runs deep"""
+    with _bridge_lock:
+        executor = _bridge_executors.get(depth)
+        if executor is None:
+            executor = ThreadPoolExecutor(thread_name_prefix=f'middleware-bridge-{depth}')
+            _bridge_executors[depth] = executor
+        return executor
+
+class RouteMatch(NamedTuple):
+    """Outcome of a route lookup"""
+    route: Optional[Route]
+    parameters: Dict[str, str]
+    # Methods the path accepts, filled in when no route matched the method
+    allowed: Tuple[str, ...] = ()
+
 class Router:
     """Router class for managing routes"""
     def __init__(self):
@@ -81,42 +259,31 @@ class Router:
             'OPTIONS': []
         }
         self._named_routes: Dict[str, Route] = {}
+        self._matcher: Optional[Tuple[Dict[str, Dict[str, Route]], list]] = None
         
     def get(self, uri: str, action: Callable) -> Route:
         """Register a GET route"""
-        route = Route(uri, 'GET', action)
-        self.routes['GET'].append(route)
-        return route
+        return self._add_route('GET', uri, action)
         
     def post(self, uri: str, action: Callable) -> Route:
         """Register a POST route"""
-        route = Route(uri, 'POST', action)
-        self.routes['POST'].append(route)
-        return route
+        return self._add_route('POST', uri, action)
         
     def put(self, uri: str, action: Callable) -> Route:
         """Register a PUT route"""
-        route = Route(uri, 'PUT', action)
-        self.routes['PUT'].append(route)
-        return route
+        return self._add_route('PUT', uri, action)
         
     def patch(self, uri: str, action: Callable) -> Route:
         """Register a PATCH route"""
-        route = Route(uri, 'PATCH', action)
-        self.routes['PATCH'].append(route)
-        return route
+        return self._add_route('PATCH', uri, action)
         
     def delete(self, uri: str, action: Callable) -> Route:
         """Register a DELETE route"""
-        route = Route(uri, 'DELETE', action)
-        self.routes['DELETE'].append(route)
-        return route
+        return self._add_route('DELETE', uri, action)
         
     def options(self, uri: str, action: Callable) -> Route:
         """Register an OPTIONS route"""
-        route = Route(uri, 'OPTIONS', action)
-        self.routes['OPTIONS'].append(route)
-        return route
+        return self._add_route('OPTIONS', uri, action)
         
     def match(self, methods: List[str], uri: str, action: Callable) -> Route:
         """Register a route that matches multiple methods"""
@@ -133,31 +300,95 @@ class Router:
         """Add a route to the router"""
         route = Route(uri, method, action)
         self.routes[method].append(route)
+        self._matcher = None
         return route
         
     def find_route(self, method: str, uri: str) -> Optional[Route]:
         """Find a route matching the method and URI"""
-        for route in self.routes.get(method, []):
-            if self._match_uri(route.uri, uri):
-                return route
-        return None
-        
-    def _match_uri(self, route_uri: str, request_uri: str) -> bool:
-        """Match a route URI against a request URI"""
-        route_parts = route_uri.split('/')
-        request_parts = request_uri.split('/')
-        
-        if len(route_parts) != len(request_parts):
-            return False
-            
-        for route_part, request_part in zip(route_parts, request_parts):
-            if route_part.startswith('{') and route_part.endswith('}'):
-                continue
-            if route_part != request_part:
-                return False
-                
-        return True
-        
+        resolved = self.resolve(method, uri)
+        return resolved[0] if resolved else None
+
+    def resolve(self, method: str, uri: str) -> Optional[Tuple[Route, Dict[str, str]]]:
+        """Find the route matching the method and URI along with its parameters"""
+        return self._find(method, uri, set())
+
+    def lookup(self, method: str, uri: str) -> RouteMatch:
+        """
+        Match the URI once for every method. When no route accepts the
+        method, the result lists the methods that would have matched, so
+        the caller can tell 405 from 404. HEAD is served by GET routes
+        and OPTIONS is allowed on every known path.
+        """
+        allowed = set()
+        found = self._find(method, uri, allowed)
+        if found is not None:
+            return RouteMatch(found[0], found[1])
+        if allowed:
+            if 'GET' in allowed:
+                allowed.add('HEAD')
+            allowed.add('OPTIONS')
+        return RouteMatch(None, {}, tuple(sorted(allowed)))
+
+    def _find(self, method: str, uri: str, allowed: set) -> Optional[Tuple[Route, Dict[str, str]]]:
+        matcher = self._matcher
+        if matcher is None:
+            matcher = self._compile_matcher()
+        static, tree = matcher
+
+        methods = static.get(uri)
+        if methods is not None:
+            route = methods.get(method)
+            if route is None and method == 'HEAD':
+                route = methods.get('GET')
+            if route is not None:
+                return route, {}
+            allowed.update(methods)
+
+        values: List[str] = []
+        found = _match_segments(tree, uri.split('/'), 0, values, method, allowed)
+        if found is None:
+            return None
+        route, names = found
+        return route, dict(zip(names, values))
+
+    def _compile_matcher(self) -> Tuple[Dict[str, Dict[str, Route]], list]:
+        """
+        Index routes for lookup across all methods: static URIs by exact
+        path, parameterised URIs in a segment tree. Each tree node is
+        [literal children, parameter child, {method: (route, parameter names)}].
+        Static routes and segments take precedence over parameters.
+        """
+        static: Dict[str, Dict[str, Route]] = {}
+        tree = [{}, None, {}]
+        for method, routes in self.routes.items():
+            for route in routes:
+                if '{' not in route.uri:
+                    static.setdefault(route.uri, {}).setdefault(method, route)
+                    continue
+                node = tree
+                names = []
+                for part in route.uri.split('/'):
+                    if part.startswith('{') and part.endswith('}'):
+                        names.append(part[1:-1])
+                        if node[1] is None:
+                            node[1] = [{}, None, {}]
+                        node = node[1]
+                    else:
+                        node = node[0].setdefault(part, [{}, None, {}])
+                node[2].setdefault(method, (route, tuple(names)))
+        self._matcher = (static, tree)
+        return self._matcher
+
+    def freeze(self) -> 'Router':
+        """Compile the route matcher and the middleware pipeline of every route"""
+        if self._matcher is None:
+            self._compile_matcher()
+        for routes in self.routes.values():
+            for route in routes:
+                route.compile()
+                route.compile_async()
+        return self
+
     def get_named_route(self, name: str) -> Optional[Route]:
         """Get a route by name"""
         return self._named_routes.get(name)
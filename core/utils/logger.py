@@ -4,6 +4,7 @@ import logging
 import sys
 import os
 from datetime import datetime
+from core.foundation.service_provider import ServiceProvider
 
 class Logger:
     def __init__(self, name: str = 'app', level: int = logging.INFO):
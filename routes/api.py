@@ -2,6 +2,8 @@ from core.routing.router import Router
 from app.Http.Controllers.user_controller import UserController
 from core.http.middleware.middleware import (
     Authenticate,
+    CacheResponse,
+    ConditionalGet,
     VerifyCsrfToken,
     ThrottleRequests,
     StartSession
@@ -16,7 +18,8 @@ def register_api_routes(router: Router):
     # Group all API routes with common middleware
     api = router.group('/api').middleware([
         StartSession(),  # All API routes will have session support
-        VerifyCsrfToken()  # All API routes will be CSRF protected
+        VerifyCsrfToken(),  # All API routes will be CSRF protected
+        ConditionalGet()  # Polling clients get 304 when the JSON is unchanged
     ])
     
     # User routes group with authentication
@@ -45,6 +48,8 @@ def register_api_routes(router: Router):
     ])
     
     # API documentation (no auth required)
-    api.get('/docs', controller.docs)  # GET /api/docs
+    api.get('/docs', controller.docs).add_middleware([
+        CacheResponse(ttl=300, tags=['docs'])  # Served from the response cache
+    ])  # GET /api/docs
     
     return router 
\ No newline at end of file
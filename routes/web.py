@@ -1,6 +1,7 @@
 from core.http.controllers.controller import Controller
 from core.routing.router import Router
 from core.http.middleware.middleware import (
+    CacheResponse,
     EncryptCookies,
     StartSession,
     VerifyCsrfToken,
@@ -11,6 +12,8 @@ from app.Http.Controllers.welcome_controller import WelcomeController
 def register_web_routes(router: Router):
     """Register web routes"""
     # Home page
-    router.get('/', WelcomeController().index)
+    router.get('/', WelcomeController().index).add_middleware([
+        CacheResponse(ttl=300, tags=['pages'])
+    ])
 
     return router 
\ No newline at end of file
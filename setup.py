@@ -11,7 +11,7 @@ setup(
     url="https://github.com/yourusername/pylevelframework",
     packages=find_packages(include=['core', 'core.*', 'slave', 'slave.*']),
     include_package_data=True,
-    python_requires=">=3.7",
+    python_requires=">=3.9",
     install_requires=[
         "fastapi>=0.68.0",
         "uvicorn>=0.15.0",
@@ -35,10 +35,9 @@ setup(
         "Intended Audience :: Developers",
         "License :: OSI Approved :: MIT License",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.7",
-        "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
         "Framework :: FastAPI",
         "Topic :: Software Development :: Libraries :: Application Frameworks",
     ],
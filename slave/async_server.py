@@ -0,0 +1,396 @@
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http import HTTPStatus
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+from urllib.parse import urlsplit
+from core.http import close_chunks, iterate_chunks, render_error_response, render_route_response, render_unmatched_route
+from core.http.request import BodyError, Request
+from core.http.static import StaticFiles
+
+logger = logging.getLogger('slave.async_server')
+
+class AsyncHTTPServer:
+    """
+    asyncio HTTP/1.1 server for the router.
+
+    Connections are served by coroutines on one event loop, so idle
+    keep-alive clients cost a few kilobytes instead of a thread. Coroutine
+    actions and middleware are awaited on the loop; blocking ones run in a
+    bounded thread pool. Responses are written with drain(), so a slow
+    client only ever holds one response in memory and clients that stop
+    reading are dropped after write_timeout. Iterator responses are sent
+    with chunked transfer encoding as they are produced, and request bodies
+    are read from the connection only as the action consumes them.
+
+    Exposes the same serve_forever/shutdown/server_close interface as
+    PooledHTTPServer, so it can run under the pre-fork master.
+    """
+    # Bytes per second a client must accept while a static file is sent
+    MIN_SEND_RATE = 64 * 1024
+    # Unread bodies up to this size are skipped to keep the connection; larger ones close it
+    max_discard_size = 64 * 1024
+
+    def __init__(self, server_address: Tuple[str, int], app: Any, threads: int = 4, backlog: int = 128,
+                 max_connections: int = 1024, keep_alive_timeout: float = 5.0, keep_alive_max: int = 100,
+                 write_timeout: float = 30.0, max_header_size: int = 65536, max_body_size: int = 10 * 1024 * 1024,
+                 static_files: Optional[StaticFiles] = None, max_requests: int = 0, reuse_port: bool = False, listen_socket: Optional[socket.socket] = None):
+        self.app = app
+        self.router = app.make('router')
+        self.threads = threads
+        self.max_connections = max_connections
+        self.keep_alive_timeout = keep_alive_timeout
+        self.keep_alive_max = keep_alive_max
+        self.write_timeout = write_timeout
+        self.max_header_size = max_header_size
+        self.max_body_size = max_body_size
+        self.static_files = static_files
+        self.max_requests = max_requests
+        self.socket = listen_socket or self._listen(server_address, backlog, reuse_port)
+        self.server_address = self.socket.getsockname()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._stopped = threading.Event()
+        self._connections: Set[asyncio.Task] = set()
+        self._idle: Set[asyncio.Task] = set()
+        self._served = 0
+        self._date = (0, '')
+
+    def serve_forever(self):
+        """Run the event loop until shutdown() is called"""
+        self._stopped.clear()
+        try:
+            asyncio.run(self.serve())
+        finally:
+            self._stopped.set()
+
+    def shutdown(self):
+        """Stop serve_forever and wait for it to finish; safe to call from any thread"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._stopping.set)
+        self._stopped.wait()
+
+    def server_close(self):
+        """Close the listening socket"""
+        self.socket.close()
+
+    async def serve(self):
+        """Accept connections until stopped, then let in-flight requests finish"""
+        self._loop = asyncio.get_running_loop()
+        self._loop.set_default_executor(ThreadPoolExecutor(self.threads, thread_name_prefix='slave-worker'))
+        self._stopping = asyncio.Event()
+
+        server = await asyncio.start_server(self._handle_connection, sock=self.socket, limit=self.max_header_size)
+        try:
+            await self._stopping.wait()
+        finally:
+            server.close()
+            # Idle keep-alive connections are closed now; busy ones after their response
+            for task in list(self._idle):
+                task.cancel()
+            if self._connections:
+                await asyncio.wait(list(self._connections), timeout=self.write_timeout)
+            self._loop = None
+
+    def _listen(self, server_address: Tuple[str, int], backlog: int, reuse_port: bool) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(server_address)
+        sock.listen(backlog)
+        sock.setblocking(False)
+        return sock
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests from one connection until it closes or times out"""
+        if len(self._connections) >= self.max_connections:
+            logger.warning("Connection limit reached, rejecting connection")
+            await self._write_error(writer, 503, {'Retry-After': '1'}, keep_alive=False)
+            writer.close()
+            return
+
+        task = asyncio.current_task()
+        self._connections.add(task)
+        peer = writer.get_extra_info('peername')
+        client_address = peer[0] if peer else None
+        handled = 0
+        try:
+            while not self._stopping.is_set():
+                self._idle.add(task)
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.keep_alive_timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._write_error(writer, 431, keep_alive=False)
+                    return
+                finally:
+                    self._idle.discard(task)
+
+                parsed = self._parse_head(head)
+                if parsed is None:
+                    await self._write_error(writer, 400, keep_alive=False)
+                    return
+                method, target, version, headers, fields = parsed
+
+                if 'transfer-encoding' in fields:
+                    await self._write_error(writer, 411, keep_alive=False)
+                    return
+                try:
+                    length = int(fields.get('content-length', 0))
+                except ValueError:
+                    await self._write_error(writer, 400, keep_alive=False)
+                    return
+                if length > self.max_body_size:
+                    await self._write_error(writer, 413, keep_alive=False)
+                    return
+                # Nothing is read from the body until the action asks for it
+                body = _BodyStream(reader, length, self.keep_alive_timeout) if length else None
+
+                handled += 1
+                connection = fields.get('connection', '').lower()
+                keep_alive = (
+                    (connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close')
+                    and handled < self.keep_alive_max
+                )
+
+                url = urlsplit(target)
+                path = url.path
+                if method in ('GET', 'HEAD') and self.static_files is not None and path.startswith('/static/'):
+                    keep_alive = keep_alive and not self._stopping.is_set()
+                    await self._send_static(writer, path[len('/static/'):], headers, keep_alive, method == 'HEAD')
+                else:
+                    status, response_headers, response_body = await self._dispatch(
+                        method, path, headers, body, client_address, url.query
+                    )
+                    keep_alive = keep_alive and not self._stopping.is_set() and not (
+                        body is not None and body.remaining > self.max_discard_size
+                    )
+                    if method == 'HEAD':
+                        # The headers GET would send; a streamed body is never started
+                        if not isinstance(response_body, bytes):
+                            await close_chunks(response_body)
+                            response_headers = {name: value for name, value in response_headers.items()
+                                                if name.lower() != 'content-length'}
+                        await self._write(writer, status, response_headers, b'', keep_alive)
+                    elif isinstance(response_body, bytes):
+                        await self._write(writer, status, response_headers, response_body, keep_alive)
+                    else:
+                        # HTTP/1.0 clients cannot read chunks; the end of the body is the close
+                        chunked = version != 'HTTP/1.0'
+                        keep_alive = keep_alive and chunked
+                        if not await self._write_stream(writer, status, response_headers, response_body,
+                                                        keep_alive, chunked):
+                            keep_alive = False
+                self._request_served()
+                if not keep_alive:
+                    return
+                if body is not None and body.remaining and not await self._discard_body(body):
+                    return
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    def _parse_head(self, head: bytes):
+        """Parse the request line and headers; None when malformed"""
+        try:
+            lines = head.decode('latin-1').split('\r\n')
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            return None
+        if not version.startswith('HTTP/1.'):
+            return None
+
+        headers: Dict[str, str] = {}
+        fields: Dict[str, str] = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(':')
+            if not sep:
+                return None
+            value = value.strip()
+            headers[name] = value
+            fields[name.lower()] = value
+        return method, target, version, headers, fields
+
+    async def _discard_body(self, body: '_BodyStream') -> bool:
+        """Skip the part of a body the action did not read, so the next request can be parsed"""
+        if body.remaining > self.max_discard_size:
+            return False
+        try:
+            async for _ in body:
+                pass
+        except BodyError:
+            return False
+        return True
+
+    async def _dispatch(self, method: str, path: str, headers: Dict[str, str], body: Optional['_BodyStream'],
+                        client_address: Optional[str], query_string: str = '') -> Tuple[int, Dict[str, str], Any]:
+        """Route the request and render the response"""
+        # The body is only read when the action asks for it
+        request = Request(
+            app=self.app,
+            method=method,
+            path=path,
+            headers=headers,
+            body=None if body is not None else b'',
+            stream=body,
+            client_address=client_address,
+            query_string=query_string
+        )
+
+        request.set_current()
+        try:
+            match = self.router.lookup(method, path)
+            if match.route is None:
+                return render_unmatched_route(method, match.allowed)
+            return render_route_response(await match.route.handle_async(request, match.parameters))
+        except BodyError as e:
+            return render_error_response(e.status_code, str(e))
+        except Exception as e:
+            logger.error(f"Error handling {method} request: {str(e)}")
+            return render_error_response(500, str(e))
+        finally:
+            request.clear_current()
+            request.close()
+
+    async def _send_static(self, writer: asyncio.StreamWriter, path: str, headers: Dict[str, str], keep_alive: bool,
+                           head: bool = False):
+        """Send a static file with the loop's zero-copy sendfile"""
+        static = self.static_files.prepare(path, headers)
+        if static.status in (403, 404):
+            message = "Access denied" if static.status == 403 else "File not found"
+            await self._write(writer, *render_error_response(static.status, message), keep_alive)
+            return
+        if not static.length or head:
+            await self._write(writer, static.status, static.headers, b'', keep_alive)
+            return
+
+        try:
+            f = open(static.file.path, 'rb')
+        except OSError:
+            await self._write(writer, *render_error_response(404, "File not found"), keep_alive)
+            return
+        with f:
+            await self._write(writer, static.status, static.headers, b'', keep_alive)
+            # Large files get longer, but a client must keep reading at MIN_SEND_RATE
+            await asyncio.wait_for(
+                self._loop.sendfile(writer.transport, f, static.offset, static.length),
+                self.write_timeout + static.length / self.MIN_SEND_RATE
+            )
+
+    async def _write(self, writer: asyncio.StreamWriter, status: int, headers: Dict[str, str], body: bytes,
+                     keep_alive: bool):
+        """Write a response and wait until the client has taken it"""
+        lines = [f"HTTP/1.1 {status} {_reason(status)}", f"Date: {self._http_date()}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        lines.append('Connection: keep-alive' if keep_alive else 'Connection: close')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        # Backpressure: do not read the next request until this response is flushed
+        await asyncio.wait_for(writer.drain(), self.write_timeout)
+
+    async def _write_stream(self, writer: asyncio.StreamWriter, status: int, headers: Dict[str, str], body: Any,
+                            keep_alive: bool, chunked: bool) -> bool:
+        """
+        Write a streamed body chunk by chunk, draining after each one.
+        Returns False when the producer failed and the body was cut short,
+        so the connection must be closed.
+        """
+        headers = dict(headers)
+        headers.pop('Content-Length', None)
+        if chunked:
+            headers['Transfer-Encoding'] = 'chunked'
+        await self._write(writer, status, headers, b'', keep_alive)
+        chunks = iterate_chunks(body)
+        try:
+            async for chunk in chunks:
+                writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk) if chunked else chunk)
+                await asyncio.wait_for(writer.drain(), self.write_timeout)
+        except (asyncio.TimeoutError, ConnectionError):
+            raise
+        except Exception as e:
+            # The status is already sent; the missing last chunk tells the client the body is incomplete
+            logger.error(f"Error streaming response: {str(e)}")
+            return False
+        finally:
+            # Close the producer even when the client goes away mid-stream
+            await chunks.aclose()
+        if chunked:
+            writer.write(b'0\r\n\r\n')
+            await asyncio.wait_for(writer.drain(), self.write_timeout)
+        return True
+
+    async def _write_error(self, writer: asyncio.StreamWriter, status: int, headers: Optional[Dict[str, str]] = None,
+                           keep_alive: bool = True):
+        status, error_headers, body = render_error_response(status)
+        error_headers.update(headers or {})
+        try:
+            await self._write(writer, status, error_headers, body, keep_alive)
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+
+    def _http_date(self) -> str:
+        """Date header value, formatted at most once per second"""
+        now = int(time.time())
+        if self._date[0] != now:
+            self._date = (now, formatdate(usegmt=True))
+        return self._date[1]
+
+    def _request_served(self):
+        """Count a served request and stop serving once max_requests is reached"""
+        if not self.max_requests:
+            return
+        self._served += 1
+        if self._served == self.max_requests:
+            logger.info(f"Served {self.max_requests} requests, recycling worker {os.getpid()}")
+            self._stopping.set()
+
+class _BodyStream:
+    """Request body read from the connection as it is consumed"""
+
+    def __init__(self, reader: asyncio.StreamReader, length: int, timeout: float, chunk_size: int = 64 * 1024):
+        # Sync actions in the thread pool read the body through this loop
+        self.loop = asyncio.get_running_loop()
+        self._reader = reader
+        self._timeout = timeout
+        self._chunk_size = chunk_size
+        # Bytes of the body still in the connection
+        self.remaining = length
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._chunks()
+
+    async def _chunks(self) -> AsyncIterator[bytes]:
+        while self.remaining:
+            try:
+                chunk = await asyncio.wait_for(
+                    self._reader.read(min(self.remaining, self._chunk_size)), self._timeout
+                )
+            except (asyncio.TimeoutError, ConnectionError):
+                raise BodyError("Request body ended before Content-Length") from None
+            if not chunk:
+                raise BodyError("Request body ended before Content-Length")
+            self.remaining -= len(chunk)
+            yield chunk
+
+    async def read(self) -> bytes:
+        """Read the rest of the body"""
+        return b''.join([chunk async for chunk in self._chunks()])
+
+def _reason(status: int) -> str:
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return ''
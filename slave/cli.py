@@ -2,6 +2,7 @@ import os
 import click
 import logging
 import asyncio
+from pathlib import Path
 from typing import Optional
 from .process import SlaveProcess
 from .config import Config
@@ -31,8 +32,14 @@ def cli(debug):
 @cli.command()
 @click.option('--host', default='127.0.0.1', help='Host to bind to')
 @click.option('--port', default=8000, help='Port to listen on')
-@click.option('--workers', default=4, help='Number of worker processes')
-def serve(host: str, port: int, workers: int):
+@click.option('--workers', default=None, type=int, help='Number of worker processes (default: SERVER_WORKERS or 4)')
+@click.option('--threads', default=None, type=int, help='Number of threads per worker (default: SERVER_THREADS or 4)')
+@click.option('--max-requests', default=None, type=int, help='Restart a worker after this many requests (0 to disable)')
+@click.option('--reuse-port', is_flag=True, help='Let each worker bind the port with SO_REUSEPORT')
+@click.option('--mode', type=click.Choice(['threaded', 'asyncio']), default=None,
+              help='Serve connections from a thread pool or an asyncio event loop (default: SERVER_MODE or threaded)')
+def serve(host: str, port: int, workers: Optional[int], threads: Optional[int], max_requests: Optional[int],
+          reuse_port: bool, mode: Optional[str]):
     """Start the slave server"""
     try:
         process = SlaveProcess(debug=logging.getLogger().level == logging.DEBUG)
@@ -40,7 +47,11 @@ def serve(host: str, port: int, workers: int):
             host=host,
             port=port,
             workers=workers,
-            process=process
+            process=process,
+            threads=threads,
+            max_requests=max_requests,
+            reuse_port=reuse_port,
+            mode=mode
         )
         server.start()
     except Exception as e:
@@ -377,5 +388,119 @@ def migrate_fresh(force: bool, database: str):
         logger.error(f"Failed to refresh database: {str(e)}")
         raise click.ClickException(str(e))
 
+# Route Commands
+@cli.command('route:cache')
+def route_cache():
+    """Create a route cache file for faster route registration"""
+    try:
+        from core.routing.router import Router
+        from core.routing.cache import cache_routes, cached_routes_path
+        from core.providers.route_service_provider import RouteServiceProvider
+        router = RouteServiceProvider.map_routes(Router())
+        path = cache_routes(router, cached_routes_path())
+        count = sum(len(routes) for routes in router.routes.values())
+        logger.info(f"✓ Cached {count} routes to {path}")
+    except Exception as e:
+        logger.error(f"Failed to cache routes: {str(e)}")
+        raise click.ClickException(str(e))
+
+@cli.command('route:clear')
+def route_clear():
+    """Remove the route cache file"""
+    try:
+        from core.routing.cache import clear_routes, cached_routes_path
+        if clear_routes(cached_routes_path()):
+            logger.info("✓ Route cache cleared")
+        else:
+            logger.info("Route cache was not present")
+    except Exception as e:
+        logger.error(f"Failed to clear route cache: {str(e)}")
+        raise click.ClickException(str(e))
+
+# Config Cache Commands
+@cli.command('config:cache')
+def config_cache():
+    """Create a cache file for faster configuration loading"""
+    try:
+        from dotenv import load_dotenv
+        from core.config.loader import config as config_loader
+        base_path = Path(__file__).parent.parent
+        # Resolve the config against the same environment the server boots with
+        load_dotenv(base_path / '.env')
+        path = config_loader.cache(str(base_path / 'config'))
+        logger.info(f"✓ Cached {len(config_loader.all())} config files to {path}")
+    except Exception as e:
+        logger.error(f"Failed to cache configuration: {str(e)}")
+        raise click.ClickException(str(e))
+
+@cli.command('config:clear')
+def config_clear():
+    """Remove the configuration cache file"""
+    try:
+        from core.config.loader import cached_config_path, clear_cached_config
+        if clear_cached_config(cached_config_path()):
+            logger.info("✓ Configuration cache cleared")
+        else:
+            logger.info("Configuration cache was not present")
+    except Exception as e:
+        logger.error(f"Failed to clear configuration cache: {str(e)}")
+        raise click.ClickException(str(e))
+
+# Profiling Commands
+@cli.command('boot:profile')
+@click.option('--output', default=None,
+              help='Where to write the folded-stack report (default: storage/framework/boot-profile.folded)')
+@click.option('--budget', default=None, type=float,
+              help='Fail when booting takes longer, in milliseconds (default: app.server.boot_budget; 0 disables)')
+@click.option('--top', default=15, help='Number of slowest imports to list')
+def boot_profile(output: Optional[str], budget: Optional[float], top: int):
+    """Profile the application boot: imports, config loading and providers"""
+    try:
+        from core.foundation.boot_profile import profile_boot
+        base_path = Path(__file__).parent.parent
+        profile = profile_boot(root=base_path)
+        path = profile.write_folded(output or base_path / 'storage' / 'framework' / 'boot-profile.folded')
+
+        logger.info(f"Boot took {profile.total * 1000:.1f} ms ({profile.import_time * 1000:.1f} ms importing modules)")
+        for phase, name, seconds in profile.steps:
+            logger.info(f"  {phase:<12} {name:<40} {seconds * 1000:8.1f} ms")
+        logger.info("Slowest imports (self time):")
+        for record in profile.slowest_imports(top):
+            logger.info(f"  {record.module:<53} {record.self_us / 1000:8.1f} ms")
+        logger.info(f"✓ Folded stacks written to {path}")
+    except Exception as e:
+        logger.error(f"Failed to profile boot: {str(e)}")
+        raise click.ClickException(str(e))
+
+    if profile.over_budget(budget):
+        budget = profile.budget if budget is None else budget
+        raise click.ClickException(f"Boot took {profile.total * 1000:.1f} ms, over the {budget:g} ms budget")
+
+# Asset Commands
+@cli.command('asset:build')
+@click.option('--brotli', 'use_brotli', is_flag=True, help='Also write Brotli (.br) variants (requires the brotli package)')
+def asset_build(use_brotli: bool):
+    """Fingerprint and precompress the files in public/"""
+    try:
+        from core.filesystem.asset import BUILD_DIRECTORY, MANIFEST_NAME, build_assets
+        public_path = Path(__file__).parent.parent / 'public'
+        manifest = build_assets(public_path, use_brotli=use_brotli)
+        logger.info(f"✓ Built {len(manifest)} assets into {public_path / BUILD_DIRECTORY / MANIFEST_NAME}")
+    except Exception as e:
+        logger.error(f"Failed to build assets: {str(e)}")
+        raise click.ClickException(str(e))
+
+# Storage Commands
+@cli.command('storage:gc')
+def storage_gc():
+    """Remove stored blobs that no file references any more"""
+    try:
+        from core.filesystem.storage import disk
+        removed, freed = disk().gc()
+        logger.info(f"✓ Removed {removed} orphaned blobs ({freed} bytes)")
+    except Exception as e:
+        logger.error(f"Failed to collect storage garbage: {str(e)}")
+        raise click.ClickException(str(e))
+
 if __name__ == '__main__':
     cli() 
\ No newline at end of file
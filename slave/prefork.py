@@ -0,0 +1,171 @@
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from typing import Dict, Set, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .server import RouterServer
+
+logger = logging.getLogger('slave.prefork')
+
+class PreforkServer:
+    """
+    Pre-fork process manager for the router server.
+
+    The master binds the listening socket once (or leaves binding to the
+    workers with SO_REUSEPORT), forks one worker per core that boots the
+    application and serves requests, and supervises them: crashed workers
+    are replaced, workers retire after max_requests, SIGHUP replaces every
+    worker without closing the socket and SIGTERM/SIGINT shut down.
+    """
+    # Workers that die sooner than this after starting count as crashing on boot
+    MIN_WORKER_LIFETIME = 1.0
+
+    def __init__(self, router_server: 'RouterServer'):
+        self.router_server = router_server
+        self.workers = router_server.workers
+        self.max_requests = router_server.max_requests
+        self.socket = None
+        self._children: Dict[int, float] = {}
+        self._retiring: Set[int] = set()
+        self._reload = False
+        self._stopping = False
+
+    def run(self):
+        """Fork the workers and supervise them until asked to stop"""
+        if not self.router_server.reuse_port:
+            self.socket = self._listen()
+
+        signal.signal(signal.SIGHUP, self._on_reload)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+
+        logger.info(
+            f"Master {os.getpid()} listening on {self.router_server.host}:{self.router_server.port} "
+            f"with {self.workers} workers x {self.router_server.threads} threads"
+        )
+        for _ in range(self.workers):
+            self._spawn()
+
+        try:
+            while not self._stopping:
+                if self._reload:
+                    self._reload = False
+                    self._replace_workers()
+                self._reap()
+                time.sleep(0.1)
+        finally:
+            self._shutdown()
+
+    def _listen(self) -> socket.socket:
+        """Bind the listening socket shared by every worker"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.router_server.host, self.router_server.port))
+        sock.listen(self.router_server.backlog)
+        # Workers race to accept; the losers must not block inside accept()
+        sock.setblocking(False)
+        return sock
+
+    def _spawn(self):
+        """Fork a worker process"""
+        pid = os.fork()
+        if pid:
+            self._children[pid] = time.monotonic()
+            return
+
+        # Worker process: never returns into the master's loop
+        exit_code = 1
+        try:
+            self._serve()
+            exit_code = 0
+        except BaseException:
+            logger.exception(f"Worker {os.getpid()} failed")
+        finally:
+            os._exit(exit_code)
+
+    def _serve(self):
+        """Boot the application in this worker and serve until told to stop"""
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        # Spread recycling so workers do not all restart at once
+        max_requests = self.max_requests
+        if max_requests:
+            max_requests += random.randint(0, max_requests // 10)
+
+        server = self.router_server.create_server(self.socket, max_requests)
+        signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown, daemon=True).start())
+        logger.info(f"Worker {os.getpid()} ready")
+        try:
+            server.serve_forever()
+        finally:
+            # Finishes in-flight requests before the process exits
+            server.server_close()
+
+    def _reap(self):
+        """Collect exited workers and replace the ones that should still be running"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+            started = self._children.pop(pid, None)
+            if pid in self._retiring:
+                self._retiring.discard(pid)
+                continue
+            if self._stopping:
+                continue
+
+            code = os.waitstatus_to_exitcode(status) if hasattr(os, 'waitstatus_to_exitcode') else status
+            if code != 0:
+                logger.warning(f"Worker {pid} exited with status {code}, restarting")
+                if started is not None and time.monotonic() - started < self.MIN_WORKER_LIFETIME:
+                    # Avoid a tight fork loop when workers crash while booting
+                    time.sleep(self.MIN_WORKER_LIFETIME)
+            self._spawn()
+
+    def _replace_workers(self):
+        """Start a new generation of workers, then gracefully stop the old one"""
+        logger.info("Reloading workers")
+        old = [pid for pid in self._children if pid not in self._retiring]
+        for _ in range(self.workers):
+            self._spawn()
+        for pid in old:
+            self._retiring.add(pid)
+            self._signal(pid, signal.SIGTERM)
+
+    def _shutdown(self):
+        """Stop every worker and wait for them to finish their requests"""
+        self._stopping = True
+        logger.info("Shutting down workers")
+        for pid in list(self._children):
+            self._signal(pid, signal.SIGTERM)
+        for pid in list(self._children):
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        self._children.clear()
+        if self.socket is not None:
+            self.socket.close()
+
+    def _signal(self, pid: int, signum: int):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _on_reload(self, signum, frame):
+        self._reload = True
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
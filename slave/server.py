@@ -1,131 +1,153 @@
 import logging
+import queue
+import socket
 import socketserver
-import json
+import threading
 import os
+from contextlib import closing, nullcontext
 from http.server import SimpleHTTPRequestHandler
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from urllib.parse import urlparse, parse_qs
 from .process import SlaveProcess
 import uuid
-from core.services.template_engine import TemplateEngine
+from pathlib import Path
+from dotenv import load_dotenv
+from core.config.loader import env
 from core.facade.template import Template
 from core.foundation.application import Application
-from core.http.request import Request
+from core.http.request import BodyError, BodyReader, Request
+from core.http import Response, close_chunks_sync, iterate_chunks_sync, render_route_response, render_unmatched_route
+from core.http.static import StaticFiles
 
 logger = logging.getLogger('slave.server')
 
 class RouterHandler(SimpleHTTPRequestHandler):
+    # Persistent connections: every response carries a Content-Length
+    protocol_version = 'HTTP/1.1'
+    # Larger bodies are refused with 413 before they are read
+    max_body_size = 10 * 1024 * 1024
+    # An unread body up to this size is discarded to keep the connection; larger ones close it
+    max_discard_size = 64 * 1024
+
     def __init__(self, *args, **kwargs):
         self.process = kwargs.pop('process', None)
-        self.template_engine = TemplateEngine()
-        self.app = Application()
+        # The application is booted once per server, not once per connection
+        self.app = kwargs.pop('app', None) or Application()
         self.router = self.app.make('router')
-        # Set up static file directory
-        self.static_dir = os.path.join(os.getcwd(), 'public')
-        if not os.path.exists(self.static_dir):
-            os.makedirs(self.static_dir)
+        # Static file metadata is cached per server, not per connection
+        self.static_files = kwargs.pop('static_files', None) or StaticFiles(os.path.join(os.getcwd(), 'public'))
+        self._requests_handled = 0
         super().__init__(*args, **kwargs)
 
-    def do_GET(self):
-        """Handle GET requests"""
-        request = None
-        try:
-            # Parse URL
-            parsed_url = urlparse(self.path)
-            path = parsed_url.path
-            query = parse_qs(parsed_url.query)
+    def setup(self):
+        """Apply the server's idle timeout to the connection"""
+        self.timeout = getattr(self.server, 'keep_alive_timeout', None)
+        self.max_body_size = getattr(self.server, 'max_body_size', self.max_body_size)
+        super().setup()
 
-            # Create and set current request
-            request = Request(
-                app=self.app,  # Add app instance
-                method='GET',
-                path=path,
-                headers=dict(self.headers)
-            )
-            request.set_current()  # Set as current request
+    def handle_expect_100(self):
+        """Refuse an oversized upload before the client sends it"""
+        length = self.headers.get('Content-Length', '')
+        if length.isdigit() and int(length) > self.max_body_size:
+            self.send_error(413)
+            return False
+        return super().handle_expect_100()
 
-            # Check if this is a static file request
-            if path.startswith('/static/'):
-                self.serve_static_file(path[7:])  # Remove /static/ prefix
-                return
+    def handle_one_request(self):
+        """Handle a request, then decide whether to keep the connection open"""
+        super().handle_one_request()
+        self._requests_handled += 1
 
-            # Find route
-            route = self.router.find_route('GET', path)
-            if route:
-                # Execute route action with request
-                response = route.handle(request)
-                if isinstance(response, dict):
-                    self.send_json_response(response)
-                else:
-                    self.send_response(200)
-                    self.send_header('Content-Type', 'text/html; charset=utf-8')
-                    self.end_headers()
-                    self.wfile.write(str(response).encode('utf-8'))
-                return
-            else:
-                self.send_error(404, "Route not found")
-        except Exception as e:
-            logger.error(f"Error handling GET request: {str(e)}")
-            self.send_error(500, str(e))
-        finally:
-            if request:
-                request.clear_current()  # Clear current request
+        server = self.server
+        if isinstance(server, PooledHTTPServer):
+            server.request_served()
+            # Hand the worker back when connections are waiting for one
+            if server.has_waiting_connections() or self._requests_handled >= server.keep_alive_max:
+                self.close_connection = True
 
-    def do_POST(self):
-        """Handle POST requests"""
+    def handle_route(self):
+        """Dispatch a request of any method to its route"""
+        method = self.command
         request = None
+        reader = None
+        self._response_started = False
+        if 'Transfer-Encoding' in self.headers:
+            self.send_error(411)
+            return
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            self.send_error(400, "Invalid Content-Length")
+            return
+        if content_length > self.max_body_size:
+            self.send_error(413)
+            return
+
         try:
-            # Parse URL
+            # Nothing is read from the body until the action asks for it
+            reader = BodyReader(self.rfile, content_length) if content_length > 0 else None
             parsed_url = urlparse(self.path)
             path = parsed_url.path
 
-            # Get content length
-            content_length = int(self.headers.get('Content-Length', 0))
-            
-            # Read request body
-            body = self.rfile.read(content_length).decode()
-            
-            # Parse JSON body if content type is application/json
-            if self.headers.get('Content-Type') == 'application/json':
-                try:
-                    body = json.loads(body)
-                except json.JSONDecodeError:
-                    self.send_error(400, "Invalid JSON in request body")
-                    return
+            if method in ('GET', 'HEAD') and path.startswith('/static/'):
+                self.serve_static_file(path[len('/static/'):])
+                return
 
-            # Create request
             request = Request(
-                app=self.app,  # Add app instance
-                method='POST',
+                app=self.app,
+                method=method,
                 path=path,
-                headers=dict(self.headers)
+                headers=self.headers,
+                client_address=self.client_address[0],
+                query_string=parsed_url.query,
+                stream=reader
             )
-            request._json = body if isinstance(body, dict) else {}
-            request.set_current()  # Set as current request
-            
-            # Find route
-            route = self.router.find_route('POST', path)
-            if route:
-                # Execute route action with request
-                response = route.handle(request)
-                if isinstance(response, dict):
-                    self.send_json_response(response)
-                else:
-                    self.send_response(200)
-                    self.send_header('Content-Type', 'text/html; charset=utf-8')
-                    self.end_headers()
-                    self.wfile.write(str(response).encode('utf-8'))
-                return
+            request.set_current()
 
-            # If no route found, send 404
-            self.send_error(404, "Route not found")
-            
+            # One lookup tells a matching route from 405 and 404
+            match = self.router.lookup(method, path)
+            if match.route is None:
+                status, headers, body = render_unmatched_route(method, match.allowed)
+                self.send_route_response(Response(body, status, headers))
+                return
+            self.send_route_response(match.route.handle(request, match.parameters))
+        except BodyError as e:
+            self.send_failure(e.status_code, str(e))
         except Exception as e:
-            logger.error(f"Error handling POST request: {str(e)}")
-            self.send_error(500, str(e))
+            logger.error(f"Error handling {method} request: {str(e)}")
+            self.send_failure(500, str(e))
         finally:
             if request:
-                request.clear_current()  # Clear current request
+                request.clear_current()
+                request.close()
+            if reader is not None and reader.remaining:
+                self.discard_body(reader)
+
+    def end_headers(self):
+        self._response_started = True
+        super().end_headers()
+
+    def send_failure(self, status: int, message: str):
+        """Send an error response, or drop the connection when a response is already under way"""
+        if self._response_started:
+            # A second status line would land in the middle of the body; the
+            # missing last chunk (or the early close) tells the client it is cut short
+            self.close_connection = True
+            return
+        self.send_error(status, message)
+
+    def discard_body(self, body: BodyReader):
+        """Skip the part of a body the action did not read, so the next request can be parsed"""
+        if body.remaining > self.max_discard_size:
+            self.close_connection = True
+            return
+        try:
+            for _ in body:
+                pass
+        except (OSError, BodyError):
+            self.close_connection = True
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_PATCH = do_DELETE = do_OPTIONS = handle_route
 
     def handle_health(self):
         """Handle health check request"""
@@ -148,77 +170,264 @@ class RouterHandler(SimpleHTTPRequestHandler):
         self.send_json_response(response)
 
     def serve_static_file(self, path: str):
-        """Serve a static file"""
-        file_path = os.path.join(self.static_dir, path)
-        
-        # Prevent directory traversal
-        if not os.path.abspath(file_path).startswith(os.path.abspath(self.static_dir)):
+        """Serve a static file with sendfile(), honouring conditional and Range requests"""
+        static = self.static_files.prepare(path, self.headers)
+        if static.status == 403:
             self.send_error(403, "Access denied")
             return
-            
+        if static.status == 404:
+            self.send_error(404, "File not found")
+            return
+
         try:
-            with open(file_path, 'rb') as f:
-                content = f.read()
-                
-            # Set content type based on file extension
-            ext = os.path.splitext(path)[1]
-            content_type = {
-                '.html': 'text/html',
-                '.css': 'text/css',
-                '.js': 'application/javascript',
-                '.json': 'application/json',
-                '.png': 'image/png',
-                '.jpg': 'image/jpeg',
-                '.jpeg': 'image/jpeg',
-                '.gif': 'image/gif',
-                '.ico': 'image/x-icon'
-            }.get(ext.lower(), 'application/octet-stream')
-                
-            self.send_response(200)
-            self.send_header('Content-Type', content_type)
-            self.send_header('Content-Length', str(len(content)))
-            self.end_headers()
-            self.wfile.write(content)
-            
-        except FileNotFoundError:
+            send_body = static.length and self.command != 'HEAD'
+            f = open(static.file.path, 'rb') if send_body else nullcontext()
+        except OSError:
             self.send_error(404, "File not found")
-        except Exception as e:
-            logger.error(f"Error serving static file: {str(e)}")
-            self.send_error(500, str(e))
+            return
 
-    def send_json_response(self, data: Dict[str, Any]):
-        """Send a JSON response"""
-        response = json.dumps(data).encode()
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Content-Length', str(len(response)))
+        with f:
+            self.send_response(static.status)
+            for name, value in static.headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            if send_body:
+                try:
+                    # Zero-copy from the page cache to the socket where the platform supports it
+                    self.connection.sendfile(f, static.offset, static.length)
+                except OSError as e:
+                    logger.error(f"Error serving static file: {str(e)}")
+                    self.close_connection = True
+
+    def send_route_response(self, response: Any):
+        """Send the value returned by a route action"""
+        status, headers, body = render_route_response(response)
+        head = self.command == 'HEAD'
+        if isinstance(body, bytes):
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+            return
+
+        if head:
+            # HEAD gets the headers GET would send; the stream is never started
+            close_chunks_sync(body)
+        # Streamed bodies are chunked on HTTP/1.1; HTTP/1.0 clients read until the close
+        chunked = self.request_version != 'HTTP/1.0'
+        self.send_response(status)
+        for name, value in headers.items():
+            if name.lower() != 'content-length':
+                self.send_header(name, value)
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.close_connection = True
+            self.send_header('Connection', 'close')
         self.end_headers()
-        self.wfile.write(response)
+        if head:
+            return
+        # Close the producer even when the client goes away mid-stream
+        with closing(iterate_chunks_sync(body)) as chunks:
+            for chunk in chunks:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk) if chunked else chunk)
+                self.wfile.flush()
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
+
+    def send_json_response(self, data: Dict[str, Any], status: int = 200, headers: Optional[Dict[str, str]] = None):
+        """Send a JSON response"""
+        self.send_route_response(Response(data, status, headers))
+
+class PooledHTTPServer(socketserver.TCPServer):
+    """
+    TCP server that hands accepted connections to a fixed pool of worker
+    threads through a bounded queue. Connections that arrive while the queue
+    is full are answered with 503 instead of spawning more threads.
+    """
+    allow_reuse_address = True
+
+    def __init__(self, server_address, handler_class, workers: int = 4, backlog: int = 128,
+                 queue_size: int = 64, keep_alive_timeout: float = 5.0, keep_alive_max: int = 100,
+                 max_requests: int = 0, reuse_port: bool = False, listen_socket: Optional[socket.socket] = None,
+                 max_body_size: int = 10 * 1024 * 1024):
+        self.workers = workers
+        self.request_queue_size = backlog
+        self.keep_alive_timeout = keep_alive_timeout
+        self.keep_alive_max = keep_alive_max
+        self.max_requests = max_requests
+        self.max_body_size = max_body_size
+        self.reuse_port = reuse_port
+        self._served = 0
+        self._served_lock = threading.Lock()
+        self._connections: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        super().__init__(server_address, handler_class, bind_and_activate=listen_socket is None)
+        if listen_socket is not None:
+            # Serve a socket that was bound and activated elsewhere (e.g. by a pre-fork master)
+            self.socket.close()
+            self.socket = listen_socket
+            self.server_address = listen_socket.getsockname()
+
+        for index in range(workers):
+            thread = threading.Thread(target=self._work, name=f"slave-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def process_request(self, request, client_address):
+        """Queue the connection for a worker, shedding load when the queue is full"""
+        try:
+            self._connections.put_nowait((request, client_address))
+        except queue.Full:
+            logger.warning(f"Worker queue full, rejecting connection from {client_address[0]}")
+            self._reject(request)
+
+    def server_bind(self):
+        """Bind the socket, sharing the port with sibling processes when reuse_port is set"""
+        if self.reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+    def request_served(self):
+        """Count a served request and stop serving once max_requests is reached"""
+        if not self.max_requests:
+            return
+        with self._served_lock:
+            self._served += 1
+            if self._served != self.max_requests:
+                return
+        logger.info(f"Served {self.max_requests} requests, recycling worker {os.getpid()}")
+        # shutdown() waits for serve_forever, so it must not run on a worker thread it would wait on
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def has_waiting_connections(self) -> bool:
+        """Determine if accepted connections are waiting for a worker"""
+        return not self._connections.empty()
+
+    def server_close(self):
+        """Stop the workers and close the listening socket"""
+        super().server_close()
+        for _ in self._threads:
+            self._connections.put((None, None))
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self):
+        """Serve queued connections until told to stop"""
+        while True:
+            request, client_address = self._connections.get()
+            if request is None:
+                return
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def _reject(self, request):
+        """Answer a connection with 503 and close it"""
+        body = b'Service Unavailable'
+        try:
+            request.settimeout(1.0)
+            request.sendall(
+                b'HTTP/1.1 503 Service Unavailable\r\n'
+                b'Content-Type: text/plain\r\n'
+                b'Content-Length: ' + str(len(body)).encode() + b'\r\n'
+                b'Retry-After: 1\r\n'
+                b'Connection: close\r\n\r\n' + body
+            )
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
 
 class RouterServer:
     def __init__(
         self,
         host: str = '127.0.0.1',
         port: int = 8000,
-        workers: int = 4,
-        process: Optional[SlaveProcess] = None
+        workers: Optional[int] = None,
+        process: Optional[SlaveProcess] = None,
+        threads: Optional[int] = None,
+        backlog: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        keep_alive_timeout: Optional[float] = None,
+        max_requests: Optional[int] = None,
+        reuse_port: bool = False,
+        mode: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_body_size: Optional[int] = None
     ):
+        # Settings may come from .env; load it before the application is booted
+        load_dotenv(Path(__file__).parent.parent / '.env')
         self.host = host
         self.port = port
-        self.workers = workers
         self.process = process or SlaveProcess()
+        self.workers = workers or env('SERVER_WORKERS', 4)
+        self.threads = threads or env('SERVER_THREADS', 4)
+        self.backlog = backlog or env('SERVER_BACKLOG', 128)
+        self.queue_size = queue_size or env('SERVER_QUEUE_SIZE', 64)
+        self.keep_alive_timeout = keep_alive_timeout or env('SERVER_KEEP_ALIVE_TIMEOUT', 5.0)
+        self.max_requests = max_requests if max_requests is not None else env('SERVER_MAX_REQUESTS', 0)
+        self.reuse_port = reuse_port
+        self.mode = mode or env('SERVER_MODE', 'threaded')
+        if self.mode not in ('threaded', 'asyncio'):
+            raise ValueError(f"Unsupported server mode: {self.mode}")
+        self.max_connections = max_connections or env('SERVER_MAX_CONNECTIONS', 1024)
+        self.max_body_size = max_body_size or env('SERVER_MAX_BODY_SIZE', 10 * 1024 * 1024)
+        self.server = None
+
+    def create_server(self, listen_socket: Optional[socket.socket] = None, max_requests: int = 0):
+        """Boot the application and create a threaded or asyncio HTTP server for it"""
+        app = Application()
+        static_files = StaticFiles(app.public_path)
+
+        if self.mode == 'asyncio':
+            from .async_server import AsyncHTTPServer
+            return AsyncHTTPServer(
+                (self.host, self.port),
+                app,
+                threads=self.threads,
+                backlog=self.backlog,
+                max_connections=self.max_connections,
+                keep_alive_timeout=self.keep_alive_timeout,
+                max_body_size=self.max_body_size,
+                static_files=static_files,
+                max_requests=max_requests,
+                reuse_port=self.reuse_port,
+                listen_socket=listen_socket
+            )
         
-        # Create server class
-        class ThreadedTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
-            allow_reuse_address = True
-            
-        # Create handler class that includes process
+        # Create handler class that includes process and the shared application
         def handler(*args, **kwargs):
-            return RouterHandler(*args, process=self.process, **kwargs)
+            return RouterHandler(*args, process=self.process, app=app, static_files=static_files, **kwargs)
             
-        self.server = ThreadedTCPServer((self.host, self.port), handler)
+        return PooledHTTPServer(
+            (self.host, self.port),
+            handler,
+            workers=self.threads,
+            backlog=self.backlog,
+            queue_size=self.queue_size,
+            keep_alive_timeout=self.keep_alive_timeout,
+            max_requests=max_requests,
+            reuse_port=self.reuse_port,
+            listen_socket=listen_socket,
+            max_body_size=self.max_body_size
+        )
 
     def start(self):
         """Start the server"""
-        logger.info(f"Starting server on {self.host}:{self.port} with {self.workers} workers")
-        self.server.serve_forever() 
\ No newline at end of file
+        if self.workers > 1 and hasattr(os, 'fork'):
+            from .prefork import PreforkServer
+            PreforkServer(self).run()
+            return
+
+        self.server = self.create_server()
+        logger.info(f"Starting {self.mode} server on {self.host}:{self.port} with {self.threads} threads")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
@@ -0,0 +1,290 @@
+"""
+Test the ASGI adapter
+"""
+import asyncio
+import json
+import socket
+import threading
+import time
+import unittest
+import urllib.request
+from unittest.mock import MagicMock
+from core.http import Response, StreamedResponse
+from core.http.asgi import ASGIApplication
+from core.routing.router import Router
+
+try:
+    import uvicorn
+except ImportError:
+    uvicorn = None
+
+def _app(router):
+    app = MagicMock()
+    app.make.return_value = router.freeze()
+    return app
+
+def _call(application, method, path, body_chunks=(b'',), headers=()):
+    """Run one HTTP request through the application and collect what it sends"""
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'headers': [(name.encode(), value.encode()) for name, value in headers],
+        'client': ('10.0.0.1', 1234)
+    }
+    messages = [
+        {'type': 'http.request', 'body': chunk, 'more_body': index < len(body_chunks) - 1}
+        for index, chunk in enumerate(body_chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    start = sent[0]
+    return start['status'], dict(start['headers']), [message['body'] for message in sent[1:]]
+
+class TestASGIApplication(unittest.TestCase):
+    """Test the ASGI application"""
+
+    def test_routes_sync_and_async_actions(self):
+        """Test actions receive the request and their route parameters"""
+        async def show(request, id):
+            return {'id': id, 'ip': request.ip()}
+
+        router = Router()
+        router.get('/users/{id}', show)
+        router.get('/plain', lambda request: 'plain')
+        application = ASGIApplication(_app(router))
+
+        status, headers, body = _call(application, 'GET', '/users/7')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'content-type'], b'application/json')
+        self.assertEqual(json.loads(b''.join(body)), {'id': '7', 'ip': '10.0.0.1'})
+        self.assertEqual(_call(application, 'GET', '/plain')[2], [b'plain'])
+        self.assertEqual(_call(application, 'GET', '/missing')[0], 404)
+
+    def test_request_body_is_streamed(self):
+        """Test actions can consume the request body chunk by chunk"""
+        async def upload(request):
+            sizes = [len(chunk) async for chunk in request.stream()]
+            return {'chunks': sizes}
+
+        router = Router()
+        router.post('/upload', upload)
+        application = ASGIApplication(_app(router))
+
+        status, _, body = _call(application, 'POST', '/upload', body_chunks=(b'a' * 10, b'b' * 20, b''))
+        self.assertEqual(json.loads(b''.join(body)), {'chunks': [10, 20]})
+
+    def test_json_body_is_parsed(self):
+        """Test JSON bodies are parsed by request.json() from a sync action"""
+        router = Router()
+        router.post('/echo', lambda request: request.json())
+        application = ASGIApplication(_app(router))
+
+        _, _, body = _call(
+            application, 'POST', '/echo',
+            body_chunks=(b'{"name": ', b'"Ada"}'), headers=[('content-type', 'application/json')]
+        )
+        self.assertEqual(json.loads(b''.join(body)), {'name': 'Ada'})
+
+    def test_async_actions_read_the_body_first(self):
+        """Test async actions await request.read() before json(), and bad JSON gets 400"""
+        async def echo(request):
+            await request.read()
+            return request.json()
+
+        router = Router()
+        router.post('/echo', echo)
+        application = ASGIApplication(_app(router))
+
+        _, _, body = _call(application, 'POST', '/echo', body_chunks=(b'{"a": 1}',))
+        self.assertEqual(json.loads(b''.join(body)), {'a': 1})
+        self.assertEqual(_call(application, 'POST', '/echo', body_chunks=(b'{"a": ',))[0], 400)
+
+    def test_multipart_upload_is_streamed(self):
+        """Test async actions parse multipart uploads as they arrive, sync actions through the loop"""
+        async def upload_async(request):
+            await request.read()
+            return {'title': request.form()['title'], 'size': request.file('doc').size}
+
+        def upload_sync(request):
+            return {'title': request.form()['title'], 'size': request.file('doc').size}
+
+        router = Router()
+        router.post('/async', upload_async)
+        router.post('/sync', upload_sync)
+        application = ASGIApplication(_app(router))
+
+        body = (b'--b\r\nContent-Disposition: form-data; name="title"\r\n\r\nReport\r\n'
+                b'--b\r\nContent-Disposition: form-data; name="doc"; filename="r.txt"\r\n\r\n'
+                + b'x' * 3000 + b'\r\n--b--\r\n')
+        chunks = tuple(body[start:start + 1000] for start in range(0, len(body), 1000))
+        headers = [('content-type', 'multipart/form-data; boundary=b')]
+        for path in ('/async', '/sync'):
+            _, _, sent = _call(application, 'POST', path, body_chunks=chunks, headers=headers)
+            self.assertEqual(json.loads(b''.join(sent)), {'title': 'Report', 'size': 3000})
+
+    def test_oversized_body_is_rejected(self):
+        """Test bodies over max_body_size get a 413"""
+        async def upload(request):
+            return {'size': len(await request.stream().read())}
+
+        router = Router()
+        router.post('/upload', upload)
+        application = ASGIApplication(_app(router), max_body_size=16)
+
+        self.assertEqual(_call(application, 'POST', '/upload', body_chunks=(b'x' * 10, b'x' * 10))[0], 413)
+        self.assertEqual(_call(application, 'POST', '/upload', headers=[('content-length', '100')])[0], 413)
+
+    def test_method_not_allowed_head_and_options(self):
+        """Test 405 with Allow, bodiless HEAD and automatic OPTIONS"""
+        router = Router()
+        router.get('/users', lambda request: {'users': []})
+        router.post('/users', lambda request: {'created': True})
+        application = ASGIApplication(_app(router))
+
+        status, headers, _ = _call(application, 'DELETE', '/users')
+        self.assertEqual((status, headers[b'allow']), (405, b'GET, HEAD, OPTIONS, POST'))
+        status, headers, body = _call(application, 'HEAD', '/users')
+        self.assertEqual((status, headers[b'content-length'], body), (200, b'13', [b'']))
+        status, headers, _ = _call(application, 'OPTIONS', '/users')
+        self.assertEqual((status, headers[b'allow']), (204, b'GET, HEAD, OPTIONS, POST'))
+        self.assertEqual(_call(application, 'DELETE', '/missing')[0], 404)
+
+    def test_head_closes_the_streamed_body(self):
+        """Test a streamed body skipped for HEAD is closed without being iterated"""
+        produced = []
+
+        async def export():
+            try:
+                produced.append('row')
+                yield 'row\n'
+            finally:
+                produced.append('closed')
+
+        stream = export()
+        router = Router()
+        router.get('/export', lambda request: StreamedResponse(stream))
+        status, _, body = _call(ASGIApplication(_app(router)), 'HEAD', '/export')
+        self.assertEqual((status, body, produced), (200, [b''], []))
+        self.assertIsNone(stream.ag_frame)
+
+    def test_errors_mid_stream_abort_the_response(self):
+        """Test a producer failing after the start message is raised to the server, never completing the body"""
+        def rows():
+            yield 'hello'
+            raise RuntimeError('boom')
+
+        router = Router()
+        router.get('/rows', lambda request: rows())
+        application = ASGIApplication(_app(router))
+        scope = {'type': 'http', 'method': 'GET', 'path': '/rows', 'headers': [], 'client': ('10.0.0.1', 1234)}
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            sent.append(message)
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(application(scope, receive, send))
+        self.assertEqual([message['type'] for message in sent], ['http.response.start', 'http.response.body'])
+        self.assertEqual((sent[1]['body'], sent[1]['more_body']), (b'hello', True))
+
+    def test_iterators_are_streamed(self):
+        """Test generator responses are sent as separate body chunks"""
+        async def events(request):
+            for i in range(3):
+                yield f"event {i}\n"
+
+        def lines(request):
+            return Response((f"line {i}\n" for i in range(2)), 201, {'Content-Type': 'text/plain'})
+
+        router = Router()
+        router.get('/events', lambda request: events(request))
+        router.get('/lines', lines)
+        application = ASGIApplication(_app(router))
+
+        status, headers, body = _call(application, 'GET', '/events')
+        self.assertNotIn(b'content-length', headers)
+        self.assertEqual(body, [b'event 0\n', b'event 1\n', b'event 2\n', b''])
+
+        status, headers, body = _call(application, 'GET', '/lines')
+        self.assertEqual(status, 201)
+        self.assertEqual(headers[b'content-type'], b'text/plain')
+        self.assertEqual(body, [b'line 0\n', b'line 1\n', b''])
+
+    def test_lifespan_boots_and_terminates(self):
+        """Test lifespan startup boots the application and shutdown terminates it"""
+        booted = MagicMock()
+        application = ASGIApplication(app_factory=lambda: booted)
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(application({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+        self.assertIs(application.app, booted)
+        booted.terminate.assert_called_once_with()
+
+    def test_failed_boot_is_reported(self):
+        """Test a provider failing to boot fails the lifespan startup"""
+        def fail():
+            raise RuntimeError('database unavailable')
+
+        application = ASGIApplication(app_factory=fail)
+        sent = []
+
+        async def receive():
+            return {'type': 'lifespan.startup'}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(application({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, [{'type': 'lifespan.startup.failed', 'message': 'database unavailable'}])
+
+@unittest.skipIf(uvicorn is None, 'uvicorn is not installed')
+class TestUvicorn(unittest.TestCase):
+    """Test the ASGI application under uvicorn"""
+
+    def test_serves_requests(self):
+        """Test uvicorn serves the router through the adapter"""
+        async def hello(request, name):
+            return {'hello': name}
+
+        router = Router()
+        router.get('/hello/{name}', hello)
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+
+        config = uvicorn.Config(ASGIApplication(_app(router)), host='127.0.0.1', port=port, log_level='error')
+        server = uvicorn.Server(config)
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(setattr, server, 'should_exit', True)
+
+        deadline = time.monotonic() + 5
+        while not server.started:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/hello/uvicorn', timeout=5) as response:
+            self.assertEqual(json.loads(response.read()), {'hello': 'uvicorn'})
+
+if __name__ == '__main__':
+    unittest.main()
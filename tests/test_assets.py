@@ -0,0 +1,107 @@
+"""
+Test the asset build pipeline
+"""
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from core.filesystem.asset import AssetManager, build_assets
+from core.http.static import StaticFiles, accepted_encodings
+
+CSS = b'body { color: #333; margin: 0; padding: 0; }\n' * 40
+
+class TestBuildAssets(unittest.TestCase):
+    """Test asset:build"""
+
+    def setUp(self):
+        self.public = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.public)
+        (self.public / 'css').mkdir()
+        (self.public / 'css' / 'app.css').write_bytes(CSS)
+        (self.public / 'logo.png').write_bytes(os.urandom(1024))
+
+    def test_fingerprints_and_writes_manifest(self):
+        """Test files are copied under content-hashed names listed in the manifest"""
+        manifest = build_assets(self.public)
+
+        self.assertEqual(set(manifest), {'css/app.css', 'logo.png'})
+        self.assertRegex(manifest['css/app.css'], r'^build/css/app\.[0-9a-f]{16}\.css$')
+        self.assertEqual((self.public / manifest['css/app.css']).read_bytes(), CSS)
+        written = json.loads((self.public / 'build' / 'manifest.json').read_text())
+        self.assertEqual(written, manifest)
+
+    def test_writes_gzip_variants_for_compressible_files(self):
+        """Test text assets get a .gz sibling and binary ones do not"""
+        manifest = build_assets(self.public)
+
+        css = self.public / manifest['css/app.css']
+        self.assertEqual(gzip.decompress(Path(f'{css}.gz').read_bytes()), CSS)
+        self.assertFalse(Path(f"{self.public / manifest['logo.png']}.gz").exists())
+
+    def test_rebuild_removes_stale_outputs(self):
+        """Test outputs of changed files are removed on the next build"""
+        old = build_assets(self.public)['css/app.css']
+        (self.public / 'css' / 'app.css').write_bytes(CSS + b'a { color: red; }\n')
+        new = build_assets(self.public)['css/app.css']
+
+        self.assertNotEqual(old, new)
+        self.assertFalse((self.public / old).exists())
+        self.assertFalse(Path(f'{self.public / old}.gz').exists())
+        self.assertTrue((self.public / new).exists())
+
+    def test_asset_urls_resolve_through_manifest(self):
+        """Test asset() returns the hashed URL once assets are built"""
+        assets = AssetManager(self.public)
+        self.assertEqual(assets.url('/css/app.css'), '/static/css/app.css')
+
+        manifest = build_assets(self.public)
+        self.assertEqual(assets.url('/css/app.css'), f"/static/{manifest['css/app.css']}")
+        self.assertEqual(assets.url('missing.js'), '/static/missing.js')
+
+class TestPrecompressedServing(unittest.TestCase):
+    """Test static responses pick precompressed variants"""
+
+    def setUp(self):
+        self.public = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.public)
+        (self.public / 'app.css').write_bytes(CSS)
+        self.manifest = build_assets(self.public)
+        self.static = StaticFiles(self.public)
+
+    def test_serves_gzip_when_accepted(self):
+        """Test gzip-accepting clients get the .gz variant"""
+        path = self.manifest['app.css']
+        response = self.static.prepare(path, {'Accept-Encoding': 'gzip, deflate'})
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Content-Type'], 'text/css')
+        self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+        self.assertTrue(response.file.path.endswith('.gz'))
+        self.assertLess(response.length, len(CSS))
+
+        plain = self.static.prepare(path, {'Accept-Encoding': 'gzip;q=0'})
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(plain.length, len(CSS))
+        self.assertNotEqual(plain.headers['ETag'], response.headers['ETag'])
+
+    def test_hashed_names_are_immutable(self):
+        """Test build outputs are cached for a year and sources are not"""
+        hashed = self.static.prepare(self.manifest['app.css'], {})
+        self.assertEqual(hashed.headers['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertNotIn('Cache-Control', self.static.prepare('app.css', {}).headers)
+
+    def test_build_manifest_is_revalidated(self):
+        """Test unhashed files in the build directory are not marked immutable"""
+        manifest = self.static.prepare('build/manifest.json', {})
+        self.assertEqual(manifest.status, 200)
+        self.assertEqual(manifest.headers['Cache-Control'], 'no-cache')
+
+    def test_accepted_encodings(self):
+        """Test Accept-Encoding parsing"""
+        self.assertEqual(accepted_encodings('br;q=0.8, gzip, *;q=0'), {'br': 0.8, 'gzip': 1.0, '*': 0.0})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Test the boot profiler
+"""
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from core.foundation.application import Application
+from core.foundation.boot_profile import BootProfile, parse_importtime, profile_boot
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |     core.http.response
+import time:        40 |         40 |       dateutil._common
+import time:       200 |        240 |     dateutil
+import time:        60 |        400 |   core.http
+import time:        10 |        410 | core
+import time:         5 |          5 | json
+"""
+
+class TestBootProfile(unittest.TestCase):
+    def test_parse_importtime(self):
+        """Test -X importtime output is rebuilt into the import tree"""
+        core, json = parse_importtime(IMPORTTIME)
+        self.assertEqual((core.module, core.self_us, core.cumulative_us), ('core', 10, 410))
+        self.assertEqual([child.module for child in core.children], ['core.http'])
+        self.assertEqual([child.module for child in core.children[0].children], ['core.http.response', 'dateutil'])
+        self.assertEqual(core.children[0].children[1].children[0].module, 'dateutil._common')
+        self.assertEqual(json.children, [])
+
+    def test_folded_stacks_and_budget(self):
+        """Test the report is folded into stacks and checked against a budget"""
+        profile = BootProfile(0.25, parse_importtime(IMPORTTIME), [('boot', 'RouteServiceProvider', 0.0015)])
+        self.assertEqual(profile.folded(), [
+            'boot;imports;core 10',
+            'boot;imports;core;core.http 60',
+            'boot;imports;core;core.http;core.http.response 100',
+            'boot;imports;core;core.http;dateutil 200',
+            'boot;imports;core;core.http;dateutil;dateutil._common 40',
+            'boot;imports;json 5',
+            'boot;application;boot;RouteServiceProvider 1500',
+        ])
+        self.assertAlmostEqual(profile.import_time, 0.000415)
+        self.assertEqual([record.module for record in profile.slowest_imports(2)], ['dateutil', 'core.http.response'])
+        self.assertTrue(profile.over_budget(200))
+        self.assertFalse(profile.over_budget(300))
+        self.assertFalse(profile.over_budget(0))
+        self.assertFalse(profile.over_budget())
+        profile.budget = 200
+        self.assertTrue(profile.over_budget())
+        self.assertFalse(profile.over_budget(300))
+
+    def test_application_records_boot_steps(self):
+        """Test the application times loading its config and each provider"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with mock.patch('core.providers.providers', ['tests.test_providers.EagerProvider']), \
+                mock.patch('core.foundation.provider_manifest.provider_manifest_path',
+                           return_value=Path(directory) / 'providers.json'):
+            app = Application()
+        steps = [(phase, name) for phase, name, _ in app.boot_times]
+        self.assertEqual(steps, [
+            ('environment', '.env'), ('config', 'config'), ('register', 'EagerProvider'), ('boot', 'EagerProvider'),
+        ])
+
+    def test_profile_boot(self):
+        """Test a real boot is profiled in a fresh interpreter"""
+        profile = profile_boot()
+        self.assertGreater(profile.total, 0)
+        self.assertIn('core.foundation.application', [record.module for record in profile.imports])
+        self.assertIn(('boot', 'RouteServiceProvider'), [(phase, name) for phase, name, _ in profile.steps])
+
+    def test_profile_boot_reads_the_configured_budget(self):
+        """Test the budget comes from app.server.boot_budget of the booted application"""
+        with mock.patch.dict('os.environ', {'BOOT_BUDGET_MS': '250'}):
+            profile = profile_boot()
+        self.assertEqual(profile.budget, 250)
+
+if __name__ == '__main__':
+    unittest.main()
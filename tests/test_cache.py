@@ -3,8 +3,10 @@ Test cache functionality
 """
 import os
 import tempfile
+import time
 import unittest
 from pathlib import Path
+from core.cache.cache import Cache, FileCache, make_store
 from core.config.loader import ConfigLoader, env, get, set, has, all, clear, reload
 
 class TestCache(unittest.TestCase):
@@ -216,5 +218,37 @@ def config():
         
         print("✅ Store Override")
 
+class TestFileCache(unittest.TestCase):
+    """Test the file cache store"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_instances_share_items(self):
+        """Test items written by one store are read by another on the same path"""
+        FileCache(self.temp_dir.name).put('page', {'body': b'<p>hi</p>'}, 60)
+        store = FileCache(self.temp_dir.name)
+        self.assertEqual(store.get('page'), {'body': b'<p>hi</p>'})
+        self.assertEqual(store._file('page').stat().st_mode & 0o777, 0o644)
+        self.assertTrue(store.has('page'))
+        self.assertTrue(store.forget('page'))
+        self.assertIsNone(store.get('page'))
+
+    def test_items_expire(self):
+        """Test expired items are removed on read"""
+        store = FileCache(self.temp_dir.name)
+        store.put('page', 'stale', 0.01)
+        time.sleep(0.02)
+        self.assertEqual(store.get('page', 'missing'), 'missing')
+        self.assertEqual(list(Path(self.temp_dir.name).glob('*.cache')), [])
+
+    def test_make_store_uses_driver(self):
+        """Test the configured driver picks the store"""
+        self.assertIsInstance(make_store('file'), FileCache)
+        self.assertIs(type(make_store('memory')), Cache)
+        with self.assertRaises(ValueError):
+            make_store('unknown')
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
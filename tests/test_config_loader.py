@@ -5,7 +5,8 @@ import os
 import tempfile
 import unittest
 from pathlib import Path
-from core.config.loader import ConfigLoader, env, get, set, has, all, clear, reload
+from unittest import mock
+from core.config.loader import ConfigLoader, env, get, set, has, all, clear, reload, cached_config_path, clear_cached_config
 
 class TestConfigLoader(unittest.TestCase):
     """Test configuration loader"""
@@ -278,5 +279,36 @@ def config():
         self.assertIn('app', all())
         self.assertIn('database', all())
 
+    def test_config_cache(self):
+        """Test a fresh config cache is loaded without executing the config files"""
+        self.loader.load_environment(str(self.env_file))
+        path = self.loader.cache(str(self.config_dir))
+        self.assertEqual(path, cached_config_path(self.temp_dir.resolve()))
+        self.assertEqual(path.stat().st_mode & 0o777, 0o644)
+        
+        with mock.patch.object(ConfigLoader, '_execute_config_files') as execute:
+            self.loader.load_config(str(self.config_dir))
+            execute.assert_not_called()
+        self.assertEqual(self.loader.get('app.name'), 'PyLevel')
+        self.assertEqual(self.loader.get('database.connections.sqlite.prefix'), 'test_')
+        
+        self.assertTrue(clear_cached_config(path))
+        self.assertFalse(clear_cached_config(path))
+        
+    def test_stale_config_cache(self):
+        """Test the config files are executed when they or the variables they read changed"""
+        self.loader.load_environment(str(self.env_file))
+        self.loader.cache(str(self.config_dir))
+        
+        os.environ['APP_NAME'] = 'Renamed'
+        self.loader.load_config(str(self.config_dir))
+        self.assertEqual(self.loader.get('app.name'), 'Renamed')
+        
+        self.loader.cache(str(self.config_dir))
+        (self.config_dir / 'mail.py').write_text("def config():\n    return {'driver': env('MAIL_DRIVER', 'smtp')}\n")
+        self.loader.load_config(str(self.config_dir))
+        self.assertEqual(self.loader.get('mail.driver'), 'array')
+        self.assertFalse(self.loader.load_cached(str(self.config_dir)))
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
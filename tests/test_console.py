@@ -0,0 +1,93 @@
+"""
+Test the console kernel and its command manifest
+"""
+import contextlib
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from core.console.commands.command import Command
+from core.console.kernel import ConsoleKernel
+from core.console.manifest import compile_command_manifest, load_command_manifest, resolve_command
+
+GREET = 'tests.test_console.GreetCommand'
+
+class GreetCommand(Command):
+    built = 0
+
+    @property
+    def signature(self) -> str:
+        return 'greet'
+
+    @property
+    def description(self) -> str:
+        return 'Greet someone'
+
+    def __init__(self):
+        GreetCommand.built += 1
+        super().__init__()
+
+    def _configure_parser(self):
+        self.add_argument('name')
+
+    def handle(self, *args, **kwargs):
+        print(f"Hello {self.parse_args(args).name}")
+
+class TestConsoleKernel(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.manifest = Path(directory) / 'commands.json'
+        patch = mock.patch('core.console.kernel.commands', [GREET])
+        patch.start()
+        self.addCleanup(patch.stop)
+        GreetCommand.built = 0
+
+    def _run(self, kernel, args):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            kernel.run(args)
+        return output.getvalue()
+
+    def test_manifest(self):
+        """Test the manifest maps signatures to classes and descriptions without building commands"""
+        manifest = compile_command_manifest([GREET], self.manifest)
+        self.assertEqual(manifest['commands'], {'greet': {'class': GREET, 'description': 'Greet someone'}})
+        self.assertEqual(load_command_manifest([GREET], self.manifest), manifest)
+        self.assertIsNone(load_command_manifest([], self.manifest))
+        self.assertEqual(GreetCommand.built, 0)
+        self.assertEqual(self.manifest.stat().st_mode & 0o777, 0o644)
+
+        source = next(iter(manifest['sources']))
+        manifest['sources'][source][0] += 1
+        self.manifest.write_text(json.dumps(manifest))
+        self.assertIsNone(load_command_manifest([GREET], self.manifest))
+
+    def test_unwritable_manifest(self):
+        """Test a manifest that cannot be written is still returned and leaves no temporary file"""
+        with mock.patch('core.console.manifest.os.replace', side_effect=PermissionError):
+            manifest = compile_command_manifest([GREET], self.manifest)
+        self.assertIn('greet', manifest['commands'])
+        self.assertEqual(list(self.manifest.parent.iterdir()), [])
+
+    def test_help_imports_no_command(self):
+        """Test help is listed from the manifest alone"""
+        ConsoleKernel(self.manifest)
+        with mock.patch('core.console.kernel.resolve_command', side_effect=resolve_command) as resolve:
+            output = self._run(ConsoleKernel(self.manifest), ['help'])
+        resolve.assert_not_called()
+        self.assertIn('greet', output)
+        self.assertIn('Greet someone', output)
+
+    def test_run_builds_only_the_invoked_command(self):
+        """Test running a command imports and builds only that command"""
+        kernel = ConsoleKernel(self.manifest)
+        self.assertEqual(self._run(kernel, ['greet', 'Ada']), 'Hello Ada\n')
+        self.assertEqual(GreetCommand.built, 1)
+        self.assertIn("Command 'missing' not found.", self._run(kernel, ['missing']))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+Test the application container
+"""
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+from core.foundation.application import Application, BindingResolutionError, _resolution_plans
+from core.http.request import Request
+
+class Transport:
+    built = 0
+
+    def __init__(self):
+        time.sleep(0.02)
+        Transport.built += 1
+
+class Mailer:
+    def __init__(self, transport: Transport, app: Application, retries: int = 3, log: 'Logger' = None):
+        self.transport = transport
+        self.app = app
+        self.retries = retries
+        self.log = log
+
+class Logger:
+    pass
+
+class Greeter:
+    def __init__(self, greeting: str):
+        self.greeting = greeting
+
+class TestContainer(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        patches = [
+            mock.patch('core.providers.providers', []),
+            mock.patch('core.foundation.provider_manifest.provider_manifest_path',
+                       return_value=Path(directory) / 'providers.json'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.app = Application()
+        Transport.built = 0
+
+    def test_singleton_is_built_once(self):
+        """Test a singleton class is built on first use, once, even by concurrent threads"""
+        self.app.singleton(Transport)
+        self.assertEqual(Transport.built, 0)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.app.make(Transport))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(Transport.built, 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_bind_builds_every_time(self):
+        """Test bind() builds a new instance on every make() and factories get the application"""
+        self.app.bind('transport', Transport)
+        self.assertIsNot(self.app.make('transport'), self.app.make('transport'))
+
+        self.app.singleton('factory', lambda app: (app, Transport()))
+        self.assertIs(self.app.make('factory')[0], self.app)
+        self.assertIs(self.app.make('factory'), self.app.make('factory'))
+
+    def test_singleton_of_an_instance(self):
+        """Test singleton() shares an object as it is and a new binding replaces it"""
+        router = object()
+        self.app.singleton('router', router)
+        self.assertIs(self.app.make('router'), router)
+        self.app.singleton('router', Transport)
+        self.assertIsInstance(self.app.make('router'), Transport)
+        self.assertIsNone(self.app.make('unbound'))
+
+    def test_autowiring(self):
+        """Test constructor dependencies are resolved from type hints"""
+        self.app.singleton(Transport)
+        mailer = self.app.make(Mailer)
+        self.assertIs(mailer.transport, self.app.make(Transport))
+        self.assertIs(mailer.app, self.app)
+        self.assertEqual(mailer.retries, 3)
+        # Unbound dependencies with a default keep it
+        self.assertIsNone(mailer.log)
+        self.assertIn(Mailer, _resolution_plans)
+
+        self.app.singleton(Logger)
+        mailer = self.app.make(Mailer, {'retries': 5})
+        self.assertEqual(mailer.retries, 5)
+        self.assertIs(mailer.log, self.app.make(Logger))
+
+        with self.assertRaises(BindingResolutionError):
+            self.app.make(Greeter)
+        self.assertEqual(self.app.make(Greeter, {'greeting': 'hi'}).greeting, 'hi')
+
+    def test_scoped_instances_live_as_long_as_the_request(self):
+        """Test a scoped binding is shared within a request and built again for the next one"""
+        self.app.scoped('transport', Transport)
+        self.assertIsNot(self.app.make('transport'), self.app.make('transport'))
+
+        first = Request(self.app, 'GET', '/', {})
+        first.set_current()
+        try:
+            transport = self.app.make('transport')
+            self.assertIs(self.app.make('transport'), transport)
+        finally:
+            first.clear_current()
+            first.close()
+
+        second = Request(self.app, 'GET', '/', {})
+        second.set_current()
+        try:
+            self.assertIsNot(self.app.make('transport'), transport)
+        finally:
+            second.clear_current()
+
+if __name__ == '__main__':
+    unittest.main()
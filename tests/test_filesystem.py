@@ -1 +1,116 @@
- 
\ No newline at end of file
+"""
+Test the filesystem service behind the File facade
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from core.facade.file import File
+from core.filesystem.filesystem import Filesystem
+
+class TestFilesystem(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.files = Filesystem(io_threads=2)
+        self.addCleanup(self.files.shutdown)
+
+    def test_put_is_atomic_and_keeps_the_mode(self):
+        """Test put() replaces the file through a temp file and keeps its permissions"""
+        path = self.directory / 'nested' / 'config.txt'
+        self.files.put(path, 'first')
+        os.chmod(path, 0o600)
+        self.files.put(path, (chunk for chunk in (b'sec', b'ond')))
+
+        self.assertEqual(self.files.get(path), 'second')
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+        self.assertEqual(os.listdir(path.parent), ['config.txt'])
+
+        def failing():
+            yield b'partial'
+            raise RuntimeError("producer failed")
+        with self.assertRaises(RuntimeError):
+            self.files.put(path, failing())
+        self.assertEqual(self.files.get(path), 'second')
+        self.assertEqual(os.listdir(path.parent), ['config.txt'])
+
+    def test_lines_and_chunks(self):
+        """Test lines() and chunks() stream a file"""
+        path = self.directory / 'log.txt'
+        self.files.put(path, 'one\ntwo\r\nthree')
+        self.assertEqual(list(self.files.lines(path)), ['one', 'two', 'three'])
+
+        self.files.put(path, b'x' * 10)
+        self.assertEqual(list(self.files.chunks(path, size=4)), [b'xxxx', b'xxxx', b'xx'])
+
+    def test_memory_mapped_reads(self):
+        """Test map(), hash() and find() read through a memory map"""
+        path = self.directory / 'data.bin'
+        content = os.urandom(100000) + b'NEEDLE' + os.urandom(1000)
+        self.files.put(path, content)
+
+        with self.files.map(path) as mapped:
+            self.assertEqual(mapped[100000:100006], b'NEEDLE')
+        self.assertEqual(self.files.hash(path), hashlib.sha256(content).hexdigest())
+        self.assertEqual(self.files.find(path, b'NEEDLE'), content.find(b'NEEDLE'))
+
+        empty = self.directory / 'empty.bin'
+        self.files.put(empty, b'')
+        self.assertEqual(self.files.hash(empty, 'md5'), hashlib.md5(b'').hexdigest())
+
+    def test_copy_move_and_delete(self):
+        """Test copying, moving and deleting files"""
+        source = self.directory / 'a.txt'
+        self.files.put(source, 'contents')
+        self.files.copy(source, self.directory / 'copies' / 'b.txt')
+        self.files.move(source, self.directory / 'c.txt')
+
+        self.assertFalse(self.files.exists(source))
+        self.assertEqual(self.files.get(self.directory / 'copies' / 'b.txt'), 'contents')
+        self.assertEqual([path.name for path in self.files.files(self.directory, recursive=True)], ['c.txt', 'b.txt'])
+        self.assertTrue(self.files.delete(self.directory / 'c.txt'))
+        self.assertFalse(self.files.delete(self.directory / 'c.txt'))
+
+    def test_async_variants_use_the_io_pool(self):
+        """Test async operations run on the I/O threads, never on the loop's thread"""
+        path = self.directory / 'async.txt'
+        threads = set()
+        original = self.files.get
+
+        def get(*args):
+            threads.add(threading.current_thread().name)
+            return original(*args)
+        self.files.get = get
+
+        async def run():
+            await self.files.put_async(path, 'line 1\nline 2\n')
+            text = await self.files.get_async(path)
+            lines = [line async for line in self.files.lines_async(path, batch=1)]
+            chunks = [chunk async for chunk in self.files.chunks_async(path, size=5)]
+            return text, lines, chunks
+
+        text, lines, chunks = asyncio.run(run())
+        self.assertEqual(text, 'line 1\nline 2\n')
+        self.assertEqual(lines, ['line 1', 'line 2'])
+        self.assertEqual(b''.join(chunks), b'line 1\nline 2\n')
+        self.assertTrue(all(name.startswith('file-io') for name in threads))
+
+class TestFileFacade(unittest.TestCase):
+    def test_facade_delegates_to_the_service(self):
+        """Test the File facade reads and writes through the filesystem service"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'facade.txt')
+
+        self.assertTrue(File.put(path, 'a\nb'))
+        self.assertTrue(File.exists(path))
+        self.assertEqual(File.get(path), 'a\nb')
+        self.assertEqual(list(File.lines(path)), ['a', 'b'])
+        self.assertEqual(File.size(path), 3)
+
+if __name__ == '__main__':
+    unittest.main()
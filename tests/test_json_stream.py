@@ -0,0 +1,73 @@
+"""
+Test streaming JSON encoders
+"""
+import json
+import unittest
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+from core.database.connection import Connection
+from core.database.orm.model import Model
+from core.http import iterate_chunks_sync, render_route_response
+from core.http.json_stream import BATCH_ROWS, JSONStreamResponse, encode_json_array, encode_ndjson
+
+class Post(Model):
+    _table = 'posts'
+    _hidden = ['secret']
+    _casts = {'id': 'int', 'published': 'bool'}
+
+class TestJSONStream(unittest.TestCase):
+    """Test JSON array and NDJSON streaming"""
+
+    def test_array_matches_json_dumps(self):
+        """Test the streamed array decodes to the rows, including empty input"""
+        rows = [{'id': i, 'at': datetime(2024, 1, 1), 'price': Decimal('1.50')} for i in range(3)]
+        body = b''.join(encode_json_array(iter(rows)))
+        self.assertEqual(json.loads(body), [
+            {'id': i, 'at': '2024-01-01T00:00:00', 'price': '1.50'} for i in range(3)
+        ])
+        self.assertEqual(b''.join(encode_json_array([])), b'[]')
+
+    def test_chunks_are_bounded(self):
+        """Test rows are yielded in chunks of at most chunk_size plus one batch"""
+        rows = ({'id': i, 'name': 'x' * 50} for i in range(10000))
+        chunks = list(encode_json_array(rows, chunk_size=4096))
+        row_size = len('{"id":9999,"name":""},') + 50
+        self.assertGreater(len(chunks), 20)
+        self.assertLess(max(len(chunk) for chunk in chunks), 4096 + BATCH_ROWS * row_size)
+        self.assertEqual(len(json.loads(b''.join(chunks))), 10000)
+
+    def test_ndjson_writes_one_row_per_line(self):
+        """Test NDJSON output"""
+        body = b''.join(encode_ndjson([{'a': 1}, {'a': 2}], chunk_size=1))
+        self.assertEqual(body, b'{"a":1}\n{"a":2}\n')
+        self.assertEqual(b''.join(encode_ndjson([])), b'')
+
+    def test_models_skip_to_dict(self):
+        """Test models are encoded from their attributes with hidden columns removed and casts applied"""
+        post = Post(id='7', title='Hello', secret='s', published=1)
+        with patch.object(Post, 'to_dict', side_effect=AssertionError('to_dict called')):
+            body = b''.join(encode_json_array([post]))
+        self.assertEqual(json.loads(body), [{'id': 7, 'title': 'Hello', 'published': True}])
+
+    def test_response_streams_from_a_cursor(self):
+        """Test JSONStreamResponse pulls model rows from a database cursor lazily"""
+        connection = Connection()
+        connection.connect('sqlite', database=':memory:')
+        self.addCleanup(connection.close)
+        connection.execute('CREATE TABLE posts (id INTEGER, title TEXT, secret TEXT, published INTEGER)')
+        for i in range(25):
+            connection.execute('INSERT INTO posts VALUES (?, ?, ?, ?)', (i, f'post {i}', 'x', i % 2))
+
+        with patch.object(Post, '_get_connection', return_value=connection):
+            response = JSONStreamResponse(lambda: Post.cursor(chunk_size=10), ndjson=True)
+            status, headers, body = render_route_response(response)
+            lines = b''.join(iterate_chunks_sync(body)).splitlines()
+
+        self.assertEqual(headers['Content-Type'], 'application/x-ndjson')
+        self.assertNotIn('Content-Length', headers)
+        self.assertEqual(len(lines), 25)
+        self.assertEqual(json.loads(lines[3]), {'id': 3, 'title': 'post 3', 'published': True})
+
+if __name__ == '__main__':
+    unittest.main()
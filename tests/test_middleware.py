@@ -0,0 +1,453 @@
+"""
+Test HTTP middleware
+"""
+import asyncio
+from datetime import datetime, timezone
+import gzip
+import multiprocessing
+import threading
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+from unittest import mock
+from unittest.mock import MagicMock
+from core.http import Response, render_route_response
+from core.cache.cache import Cache
+from core.http.middleware.middleware import CacheResponse, CompressResponse, ConditionalGet, ThrottleRequests
+from core.http.middleware.rate_limiter import (
+    SQLiteSlidingWindowLimiter,
+    SlidingWindowLimiter,
+    TokenBucketLimiter,
+    make_limiter
+)
+
+def _hit_shared_limiter(path, attempts, results):
+    limiter = SQLiteSlidingWindowLimiter(path)
+    for _ in range(attempts):
+        results.put(limiter.attempt('shared', 10, 60).allowed)
+
+class TestRateLimiters(unittest.TestCase):
+    """Test rate limiter algorithms"""
+
+    def test_sliding_window_blocks_after_limit(self):
+        """Test sliding window rejects hits over the limit"""
+        limiter = SlidingWindowLimiter()
+        for i in range(3):
+            result = limiter.attempt('key', 3, 60, now=120.0 + i)
+            self.assertTrue(result.allowed)
+            self.assertEqual(result.remaining, 2 - i)
+
+        result = limiter.attempt('key', 3, 60, now=125.0)
+        self.assertFalse(result.allowed)
+        self.assertEqual(result.remaining, 0)
+        self.assertGreater(result.retry_after, 0)
+
+    def test_sliding_window_weights_previous_window(self):
+        """Test previous window hits decay as the window slides"""
+        limiter = SlidingWindowLimiter()
+        for i in range(4):
+            limiter.attempt('key', 4, 60, now=60.0 + i)
+
+        # Start of the next window: previous hits still count fully
+        self.assertFalse(limiter.attempt('key', 4, 60, now=120.0).allowed)
+        # Halfway through: only half of them overlap the sliding window
+        self.assertTrue(limiter.attempt('key', 4, 60, now=150.0).allowed)
+
+    def test_sliding_window_retry_after_is_accurate(self):
+        """Test retry_after points at the moment a hit is allowed again"""
+        limiter = SlidingWindowLimiter()
+        for i in range(2):
+            limiter.attempt('key', 2, 60, now=60.0)
+
+        result = limiter.attempt('key', 2, 60, now=90.0)
+        self.assertFalse(result.allowed)
+        self.assertTrue(limiter.attempt('key', 2, 60, now=90.0 + result.retry_after + 0.001).allowed)
+
+    def test_token_bucket_refills(self):
+        """Test token bucket refills over time"""
+        limiter = TokenBucketLimiter()
+        self.assertTrue(limiter.attempt('key', 2, 10, now=0.0).allowed)
+        self.assertTrue(limiter.attempt('key', 2, 10, now=0.0).allowed)
+
+        result = limiter.attempt('key', 2, 10, now=0.0)
+        self.assertFalse(result.allowed)
+        self.assertAlmostEqual(result.retry_after, 5.0)
+        self.assertTrue(limiter.attempt('key', 2, 10, now=5.0).allowed)
+
+    def test_idle_keys_are_purged(self):
+        """Test idle keys do not accumulate"""
+        for limiter in (SlidingWindowLimiter(), TokenBucketLimiter()):
+            for i in range(100):
+                limiter.attempt(f'client-{i}', 5, 60, now=0.0)
+            self.assertEqual(len(limiter), 100)
+
+            limiter.attempt('late', 5, 60, now=1000.0)
+            self.assertEqual(len(limiter), 1)
+
+class TestSQLiteRateLimiter(unittest.TestCase):
+    """Test the SQLite backed rate limiter"""
+
+    def setUp(self):
+        self.path = str(Path(tempfile.mkdtemp()) / 'limits.sqlite')
+
+    def test_instances_share_the_budget(self):
+        """Test separate limiter instances see each other's hits"""
+        first = SQLiteSlidingWindowLimiter(self.path)
+        second = SQLiteSlidingWindowLimiter(self.path)
+
+        self.assertTrue(first.attempt('key', 2, 60, now=60.0).allowed)
+        self.assertTrue(second.attempt('key', 2, 60, now=61.0).allowed)
+        self.assertFalse(first.attempt('key', 2, 60, now=62.0).allowed)
+        self.assertTrue(second.attempt('key', 2, 60, now=150.0).allowed)
+
+    def test_processes_share_the_budget(self):
+        """Test worker processes cannot exceed the limit together"""
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=_hit_shared_limiter, args=(self.path, 5, results))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        allowed = [results.get() for _ in range(20)]
+        self.assertEqual(sum(allowed), 10)
+
+    def test_idle_keys_are_purged(self):
+        """Test expired rows are deleted"""
+        limiter = SQLiteSlidingWindowLimiter(self.path, purge_interval=0)
+        limiter.attempt('old', 5, 60, now=0.0)
+        limiter.attempt('new', 5, 60, now=1000.0)
+        self.assertEqual(len(limiter), 1)
+
+    def test_make_limiter_reads_the_limiter_config(self):
+        """Test the driver and database path come from the cache.limiter config"""
+        settings = {'cache.limiter.driver': 'sqlite', 'cache.limiter.path': self.path}
+        with mock.patch('core.http.middleware.rate_limiter.config',
+                        side_effect=lambda key, default=None: settings.get(key, default)):
+            limiter = make_limiter()
+        self.assertIsInstance(limiter, SQLiteSlidingWindowLimiter)
+        self.assertEqual(limiter.path, self.path)
+        self.assertIsInstance(make_limiter(), SlidingWindowLimiter)
+
+class TestThrottleRequests(unittest.TestCase):
+    """Test ThrottleRequests middleware"""
+
+    def _request(self, ip='10.0.0.1', path='/api/users'):
+        request = MagicMock(spec=['method', 'path', 'ip', 'route', 'user'])
+        request.method = 'GET'
+        request.path = path
+        request.ip.return_value = ip
+        request.route = None
+        request.user = None
+        return request
+
+    def test_adds_rate_limit_headers(self):
+        """Test successful responses carry rate limit headers"""
+        middleware = ThrottleRequests(max_attempts=2)
+        response = middleware.handle(self._request(), lambda request: {'ok': True})
+
+        self.assertIsInstance(response, Response)
+        self.assertEqual(response.data, {'ok': True})
+        self.assertEqual(response.headers['X-RateLimit-Limit'], '2')
+        self.assertEqual(response.headers['X-RateLimit-Remaining'], '1')
+
+    def test_returns_429_with_retry_after(self):
+        """Test limited requests get a 429 response"""
+        middleware = ThrottleRequests(max_attempts=1)
+        middleware.handle(self._request(), lambda request: 'ok')
+        response = middleware.handle(self._request(), lambda request: 'ok')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response.headers)
+        self.assertIn('X-RateLimit-Reset', response.headers)
+
+    def test_clients_have_separate_buckets(self):
+        """Test each client IP is limited independently"""
+        middleware = ThrottleRequests(max_attempts=1)
+        middleware.handle(self._request(ip='10.0.0.1'), lambda request: 'ok')
+
+        response = middleware.handle(self._request(ip='10.0.0.2'), lambda request: 'ok')
+        self.assertEqual(response.status_code, 200)
+
+    def test_passed_limiter_is_kept(self):
+        """Test an explicit limiter is used even while it tracks no clients"""
+        limiter = TokenBucketLimiter()
+        self.assertEqual(len(limiter), 0)
+        middleware = ThrottleRequests(max_attempts=1, limiter=limiter)
+        self.assertIs(middleware.limiter, limiter)
+
+        middleware.handle(self._request(), lambda request: 'ok')
+        self.assertEqual(len(limiter), 1)
+
+    def test_sqlite_limiter_is_shared_between_middleware(self):
+        """Test two workers' middleware with their own SQLite limiters share one budget"""
+        path = str(Path(tempfile.mkdtemp()) / 'limits.sqlite')
+        first = ThrottleRequests(max_attempts=2, limiter=SQLiteSlidingWindowLimiter(path))
+        second = ThrottleRequests(max_attempts=2, limiter=SQLiteSlidingWindowLimiter(path))
+        self.assertIsInstance(first.limiter, SQLiteSlidingWindowLimiter)
+
+        self.assertEqual(first.handle(self._request(), lambda request: 'ok').status_code, 200)
+        self.assertEqual(second.handle(self._request(), lambda request: 'ok').status_code, 200)
+        self.assertEqual(first.handle(self._request(), lambda request: 'ok').status_code, 429)
+        self.assertEqual(second.handle(self._request(), lambda request: 'ok').status_code, 429)
+
+    def test_user_key_takes_precedence_over_ip(self):
+        """Test authenticated users are keyed by their id"""
+        middleware = ThrottleRequests(max_attempts=1)
+        first = self._request(ip='10.0.0.1')
+        first.user = MagicMock(id=7)
+        second = self._request(ip='10.0.0.2')
+        second.user = MagicMock(id=7)
+
+        middleware.handle(first, lambda request: 'ok')
+        response = middleware.handle(second, lambda request: 'ok')
+        self.assertEqual(response.status_code, 429)
+
+class TestCompressResponse(unittest.TestCase):
+    """Test on-the-fly response compression"""
+
+    def _request(self, accept_encoding='gzip, deflate'):
+        request = MagicMock()
+        request.headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+        return request
+
+    def test_gzips_large_text_responses(self):
+        """Test large text bodies are gzipped with Vary set"""
+        html = '<p>hello</p>' * 500
+        response = CompressResponse(min_size=1024).handle(self._request(), lambda request: html)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+        self.assertNotIn('Content-Length', response.headers)
+        self.assertEqual(gzip.decompress(response.data).decode(), html)
+
+    def test_deflate_when_preferred(self):
+        """Test the coding with the highest q-value wins"""
+        data = {'items': list(range(1000))}
+        response = CompressResponse().handle(self._request('gzip;q=0.5, deflate'), lambda request: data)
+        self.assertEqual(response.headers['Content-Encoding'], 'deflate')
+        self.assertIn(b'999', zlib.decompress(response.data))
+
+    def test_skips_small_and_incompressible_responses(self):
+        """Test small bodies, images and unsupported clients are left alone"""
+        middleware = CompressResponse(min_size=1024)
+        self.assertEqual(middleware.handle(self._request(), lambda request: 'tiny'), 'tiny')
+
+        image = Response(b'\x89PNG' * 1000, 200, {'Content-Type': 'image/png'})
+        self.assertIs(middleware.handle(self._request(), lambda request: image), image)
+
+        html = 'x' * 4096
+        self.assertEqual(middleware.handle(self._request(None), lambda request: html), html)
+        self.assertEqual(middleware.handle(self._request('br, gzip;q=0'), lambda request: html), html)
+
+    def test_skips_encoded_and_no_transform_responses(self):
+        """Test responses that are already encoded or opt out are not touched"""
+        middleware = CompressResponse(min_size=0)
+        encoded = Response('x' * 4096, 200, {'Content-Encoding': 'br'})
+        self.assertIs(middleware.handle(self._request(), lambda request: encoded), encoded)
+        no_transform = Response('x' * 4096, 200, {'Cache-Control': 'no-transform'})
+        self.assertIs(middleware.handle(self._request(), lambda request: no_transform), no_transform)
+        events = Response(iter(['data: 1\n\n']), 200, {'Content-Type': 'text/event-stream'})
+        self.assertIs(middleware.handle(self._request(), lambda request: events), events)
+
+    def test_large_bodies_are_compressed_in_chunks(self):
+        """Test bodies over the threshold are streamed through the compressor"""
+        html = ''.join(f'<li>{i}</li>' for i in range(20000))
+        middleware = CompressResponse(chunk_size=4096, stream_threshold=8192)
+        response = middleware.handle(self._request(), lambda request: html)
+        chunks = list(response.data)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(gzip.decompress(b''.join(chunks)).decode(), html)
+
+    def test_streamed_responses_are_compressed(self):
+        """Test sync and async iterators are compressed as they are produced"""
+        middleware = CompressResponse()
+        response = middleware.handle(self._request(), lambda request: (f'row {i}\n' for i in range(100)))
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.data)).count(b'row'), 100)
+
+        async def rows():
+            for i in range(100):
+                yield f'row {i}\n'
+
+        async def collect(stream):
+            return b''.join([chunk async for chunk in stream])
+
+        response = middleware.handle(self._request('deflate'), lambda request: rows())
+        self.assertEqual(zlib.decompress(asyncio.run(collect(response.data))).count(b'row'), 100)
+
+class TestCacheResponse(unittest.TestCase):
+    """Test the full-page response cache"""
+
+    def _request(self, path='/docs', query_string='', headers=None, method='GET'):
+        request = MagicMock()
+        request.method = method
+        request.path = path
+        request.query_string = query_string
+        request.headers = headers or {}
+        return request
+
+    def _action(self):
+        calls = []
+
+        def action(request):
+            calls.append(request)
+            return {'page': len(calls)}
+        return action, calls
+
+    def test_hits_are_served_from_the_store(self):
+        """Test a second GET is answered from the cache with Age and X-Cache"""
+        middleware = CacheResponse(store=Cache())
+        action, calls = self._action()
+        first = middleware.handle(self._request(), action)
+        second = middleware.handle(self._request(), action)
+        self.assertEqual(first.headers['X-Cache'], 'MISS')
+        self.assertEqual(second.headers['X-Cache'], 'HIT')
+        self.assertEqual(second.headers['Age'], '0')
+        self.assertEqual(second.headers['Content-Type'], 'application/json')
+        self.assertEqual(second.data, b'{"page": 1}')
+        self.assertEqual(len(calls), 1)
+
+    def test_key_uses_selected_query_and_vary_headers(self):
+        """Test only the listed query parameters and vary headers split entries"""
+        middleware = CacheResponse(store=Cache(), query=['page'])
+        action, calls = self._action()
+        middleware.handle(self._request(query_string='page=1&utm_source=mail'), action)
+        self.assertEqual(middleware.handle(self._request(query_string='utm_source=ad&page=1'), action).headers['X-Cache'], 'HIT')
+        middleware.handle(self._request(query_string='page=2'), action)
+        middleware.handle(self._request(query_string='page=1', headers={'Accept-Encoding': 'gzip'}), action)
+        self.assertEqual(len(calls), 3)
+
+    def test_session_requests_and_private_responses_bypass(self):
+        """Test session cookies bypass the cache and private responses are not stored"""
+        middleware = CacheResponse(store=Cache(), bypass_cookies=['session'])
+        action, calls = self._action()
+        response = middleware.handle(self._request(headers={'Cookie': 'theme=dark; session=abc'}), action)
+        self.assertEqual(response.headers['X-Cache'], 'BYPASS')
+        self.assertEqual(middleware.handle(self._request(method='POST'), action).headers['X-Cache'], 'BYPASS')
+
+        private = Response('<p>account</p>', 200, {'Cache-Control': 'private'})
+        middleware.handle(self._request('/account'), lambda request: private)
+        self.assertEqual(middleware.handle(self._request('/account'), action).headers['X-Cache'], 'MISS')
+
+    def test_purge_by_tag(self):
+        """Test purging a tag invalidates entries from every instance sharing the store"""
+        store = Cache()
+        docs = CacheResponse(store=store, tags=['docs'])
+        pages = CacheResponse(store=store, tags=['pages'])
+        action, calls = self._action()
+        docs.handle(self._request('/docs'), action)
+        pages.handle(self._request('/'), action)
+
+        CacheResponse(store=store).purge('docs')
+        self.assertEqual(docs.handle(self._request('/docs'), action).headers['X-Cache'], 'MISS')
+        self.assertEqual(pages.handle(self._request('/'), action).headers['X-Cache'], 'HIT')
+
+    def test_entries_expire_after_ttl(self):
+        """Test entries are rendered again once the TTL has passed"""
+        middleware = CacheResponse(store=Cache(), ttl=0)
+        action, calls = self._action()
+        middleware.handle(self._request(), action)
+        middleware.handle(self._request(), action)
+        self.assertEqual(len(calls), 2)
+
+    def test_concurrent_misses_are_coalesced(self):
+        """Test only one of several simultaneous misses runs the action"""
+        middleware = CacheResponse(store=Cache())
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow(request):
+            calls.append(request)
+            started.set()
+            release.wait(5)
+            return 'rendered'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(middleware.handle(self._request(), slow)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(response.headers['X-Cache'] for response in results), ['HIT', 'HIT', 'HIT', 'MISS'])
+        self.assertEqual(middleware._locks, {})
+
+class TestConditionalGet(unittest.TestCase):
+    """Test ETag and conditional GET handling"""
+
+    def _request(self, headers=None, method='GET'):
+        request = MagicMock()
+        request.method = method
+        request.headers = headers or {}
+        return request
+
+    def test_body_etag_answers_if_none_match(self):
+        """Test a weak body ETag is added and a matching If-None-Match gets 304"""
+        middleware = ConditionalGet()
+        action = lambda request: {'users': [1, 2, 3]}
+        first = middleware.handle(self._request(), action)
+        etag = first.headers['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+
+        second = middleware.handle(self._request({'If-None-Match': etag}), action)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.headers, {'ETag': etag})
+        self.assertEqual(render_route_response(second), (304, {'ETag': etag}, b''))
+
+        changed = middleware.handle(self._request({'If-None-Match': etag}), lambda request: {'users': [1, 2]})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+
+    def test_validator_skips_the_action(self):
+        """Test a matching version validator answers 304 before the action runs"""
+        calls = []
+        middleware = ConditionalGet(validator=lambda request: 42)
+
+        def action(request):
+            calls.append(request)
+            return {'version': 42}
+
+        etag = middleware.handle(self._request(), action).headers['ETag']
+        response = middleware.handle(self._request({'If-None-Match': f'"x", {etag}'}), action)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(calls), 1)
+
+    def test_updated_at_validator_uses_last_modified(self):
+        """Test a datetime validator is sent as Last-Modified and honours If-Modified-Since"""
+        updated_at = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+        middleware = ConditionalGet(validator=lambda request: updated_at)
+        action = lambda request: 'page'
+        response = middleware.handle(self._request(), action)
+        self.assertEqual(response.headers['Last-Modified'], 'Wed, 01 May 2024 12:00:00 GMT')
+        self.assertNotIn('ETag', response.headers)
+
+        fresh = middleware.handle(self._request({'If-Modified-Since': 'Wed, 01 May 2024 12:00:00 GMT'}), action)
+        self.assertEqual(fresh.status_code, 304)
+        stale = middleware.handle(self._request({'If-Modified-Since': 'Tue, 30 Apr 2024 12:00:00 GMT'}), action)
+        self.assertEqual(stale.status_code, 200)
+
+    def test_controller_validators_and_other_methods_are_kept(self):
+        """Test an ETag set by the action is used as is and POSTs pass through"""
+        middleware = ConditionalGet()
+        tagged = lambda request: Response({'a': 1}, 200, {'ETag': '"v7"'})
+        response = middleware.handle(self._request({'If-None-Match': 'W/"v7"'}), tagged)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], '"v7"')
+
+        self.assertEqual(middleware.handle(self._request(method='POST'), lambda request: 'ok'), 'ok')
+        missing = Response('nope', 404)
+        self.assertIs(middleware.handle(self._request(), lambda request: missing), missing)
+
+if __name__ == '__main__':
+    unittest.main()
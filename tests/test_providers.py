@@ -0,0 +1,104 @@
+"""
+Test deferred service providers and the provider manifest
+"""
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+from core.foundation.application import Application
+from core.foundation.provider_manifest import compile_provider_manifest, load_provider_manifest
+from core.foundation.service_provider import ServiceProvider
+
+EAGER = 'tests.test_providers.EagerProvider'
+DEFERRED = 'tests.test_providers.MailerProvider'
+
+class EagerProvider(ServiceProvider):
+    def _register(self):
+        self.app.singleton('eager', object())
+
+class MailerProvider(ServiceProvider):
+    registered = 0
+    booted = 0
+
+    def provides(self):
+        return ['mailer', 'mailer.transport']
+
+    def _register(self):
+        time.sleep(0.05)
+        MailerProvider.registered += 1
+        self.app.singleton('mailer', 'mailer')
+        self.app.singleton('mailer.transport', 'smtp')
+
+    def _boot(self):
+        # A provider may resolve its own bindings while it boots
+        assert self.app.make('mailer') == 'mailer'
+        MailerProvider.booted += 1
+
+class TestProviderManifest(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = self.directory / 'bootstrap' / 'cache' / 'providers.json'
+
+    def test_compile_and_load(self):
+        """Test the manifest separates eager providers from the bindings of deferred ones"""
+        manifest = compile_provider_manifest([EAGER, DEFERRED], self.path)
+        self.assertEqual(manifest['eager'], [EAGER])
+        self.assertEqual(manifest['deferred'], {'mailer': DEFERRED, 'mailer.transport': DEFERRED})
+        self.assertEqual(load_provider_manifest([EAGER, DEFERRED], self.path), manifest)
+        self.assertEqual(self.path.stat().st_mode & 0o777, 0o644)
+
+    def test_stale_manifest(self):
+        """Test the manifest is stale when the provider list or a provider module changes"""
+        manifest = compile_provider_manifest([EAGER, DEFERRED], self.path)
+        self.assertIsNone(load_provider_manifest([EAGER], self.path))
+
+        source = next(iter(manifest['sources']))
+        manifest['sources'][source][1] -= 1
+        self.path.write_text(json.dumps(manifest))
+        self.assertIsNone(load_provider_manifest([EAGER, DEFERRED], self.path))
+
+class TestDeferredProviders(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = Path(directory) / 'providers.json'
+        patches = [
+            mock.patch('core.providers.providers', [EAGER, DEFERRED]),
+            mock.patch('core.foundation.provider_manifest.provider_manifest_path', return_value=path),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        MailerProvider.registered = MailerProvider.booted = 0
+
+    def test_deferred_provider_loads_on_first_make(self):
+        """Test a deferred provider is registered and booted when one of its bindings is resolved"""
+        app = Application()
+        self.assertEqual([type(provider) for provider in app.providers], [EagerProvider])
+        self.assertEqual(MailerProvider.registered, 0)
+
+        self.assertEqual(app.make('mailer.transport'), 'smtp')
+        self.assertEqual(app.make('mailer'), 'mailer')
+        self.assertEqual((MailerProvider.registered, MailerProvider.booted), (1, 1))
+        self.assertIsNone(app.make('unknown'))
+
+    def test_concurrent_make_loads_the_provider_once(self):
+        """Test threads resolving a deferred binding together load its provider once"""
+        app = Application()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(app.make('mailer'))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['mailer'] * 4)
+        self.assertEqual((MailerProvider.registered, MailerProvider.booted), (1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
+import io
 import unittest
 from unittest.mock import MagicMock
-from core.http.request import Request
+from core.http.request import BodyError, BodyReader, Request
 from core.exceptions.validation import ValidationException
 
 class TestRequest(unittest.TestCase):
@@ -226,5 +227,54 @@ class TestRequest(unittest.TestCase):
         data = request.validate({'name': 'John'})
         self.assertEqual(data['name'], 'John')
 
+class TestLazyRequest(unittest.TestCase):
+    def _request(self, body=b'', headers=None, query_string=''):
+        reader = BodyReader(io.BytesIO(body), len(body), chunk_size=4)
+        request = Request(MagicMock(), 'POST', '/test', headers or {}, query_string=query_string, stream=reader)
+        return request, reader
+
+    def test_body_is_read_on_first_access(self):
+        """Test the body stays in the connection until json() is called"""
+        request, reader = self._request(b'{"name": "Ada"}')
+        self.assertEqual(reader.remaining, 15)
+        self.assertEqual(request.json(), {'name': 'Ada'})
+        self.assertEqual(reader.remaining, 0)
+        self.assertEqual(request.body(), b'{"name": "Ada"}')
+
+    def test_invalid_json_raises_body_error(self):
+        """Test malformed JSON raises a 400 body error"""
+        request, _ = self._request(b'{"name": ')
+        with self.assertRaises(BodyError) as context:
+            request.json()
+        self.assertEqual(context.exception.status_code, 400)
+        self.assertEqual(self._request()[0].json(), {})
+
+    def test_form_query_cookies_and_headers(self):
+        """Test form fields, query parameters, cookies and headers are parsed on demand"""
+        request, _ = self._request(
+            b'name=Ada+Lovelace&empty=',
+            headers={'Content-Type': 'application/x-www-form-urlencoded', 'Cookie': 'session=abc; theme=dark'},
+            query_string='page=2&sort=name'
+        )
+        self.assertEqual(request.form(), {'name': 'Ada Lovelace', 'empty': ''})
+        self.assertEqual(request.query('page'), '2')
+        self.assertEqual(request.query('missing', '1'), '1')
+        self.assertEqual(request.cookies(), {'session': 'abc', 'theme': 'dark'})
+        self.assertEqual(request.header('content-type'), 'application/x-www-form-urlencoded')
+        self.assertIsNone(request.header('X-Missing'))
+
+        json_request, _ = self._request(b'{}', headers={'Content-Type': 'application/json'})
+        self.assertEqual(json_request.form(), {})
+
+    def test_stream_yields_chunks(self):
+        """Test stream() hands out the body chunk by chunk without buffering it"""
+        request, reader = self._request(b'0123456789')
+        self.assertEqual(list(request.stream()), [b'0123', b'4567', b'89'])
+        self.assertEqual(reader.remaining, 0)
+
+        request, _ = self._request(b'0123456789')
+        request.body()
+        self.assertEqual(list(request.stream()), [b'0123456789'])
+
 if __name__ == '__main__':
-    unittest.main() 
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Test streamed responses
+"""
+import asyncio
+import unittest
+from core.http import (
+    EventStreamResponse,
+    ServerSentEvent,
+    StreamedResponse,
+    iterate_chunks,
+    iterate_chunks_sync,
+    render_route_response
+)
+
+class TestStreamedResponse(unittest.TestCase):
+    """Test StreamedResponse and Server-Sent Events"""
+
+    def test_generator_function_is_streamed(self):
+        """Test a generator function becomes the body without a Content-Length"""
+        def export():
+            yield 'id,name\n'
+            for i in range(3):
+                yield f'{i},user{i}\n'
+
+        response = StreamedResponse(export, headers={'Content-Type': 'text/csv'})
+        status, headers, body = render_route_response(response)
+        self.assertEqual(status, 200)
+        self.assertEqual(headers, {'Content-Type': 'text/csv'})
+        self.assertEqual(b''.join(iterate_chunks_sync(body)), b'id,name\n0,user0\n1,user1\n2,user2\n')
+
+    def test_iterables_are_accepted(self):
+        """Test lists and async generators are turned into streams"""
+        self.assertEqual(list(StreamedResponse([b'a', 'b']).data), [b'a', 'b'])
+
+        async def chunks():
+            yield 'x'
+            yield b'y'
+
+        async def collect(stream):
+            return [chunk async for chunk in iterate_chunks(stream)]
+
+        response = StreamedResponse(chunks())
+        self.assertEqual(asyncio.run(collect(response.data)), [b'x', b'y'])
+
+    def test_server_sent_events_are_encoded(self):
+        """Test events are framed with their fields and JSON data"""
+        event = ServerSentEvent({'done': 50}, event='progress', id='7', retry=1000)
+        self.assertEqual(event.encode(), 'event: progress\nid: 7\nretry: 1000\ndata: {"done": 50}\n\n')
+        self.assertEqual(ServerSentEvent('a\nb').encode(), 'data: a\ndata: b\n\n')
+
+        response = EventStreamResponse(iter(['started', ServerSentEvent('finished', event='end')]))
+        self.assertEqual(response.headers['Content-Type'], 'text/event-stream; charset=utf-8')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        self.assertEqual(list(response.data), ['data: started\n\n', 'event: end\ndata: finished\n\n'])
+
+    def test_producer_is_closed_when_abandoned(self):
+        """Test the producer's cleanup runs when sending stops early"""
+        closed = []
+
+        def export():
+            try:
+                yield 'first'
+                yield 'second'
+            finally:
+                closed.append(True)
+
+        chunks = iterate_chunks_sync(StreamedResponse(export).data)
+        self.assertEqual(next(chunks), b'first')
+        chunks.close()
+        self.assertEqual(closed, [True])
+
+if __name__ == '__main__':
+    unittest.main()
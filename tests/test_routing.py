@@ -0,0 +1,324 @@
+"""
+Test routing
+"""
+import asyncio
+import tempfile
+import threading
+import time
+import pickle
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+from core.http.middleware.middleware import Middleware, ThrottleRequests
+from core.routing.cache import RouteCacheError, cache_routes, clear_routes, load_cached_routes
+from core.routing.router import Router
+
+class RecordingMiddleware(Middleware):
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+
+    def handle(self, request, next):
+        self.calls.append(self.name)
+        return next(request)
+
+class SlowMiddleware(Middleware):
+    def handle(self, request, next):
+        time.sleep(0.01)
+        return next(request)
+
+class AsyncRecordingMiddleware(Middleware):
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+
+    async def handle(self, request, next):
+        self.calls.append(self.name)
+        return await next(request)
+
+class UserController:
+    request = None
+
+    def show(self, id):
+        return f"user {id}"
+
+    def profile(self):
+        return 'profile'
+
+def _request(path, method='GET'):
+    return SimpleNamespace(method=method, path=path, headers={})
+
+class TestRoute(unittest.TestCase):
+    """Test route handling"""
+
+    def setUp(self):
+        self.router = Router()
+
+    def test_middleware_runs_in_order(self):
+        """Test middleware wraps the action in registration order"""
+        calls = []
+        route = self.router.get('/users', lambda request: 'ok')
+        route.add_middleware([RecordingMiddleware('first', calls), RecordingMiddleware('second', calls)])
+
+        self.assertEqual(route.handle(_request('/users')), 'ok')
+        self.assertEqual(calls, ['first', 'second'])
+
+    def test_pipeline_is_compiled_once(self):
+        """Test the pipeline is reused until middleware changes"""
+        route = self.router.get('/users', lambda request: 'ok')
+        self.router.freeze()
+        pipeline = route._pipeline
+
+        route.handle(_request('/users'))
+        self.assertIs(route._pipeline, pipeline)
+
+        route.add_middleware([RecordingMiddleware('late', [])])
+        self.assertIsNone(route._pipeline)
+        route.handle(_request('/users'))
+        self.assertIsNotNone(route._pipeline)
+
+    def test_parameters_are_passed_per_request(self):
+        """Test route parameters are not shared between concurrent requests"""
+        route = self.router.get('/users/{id}', lambda request, id: id)
+        route.add_middleware([SlowMiddleware()])
+        results = {}
+
+        def call(user_id):
+            results[user_id] = route.handle(_request(f'/users/{user_id}'))
+
+        threads = [threading.Thread(target=call, args=(str(i),)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {str(i): str(i) for i in range(10)})
+        self.assertFalse(hasattr(route, '_parameters'))
+
+    def test_bound_method_actions_receive_parameters(self):
+        """Test controller actions get the request and keyword parameters"""
+        class Controller:
+            request = None
+
+            def show(self, id):
+                return (self.request.path, id)
+
+        controller = Controller()
+        route = self.router.get('/users/{id}', controller.show)
+        self.assertEqual(route.handle(_request('/users/5')), ('/users/5', '5'))
+
+    def test_controller_request_is_per_request(self):
+        """Test concurrent requests to one controller each see their own request"""
+        class Controller:
+            request = None
+
+            def show(self, id):
+                request = self.request
+                time.sleep(0.01)
+                return (self.request is request, self.request.path, id)
+
+        controller = Controller()
+        route = self.router.get('/users/{id}', controller.show)
+        results = {}
+
+        def call(user_id):
+            results[user_id] = route.handle(_request(f'/users/{user_id}'))
+
+        threads = [threading.Thread(target=call, args=(str(i),)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {str(i): (True, f'/users/{i}', str(i)) for i in range(10)})
+        self.assertIsNone(controller.request)
+
+class TestAsyncRoute(unittest.TestCase):
+    """Test route handling on the event loop"""
+
+    def setUp(self):
+        self.router = Router()
+
+    def test_coroutine_actions_are_awaited(self):
+        """Test async actions run on the loop without a thread hop"""
+        async def action(request, id):
+            return (threading.current_thread() is threading.main_thread(), id)
+
+        route = self.router.get('/users/{id}', action)
+        self.assertEqual(asyncio.run(route.handle_async(_request('/users/3'))), (True, '3'))
+
+    def test_sync_actions_run_in_executor(self):
+        """Test blocking actions are moved off the event loop thread"""
+        route = self.router.get('/users', lambda request: threading.current_thread() is threading.main_thread())
+        self.assertFalse(asyncio.run(route.handle_async(_request('/users'))))
+
+    def test_mixed_middleware_runs_in_order(self):
+        """Test sync and async middleware wrap an async action in registration order"""
+        calls = []
+
+        async def action(request):
+            calls.append('action')
+            return 'ok'
+
+        route = self.router.get('/users', action)
+        route.add_middleware([
+            RecordingMiddleware('sync', calls),
+            AsyncRecordingMiddleware('async', calls),
+            ThrottleRequests(max_attempts=5)
+        ])
+        request = _request('/users')
+        request.ip = lambda: '10.0.0.1'
+        request.user = None
+
+        response = asyncio.run(route.handle_async(request))
+        self.assertEqual(calls, ['sync', 'async', 'action'])
+        self.assertEqual(response.data, 'ok')
+        self.assertEqual(response.headers['X-RateLimit-Remaining'], '4')
+
+    def test_sync_middleware_and_action_share_one_executor_call(self):
+        """Test blocking middleware around a blocking action run on the same thread as it"""
+        threads = []
+
+        class ThreadMiddleware(Middleware):
+            def handle(self, request, next):
+                threads.append(threading.current_thread())
+                return next(request)
+
+        async def outer(request, next):
+            return await next(request)
+
+        route = self.router.get('/users', lambda request: threads.append(threading.current_thread()) or 'ok')
+        route.add_middleware([SimpleNamespace(handle=outer), ThreadMiddleware(), ThreadMiddleware()])
+        self.assertEqual(asyncio.run(route.handle_async(_request('/users'))), 'ok')
+        self.assertEqual(len(set(threads)), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+    def test_sync_middleware_around_async_code_does_not_deadlock(self):
+        """Test requests finish while sync middleware wait on async actions and the executor is saturated"""
+        async def action(request):
+            # Needs a default executor thread while the middleware wait for it
+            return await asyncio.to_thread(lambda: 'ok')
+
+        route = self.router.get('/users', action)
+        route.add_middleware([SlowMiddleware(), SlowMiddleware()])
+
+        async def serve():
+            loop = asyncio.get_running_loop()
+            loop.set_default_executor(ThreadPoolExecutor(2))
+            requests = [route.handle_async(_request('/users')) for _ in range(4)]
+            return await asyncio.wait_for(asyncio.gather(*requests), 5)
+
+        bridge = ThreadPoolExecutor(2)
+        self.addCleanup(bridge.shutdown)
+        with mock.patch.dict('core.routing.router._bridge_executors', {0: bridge}):
+            route.compile_async()
+            self.assertEqual(asyncio.run(serve()), ['ok'] * 4)
+
+    def test_blocking_servers_run_coroutine_actions(self):
+        """Test the sync pipeline runs async actions to completion"""
+        async def action(request):
+            await asyncio.sleep(0)
+            return 'done'
+
+        route = self.router.get('/users', action)
+        self.assertEqual(route.handle(_request('/users')), 'done')
+
+class TestRouter(unittest.TestCase):
+    """Test route matching"""
+
+    def setUp(self):
+        self.router = Router()
+
+    def test_resolve_returns_parameters(self):
+        """Test parameterised routes resolve with their parameters"""
+        route = self.router.get('/users/{id}/posts/{post}', lambda request, id, post: None)
+        self.assertEqual(self.router.resolve('GET', '/users/1/posts/2'), (route, {'id': '1', 'post': '2'}))
+        self.assertIsNone(self.router.resolve('GET', '/users/1/posts'))
+        self.assertIsNone(self.router.resolve('POST', '/users/1/posts/2'))
+
+    def test_parameter_names_are_per_route(self):
+        """Test routes sharing a parameter position keep their own names"""
+        self.router.get('/users/{id}', lambda request, id: id)
+        route = self.router.get('/users/{user}/posts', lambda request, user: user)
+        self.assertEqual(self.router.resolve('GET', '/users/9/posts'), (route, {'user': '9'}))
+
+    def test_static_routes_take_precedence(self):
+        """Test a static route is not shadowed by an earlier parameterised one"""
+        dynamic = self.router.get('/users/{id}', lambda request, id: id)
+        static = self.router.get('/users/profile', lambda request: 'profile')
+        self.assertIs(self.router.find_route('GET', '/users/profile'), static)
+        self.assertIs(self.router.find_route('GET', '/users/7'), dynamic)
+
+    def test_routes_added_after_freeze_are_matched(self):
+        """Test registering a route invalidates the compiled matcher"""
+        self.router.get('/a', lambda request: 'a')
+        self.router.freeze()
+        route = self.router.get('/b', lambda request: 'b')
+        self.assertIs(self.router.find_route('GET', '/b'), route)
+
+    def test_lookup_reports_allowed_methods(self):
+        """Test a path matched for other methods lists them, and an unknown path lists none"""
+        self.router.get('/users/{id}', lambda request, id: id)
+        self.router.put('/users/{user}', lambda request, user: user)
+        self.router.post('/users/profile', lambda request: 'profile')
+
+        match = self.router.lookup('DELETE', '/users/7')
+        self.assertIsNone(match.route)
+        self.assertEqual(match.allowed, ('GET', 'HEAD', 'OPTIONS', 'PUT'))
+        # The static path only takes POST, but the parameterised one still matches it
+        self.assertEqual(self.router.lookup('PUT', '/users/profile').parameters, {'user': 'profile'})
+        self.assertEqual(self.router.lookup('DELETE', '/users/profile').allowed,
+                         ('GET', 'HEAD', 'OPTIONS', 'POST', 'PUT'))
+        self.assertEqual(self.router.lookup('GET', '/missing').allowed, ())
+
+    def test_head_is_served_by_get_routes(self):
+        """Test HEAD resolves to the GET route unless one is registered for it"""
+        route = self.router.get('/users/{id}', lambda request, id: id)
+        self.assertEqual(self.router.resolve('HEAD', '/users/3'), (route, {'id': '3'}))
+
+class TestRouteCache(unittest.TestCase):
+    """Test the serialized route cache"""
+
+    def setUp(self):
+        self.path = Path(tempfile.mkdtemp()) / 'cache' / 'routes.pickle'
+
+    def test_cached_router_handles_requests(self):
+        """Test a router loaded from the cache keeps routes and group middleware"""
+        controller = UserController()
+        router = Router()
+        users = router.group('/api').group('/users').middleware([ThrottleRequests(max_attempts=5)])
+        users.get('/{id}', controller.show)
+        users.get('/profile', controller.profile)
+
+        cache_routes(router, self.path)
+        cached = load_cached_routes(self.path)
+
+        route, parameters = cached.resolve('GET', '/api/users/3')
+        self.assertEqual(len(route.middleware), 1)
+        self.assertEqual(route.handle(_request('/api/users/3'), parameters).data, 'user 3')
+        self.assertEqual(cached.find_route('GET', '/api/users/profile').uri, '/api/users/profile')
+
+    def test_closures_cannot_be_cached(self):
+        """Test lambdas are rejected with a clear error"""
+        router = Router()
+        router.get('/', lambda request: 'home')
+        with self.assertRaises(RouteCacheError):
+            cache_routes(router, self.path)
+
+    def test_cache_file_is_readable_and_versioned(self):
+        """Test the cache is world-readable and one from another cache version is ignored"""
+        cache_routes(Router(), self.path)
+        self.assertEqual(self.path.stat().st_mode & 0o777, 0o644)
+
+        self.path.write_bytes(pickle.dumps(Router()))
+        self.assertIsNone(load_cached_routes(self.path))
+
+    def test_missing_cache(self):
+        """Test loading and clearing without a cache file"""
+        self.assertIsNone(load_cached_routes(self.path))
+        self.assertFalse(clear_routes(self.path))
+
+if __name__ == '__main__':
+    unittest.main()
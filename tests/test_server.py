@@ -0,0 +1,612 @@
+"""
+Test the slave HTTP server
+"""
+import asyncio
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import tracemalloc
+import unittest
+from unittest.mock import MagicMock
+from core.http import EventStreamResponse, ServerSentEvent, StreamedResponse
+from core.http.request import Request
+from core.routing.router import Router
+from slave.async_server import AsyncHTTPServer
+from slave.prefork import PreforkServer
+from slave.server import PooledHTTPServer, RouterHandler, RouterServer
+
+def _test_router() -> Router:
+    router = Router()
+    router.get('/pid', lambda request: {'pid': os.getpid()})
+    router.get('/crash', lambda request: os._exit(1))
+    return router.freeze()
+
+class _UnsentBody:
+    """Streamed body that records whether the server closed it"""
+    def __init__(self):
+        self.closed = False
+
+    def __next__(self):
+        return b'never sent'
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return b'never sent'
+
+    def close(self):
+        self.closed = True
+
+    async def aclose(self):
+        self.closed = True
+
+class _TestRouterServer(RouterServer):
+    """Router server that serves the test router instead of booting the application"""
+
+    def create_server(self, listen_socket=None, max_requests=0):
+        app = MagicMock()
+        app.make.return_value = _test_router()
+
+        def handler(*args, **kwargs):
+            return RouterHandler(*args, app=app, **kwargs)
+
+        return PooledHTTPServer(
+            (self.host, self.port), handler, workers=self.threads,
+            max_requests=max_requests, reuse_port=self.reuse_port, listen_socket=listen_socket
+        )
+
+def _run_prefork(port, workers, max_requests):
+    PreforkServer(_TestRouterServer('127.0.0.1', port, workers=workers, threads=2, max_requests=max_requests)).run()
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _get(port, path):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    try:
+        connection.request('GET', path, headers={'Connection': 'close'})
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+class TestPooledHTTPServer(unittest.TestCase):
+    """Test the pooled HTTP/1.1 server"""
+
+    def _serve(self, router, **options):
+        app = MagicMock()
+        app.make.return_value = router.freeze()
+
+        def handler(*args, **kwargs):
+            return RouterHandler(*args, app=app, **kwargs)
+
+        server = PooledHTTPServer(('127.0.0.1', 0), handler, **options)
+        thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server.server_address[1]
+
+    def test_connections_are_kept_alive(self):
+        """Test several requests are served over one HTTP/1.1 connection"""
+        router = Router()
+        router.get('/ping', lambda request: {'pong': True})
+        port = self._serve(router, workers=2)
+
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        connection.request('GET', '/ping')
+        first = connection.getresponse()
+        self.assertEqual(first.version, 11)
+        self.assertEqual(first.read(), b'{"pong": true}')
+        sock = connection.sock
+
+        connection.request('GET', '/ping')
+        second = connection.getresponse()
+        self.assertEqual(second.status, 200)
+        second.read()
+        self.assertIs(connection.sock, sock)
+        connection.close()
+
+    def test_streamed_responses_are_chunked(self):
+        """Test generator responses are sent with chunked encoding over keep-alive"""
+        router = Router()
+        router.get('/stream', lambda request: (f"line {i}\n" for i in range(3)))
+        router.get('/ping', lambda request: 'pong')
+        port = self._serve(router, workers=1)
+
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        connection.request('GET', '/stream')
+        response = connection.getresponse()
+        self.assertEqual(response.getheader('Transfer-Encoding'), 'chunked')
+        self.assertIsNone(response.getheader('Content-Length'))
+        self.assertEqual(response.read(), b'line 0\nline 1\nline 2\n')
+        sock = connection.sock
+
+        connection.request('GET', '/ping')
+        self.assertEqual(connection.getresponse().read(), b'pong')
+        self.assertIs(connection.sock, sock)
+        connection.close()
+
+    def test_server_sent_events_are_sent_as_produced(self):
+        """Test each event reaches the client before the next one is produced"""
+        received = threading.Event()
+
+        def progress():
+            yield ServerSentEvent({'done': 50}, event='progress')
+            received.wait(5)
+            yield ServerSentEvent({'done': 100}, event='progress')
+
+        router = Router()
+        router.get('/progress', lambda request: EventStreamResponse(progress))
+        port = self._serve(router, workers=1)
+
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        connection.request('GET', '/progress')
+        response = connection.getresponse()
+        self.assertEqual(response.getheader('Content-Type'), 'text/event-stream; charset=utf-8')
+        self.assertEqual(response.readline(), b'event: progress\n')
+        self.assertEqual(response.readline(), b'data: {"done": 50}\n')
+        received.set()
+        self.assertEqual(response.read(), b'\nevent: progress\ndata: {"done": 100}\n\n')
+        connection.close()
+
+    def test_every_method_is_dispatched(self):
+        """Test PUT and DELETE reach their routes, with 405, HEAD and OPTIONS on one connection"""
+        router = Router()
+        router.get('/users/{id}', lambda request, id: {'id': id})
+        router.put('/users/{id}', lambda request, id: {'updated': id, 'name': request.json().get('name')})
+        router.delete('/users/{id}', lambda request, id: {'deleted': id})
+        port = self._serve(router, workers=1)
+
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        connection.request('PUT', '/users/4', body='{"name": "Ada"}', headers={'Content-Type': 'application/json'})
+        self.assertEqual(json.loads(connection.getresponse().read()), {'updated': '4', 'name': 'Ada'})
+        connection.request('DELETE', '/users/4')
+        self.assertEqual(json.loads(connection.getresponse().read()), {'deleted': '4'})
+
+        connection.request('POST', '/users/4')
+        response = connection.getresponse()
+        response.read()
+        self.assertEqual(response.status, 405)
+        self.assertEqual(response.getheader('Allow'), 'DELETE, GET, HEAD, OPTIONS, PUT')
+
+        connection.request('HEAD', '/users/4')
+        response = connection.getresponse()
+        self.assertEqual(response.getheader('Content-Length'), '11')
+        self.assertEqual(response.read(), b'')
+
+        connection.request('OPTIONS', '/users/4')
+        response = connection.getresponse()
+        response.read()
+        self.assertEqual((response.status, response.getheader('Allow')), (204, 'DELETE, GET, HEAD, OPTIONS, PUT'))
+
+        connection.request('GET', '/users/4')
+        self.assertEqual(json.loads(connection.getresponse().read()), {'id': '4'})
+        connection.close()
+
+    def test_head_closes_the_streamed_body(self):
+        """Test a streamed body skipped for HEAD is closed without being iterated"""
+        body = _UnsentBody()
+        router = Router()
+        router.get('/export', lambda request: StreamedResponse(body))
+        port = self._serve(router, workers=1)
+
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        connection.request('HEAD', '/export')
+        response = connection.getresponse()
+        self.assertEqual((response.status, response.read()), (200, b''))
+        connection.close()
+        self.assertTrue(body.closed)
+
+    def test_errors_mid_stream_cut_the_response(self):
+        """Test a producer failing after the headers drops the connection without a second status line"""
+        def rows():
+            yield 'hello'
+            raise RuntimeError('boom')
+
+        router = Router()
+        router.get('/rows', lambda request: rows())
+        port = self._serve(router, workers=1)
+
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+            sock.sendall(b'GET /rows HTTP/1.1\r\nHost: test\r\n\r\n')
+            response = sock.makefile('rb').read()
+        self.assertIn(b'Transfer-Encoding: chunked', response)
+        self.assertTrue(response.endswith(b'\r\n\r\n5\r\nhello\r\n'))
+        self.assertEqual(response.count(b'HTTP/1.'), 1)
+
+    def test_idle_connections_time_out(self):
+        """Test the server closes connections that stay idle"""
+        router = Router()
+        port = self._serve(router, workers=1, keep_alive_timeout=0.2)
+
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+            time.sleep(0.5)
+            self.assertEqual(sock.recv(1024), b'')
+
+    def test_load_is_shed_when_queue_is_full(self):
+        """Test connections beyond the queue get a 503"""
+        release = threading.Event()
+        router = Router()
+        router.get('/slow', lambda request: release.wait(5) and 'done')
+        port = self._serve(router, workers=1, queue_size=1)
+
+        def slow_request():
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/slow')
+            return connection
+
+        busy = slow_request()
+        time.sleep(0.2)
+        queued = slow_request()
+        time.sleep(0.2)
+
+        rejected = slow_request().getresponse()
+        self.assertEqual(rejected.status, 503)
+        self.assertEqual(rejected.getheader('Retry-After'), '1')
+
+        release.set()
+        self.assertEqual(busy.getresponse().status, 200)
+        self.assertEqual(queued.getresponse().status, 200)
+
+    def test_stops_after_max_requests(self):
+        """Test serve_forever returns once max_requests have been served"""
+        app = MagicMock()
+        app.make.return_value = _test_router()
+
+        def handler(*args, **kwargs):
+            return RouterHandler(*args, app=app, **kwargs)
+
+        server = PooledHTTPServer(('127.0.0.1', 0), handler, workers=1, max_requests=2)
+        self.addCleanup(server.server_close)
+        thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        thread.start()
+
+        port = server.server_address[1]
+        for _ in range(2):
+            self.assertEqual(_get(port, '/pid')[0], 200)
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_oversized_body_is_refused_before_reading(self):
+        """Test a Content-Length over max_body_size gets 413 without the body being sent"""
+        router = Router()
+        router.post('/upload', lambda request: {'size': len(request.body())})
+        port = self._serve(router, workers=1, max_body_size=1024)
+
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+            sock.sendall(b'POST /upload HTTP/1.1\r\nHost: localhost\r\nContent-Length: 2048\r\n'
+                         b'Expect: 100-continue\r\n\r\n')
+            self.assertTrue(sock.recv(1024).startswith(b'HTTP/1.1 413'))
+
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        connection.request('POST', '/upload', body=b'x' * 1000)
+        self.assertEqual(json.loads(connection.getresponse().read()), {'size': 1000})
+        connection.close()
+
+    def test_unread_body_keeps_connection_usable(self):
+        """Test a body the action never reads is skipped, and bad JSON gets 400"""
+        router = Router()
+        router.post('/ignore', lambda request: 'ignored')
+        router.post('/echo', lambda request: request.json())
+        port = self._serve(router, workers=1)
+
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        connection.request('POST', '/ignore', body=b'x' * 5000)
+        self.assertEqual(connection.getresponse().read(), b'ignored')
+        connection.request('POST', '/echo', body='{"a": ', headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        response.read()
+        self.assertEqual(response.status, 400)
+        connection.close()
+
+class TestAsyncHTTPServer(unittest.TestCase):
+    """Test the asyncio HTTP/1.1 server"""
+
+    def _serve(self, router, **options):
+        app = MagicMock()
+        app.make.return_value = router.freeze()
+        server = AsyncHTTPServer(('127.0.0.1', 0), app, **options)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_async_actions_over_keep_alive(self):
+        """Test coroutine and blocking actions are served over one connection"""
+        async def hello(request, name):
+            await asyncio.sleep(0)
+            return {'hello': name}
+
+        router = Router()
+        router.get('/hello/{name}', hello)
+        router.get('/sync', lambda request: 'sync')
+        port = self._serve(router).server_address[1]
+
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        connection.request('GET', '/hello/world')
+        first = connection.getresponse()
+        self.assertEqual(first.version, 11)
+        self.assertEqual(json.loads(first.read()), {'hello': 'world'})
+        sock = connection.sock
+
+        connection.request('GET', '/sync')
+        second = connection.getresponse()
+        self.assertEqual(second.read(), b'sync')
+        self.assertIs(connection.sock, sock)
+
+        connection.request('GET', '/missing')
+        self.assertEqual(connection.getresponse().status, 404)
+        connection.close()
+
+    def test_streamed_responses_are_chunked(self):
+        """Test async generator responses are written chunk by chunk"""
+        async def events():
+            for i in range(3):
+                await asyncio.sleep(0)
+                yield f"event {i}\n"
+
+        router = Router()
+        router.get('/stream', lambda request: events())
+        port = self._serve(router).server_address[1]
+
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        connection.request('GET', '/stream')
+        response = connection.getresponse()
+        self.assertEqual(response.getheader('Transfer-Encoding'), 'chunked')
+        self.assertEqual(response.read(), b'event 0\nevent 1\nevent 2\n')
+        self.assertFalse(response.will_close)
+        connection.close()
+
+    def test_method_not_allowed_and_head(self):
+        """Test 405 with Allow and bodiless HEAD responses over keep-alive"""
+        router = Router()
+        router.get('/items', lambda request: (f"item {i}\n" for i in range(3)))
+        router.delete('/items/{id}', lambda request, id: {'deleted': id})
+        port = self._serve(router).server_address[1]
+
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        connection.request('DELETE', '/items/2')
+        self.assertEqual(json.loads(connection.getresponse().read()), {'deleted': '2'})
+        connection.request('PUT', '/items')
+        response = connection.getresponse()
+        response.read()
+        self.assertEqual((response.status, response.getheader('Allow')), (405, 'GET, HEAD, OPTIONS'))
+        connection.request('HEAD', '/items')
+        response = connection.getresponse()
+        self.assertEqual((response.status, response.read()), (200, b''))
+        connection.request('GET', '/items')
+        self.assertEqual(connection.getresponse().read(), b'item 0\nitem 1\nitem 2\n')
+        connection.close()
+
+    def test_head_closes_the_streamed_body(self):
+        """Test a streamed body skipped for HEAD is closed without being iterated"""
+        body = _UnsentBody()
+        router = Router()
+        router.get('/export', lambda request: StreamedResponse(body))
+        port = self._serve(router).server_address[1]
+
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        connection.request('HEAD', '/export')
+        response = connection.getresponse()
+        self.assertEqual((response.status, response.read()), (200, b''))
+        connection.close()
+        self.assertTrue(body.closed)
+
+    def test_errors_mid_stream_cut_the_response(self):
+        """Test a producer failing after the headers drops the connection without a second status line"""
+        def rows():
+            yield 'hello'
+            raise RuntimeError('boom')
+
+        router = Router()
+        router.get('/rows', lambda request: rows())
+        port = self._serve(router).server_address[1]
+
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+            sock.sendall(b'GET /rows HTTP/1.1\r\nHost: test\r\n\r\n')
+            response = sock.makefile('rb').read()
+        self.assertIn(b'Transfer-Encoding: chunked', response)
+        self.assertTrue(response.endswith(b'\r\n\r\n5\r\nhello\r\n'))
+        self.assertEqual(response.count(b'HTTP/1.'), 1)
+
+    def test_post_json_body(self):
+        """Test JSON request bodies reach the action"""
+        router = Router()
+        router.post('/echo', lambda request: request.json())
+        port = self._serve(router).server_address[1]
+
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        connection.request('POST', '/echo', body='{"a": 1}', headers={'Content-Type': 'application/json'})
+        self.assertEqual(json.loads(connection.getresponse().read()), {'a': 1})
+        connection.close()
+
+    def test_large_uploads_are_streamed(self):
+        """Test a body over the spool size reaches the action in chunks without being buffered"""
+        block = b'u' * (64 * 1024)
+        size = 8 * 1024 * 1024
+        boundary = 'upload-boundary'
+        head = (f'--{boundary}\r\nContent-Disposition: form-data; name="f"; filename="f.bin"\r\n'
+                f'Content-Type: application/octet-stream\r\n\r\n').encode()
+        tail = f'\r\n--{boundary}--\r\n'.encode()
+
+        async def upload(request):
+            await request.read()
+            upload = request.file('f')
+            return {'size': upload.size, 'in_memory': upload.in_memory}
+
+        router = Router()
+        router.post('/upload', upload)
+        router.post('/ignore', lambda request: 'ignored')
+        port = self._serve(router).server_address[1]
+
+        def body():
+            yield head
+            for _ in range(size // len(block)):
+                yield block
+            yield tail
+
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        tracemalloc.start()
+        try:
+            connection.request('POST', '/upload', body=body(), headers={
+                'Content-Type': f'multipart/form-data; boundary={boundary}',
+                'Content-Length': str(len(head) + size + len(tail))
+            })
+            response = json.loads(connection.getresponse().read())
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(response, {'size': size, 'in_memory': False})
+        # The spooled file holds up to 1 MiB; the body itself is never held whole
+        self.assertLess(peak, 3 * 1024 * 1024)
+
+        # A small unread body is skipped and the connection kept, a large one closes it
+        connection.request('POST', '/ignore', body=b'x' * 5000)
+        self.assertEqual(connection.getresponse().read(), b'ignored')
+        connection.close()
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+            sock.sendall(b'POST /ignore HTTP/1.1\r\nHost: test\r\nContent-Length: 1048576\r\n\r\n' + block)
+            response = sock.makefile('rb').read()
+        self.assertIn(b'Connection: close', response)
+        self.assertTrue(response.endswith(b'ignored'))
+
+    def test_current_request_is_per_task(self):
+        """Test concurrent requests each see their own current request"""
+        async def current(request, id):
+            await asyncio.sleep(0.05)
+            return {'path': Request.current().path}
+
+        router = Router()
+        router.get('/items/{id}', current)
+        port = self._serve(router).server_address[1]
+        results = {}
+
+        def call(item):
+            results[item] = json.loads(_get(port, f'/items/{item}')[1])['path']
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, {i: f'/items/{i}' for i in range(10)})
+
+    def test_connections_beyond_limit_are_rejected(self):
+        """Test connections over max_connections get a 503"""
+        router = Router()
+        router.get('/ping', lambda request: 'pong')
+        port = self._serve(router, max_connections=1).server_address[1]
+
+        held = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        held.request('GET', '/ping')
+        held.getresponse().read()
+
+        status, _ = _get(port, '/ping')
+        self.assertEqual(status, 503)
+        held.close()
+
+    def test_oversized_headers_are_rejected(self):
+        """Test request heads over max_header_size get a 431"""
+        router = Router()
+        port = self._serve(router, max_header_size=1024).server_address[1]
+
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        connection.request('GET', '/', headers={'X-Large': 'x' * 4096})
+        self.assertEqual(connection.getresponse().status, 431)
+        connection.close()
+
+    def test_shutdown_closes_idle_connections(self):
+        """Test shutdown does not wait for idle keep-alive clients"""
+        router = Router()
+        router.get('/ping', lambda request: 'pong')
+        server = self._serve(router, keep_alive_timeout=30)
+
+        connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+        connection.request('GET', '/ping')
+        connection.getresponse().read()
+
+        started = time.monotonic()
+        server.shutdown()
+        self.assertLess(time.monotonic() - started, 5)
+        connection.close()
+
+@unittest.skipUnless(hasattr(os, 'fork'), 'pre-fork mode requires fork()')
+class TestPreforkServer(unittest.TestCase):
+    """Test the pre-fork process manager"""
+
+    def _start(self, workers=2, max_requests=0):
+        port = _free_port()
+        master = multiprocessing.get_context('fork').Process(target=_run_prefork, args=(port, workers, max_requests))
+        master.start()
+        self.addCleanup(master.join, 10)
+        self.addCleanup(master.terminate)
+        self._wait_until_serving(port)
+        return master, port
+
+    def _wait_until_serving(self, port, timeout=10):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return self._pid(port)
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def _pid(self, port):
+        status, body = _get(port, '/pid')
+        self.assertEqual(status, 200)
+        return json.loads(body)['pid']
+
+    def test_workers_serve_requests(self):
+        """Test requests are served by forked worker processes"""
+        master, port = self._start()
+        pid = self._pid(port)
+        self.assertNotIn(pid, (os.getpid(), master.pid))
+
+    def test_crashed_worker_is_replaced(self):
+        """Test the master keeps serving after a worker dies"""
+        master, port = self._start(workers=1)
+        before = self._pid(port)
+        with self.assertRaises((http.client.HTTPException, OSError)):
+            _get(port, '/crash')
+
+        after = self._wait_until_serving(port)
+        self.assertNotEqual(after, before)
+
+    def test_reload_replaces_workers(self):
+        """Test SIGHUP replaces every worker without dropping the socket"""
+        master, port = self._start(workers=1)
+        before = self._pid(port)
+        os.kill(master.pid, signal.SIGHUP)
+
+        deadline = time.monotonic() + 10
+        while self._pid(port) == before:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+
+    def test_shutdown_stops_workers(self):
+        """Test SIGTERM stops the master and its workers"""
+        master, port = self._start()
+        worker = self._pid(port)
+        master.terminate()
+        master.join(10)
+
+        self.assertEqual(master.exitcode, 0)
+        with self.assertRaises(ProcessLookupError):
+            os.kill(worker, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+Test static file serving
+"""
+import http.client
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from core.http.static import StaticFiles, parse_range
+from core.routing.router import Router
+from slave.async_server import AsyncHTTPServer
+from slave.server import PooledHTTPServer, RouterHandler
+
+class TestStaticFiles(unittest.TestCase):
+    """Test static file metadata and request handling"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'app.css')
+        with open(self.path, 'wb') as f:
+            f.write(b'0123456789')
+        self.static = StaticFiles(self.directory, revalidate=0)
+
+    def test_full_response_headers(self):
+        """Test a plain GET gets the whole file with validators"""
+        response = self.static.prepare('app.css', {})
+        self.assertEqual(response.status, 200)
+        self.assertEqual((response.offset, response.length), (0, 10))
+        self.assertEqual(response.headers['Content-Type'], 'text/css')
+        self.assertEqual(response.headers['Content-Length'], '10')
+        self.assertIn('ETag', response.headers)
+        self.assertIn('Last-Modified', response.headers)
+
+    def test_conditional_requests(self):
+        """Test matching validators get a 304"""
+        first = self.static.prepare('app.css', {})
+        etag = first.headers['ETag']
+
+        self.assertEqual(self.static.prepare('app.css', {'If-None-Match': etag}).status, 304)
+        self.assertEqual(self.static.prepare('app.css', {'If-None-Match': f'W/{etag}'}).status, 304)
+        self.assertEqual(self.static.prepare('app.css', {'If-None-Match': '"other"'}).status, 200)
+        since = {'If-Modified-Since': first.headers['Last-Modified']}
+        self.assertEqual(self.static.prepare('app.css', since).status, 304)
+
+    def test_range_requests(self):
+        """Test byte ranges get a 206 with Content-Range"""
+        response = self.static.prepare('app.css', {'Range': 'bytes=2-5'})
+        self.assertEqual(response.status, 206)
+        self.assertEqual((response.offset, response.length), (2, 4))
+        self.assertEqual(response.headers['Content-Range'], 'bytes 2-5/10')
+
+        self.assertEqual(self.static.prepare('app.css', {'Range': 'bytes=-3'}).offset, 7)
+        self.assertEqual(self.static.prepare('app.css', {'Range': 'bytes=20-'}).status, 416)
+        # A stale If-Range falls back to the full file
+        stale = {'Range': 'bytes=2-5', 'If-Range': '"stale"'}
+        self.assertEqual(self.static.prepare('app.css', stale).status, 200)
+
+    def test_parse_range(self):
+        """Test range header parsing"""
+        self.assertEqual(parse_range('bytes=0-', 10), (0, 9))
+        self.assertEqual(parse_range('bytes=5-100', 10), (5, 9))
+        self.assertEqual(parse_range('bytes=-20', 10), (0, 9))
+        self.assertIsNone(parse_range('bytes=9-3', 10))
+        self.assertIs(parse_range('bytes=0-1,4-5', 10), NotImplemented)
+        self.assertIs(parse_range('items=0-1', 10), NotImplemented)
+
+    def test_metadata_is_cached_until_mtime_changes(self):
+        """Test the cached entry is reused and invalidated by a new mtime"""
+        static = StaticFiles(self.directory, revalidate=60)
+        etag = static.prepare('app.css', {}).headers['ETag']
+
+        with open(self.path, 'wb') as f:
+            f.write(b'changed content')
+        os.utime(self.path, (time.time() + 10, time.time() + 10))
+        self.assertEqual(static.prepare('app.css', {}).headers['ETag'], etag)
+
+        static.revalidate = 0
+        response = static.prepare('app.css', {})
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(response.length, 15)
+
+    def test_paths_cannot_escape_the_directory(self):
+        """Test traversal outside the directory is refused"""
+        self.assertEqual(self.static.prepare('../etc/passwd', {}).status, 403)
+        self.assertEqual(self.static.prepare('missing.css', {}).status, 404)
+
+class TestStaticServing(unittest.TestCase):
+    """Test static files over both built-in servers"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.content = os.urandom(256 * 1024)
+        with open(os.path.join(self.directory, 'video.mp4'), 'wb') as f:
+            f.write(self.content)
+        self.app = MagicMock()
+        self.app.make.return_value = Router().freeze()
+
+    def _threaded(self):
+        static_files = StaticFiles(self.directory)
+
+        def handler(*args, **kwargs):
+            return RouterHandler(*args, app=self.app, static_files=static_files, **kwargs)
+
+        server = PooledHTTPServer(('127.0.0.1', 0), handler, workers=2)
+        thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        return server, thread
+
+    def _asyncio(self):
+        server = AsyncHTTPServer(('127.0.0.1', 0), self.app, static_files=StaticFiles(self.directory))
+        return server, threading.Thread(target=server.serve_forever, daemon=True)
+
+    def test_servers_send_files_ranges_and_304s(self):
+        """Test both servers send whole files, byte ranges and 304s"""
+        for make_server in (self._threaded, self._asyncio):
+            with self.subTest(server=make_server.__name__):
+                server, thread = make_server()
+                thread.start()
+                try:
+                    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+                    connection.request('GET', '/static/video.mp4')
+                    response = connection.getresponse()
+                    self.assertEqual(response.status, 200)
+                    self.assertEqual(response.getheader('Content-Type'), 'video/mp4')
+                    self.assertEqual(response.read(), self.content)
+                    etag = response.getheader('ETag')
+
+                    connection.request('GET', '/static/video.mp4', headers={'Range': 'bytes=1000-1999'})
+                    response = connection.getresponse()
+                    self.assertEqual(response.status, 206)
+                    self.assertEqual(response.read(), self.content[1000:2000])
+
+                    connection.request('GET', '/static/video.mp4', headers={'If-None-Match': etag})
+                    response = connection.getresponse()
+                    self.assertEqual(response.status, 304)
+                    self.assertEqual(response.read(), b'')
+
+                    connection.request('GET', '/static/missing.mp4')
+                    response = connection.getresponse()
+                    self.assertEqual(response.status, 404)
+                    response.read()
+                    connection.close()
+                finally:
+                    server.shutdown()
+                    server.server_close()
+                    thread.join(5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Test the content-addressed storage disk
+"""
+import hashlib
+import io
+import pickle
+import shutil
+import tempfile
+import unittest
+from core.filesystem.storage import ContentAddressedDisk
+from core.http.upload import UploadedFile
+
+class TestContentAddressedDisk(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.disk = ContentAddressedDisk(self.root)
+
+    def _blobs(self):
+        return sorted(path.name for path in self.disk.blobs_path.glob('*/*/*'))
+
+    def test_identical_contents_are_stored_once(self):
+        """Test the same content under several paths shares one sharded blob"""
+        digest = hashlib.sha256(b'licence scan').hexdigest()
+        self.disk.put('transporters/1/licence.pdf', b'licence scan')
+        self.disk.put('transporters/2/licence.pdf', 'licence scan')
+
+        self.assertEqual(self._blobs(), [digest])
+        self.assertTrue((self.disk.blobs_path / digest[:2] / digest[2:4] / digest).is_file())
+        self.assertEqual(self.disk.get('transporters/2/licence.pdf'), b'licence scan')
+        self.assertEqual(self.disk.hash('/transporters/1/./licence.pdf'), digest)
+        self.assertEqual(self.disk.size('transporters/1/licence.pdf'), 12)
+        self.assertEqual(self.disk.files('transporters'), ['transporters/1/licence.pdf', 'transporters/2/licence.pdf'])
+
+    def test_streams_in_and_out(self):
+        """Test file objects and chunk iterables are written and read in chunks"""
+        content = b'0123456789' * 20000
+        self.disk.put('from-file.bin', io.BytesIO(content))
+        self.disk.put('from-chunks.bin', (content[i:i + 1000] for i in range(0, len(content), 1000)))
+
+        self.assertEqual(len(self._blobs()), 1)
+        chunks = list(self.disk.read_stream('from-chunks.bin', chunk_size=65536))
+        self.assertEqual([len(chunk) for chunk in chunks], [65536, 65536, 65536, 3392])
+        self.assertEqual(b''.join(chunks), content)
+
+    def test_references_and_gc(self):
+        """Test blobs survive gc while a path references them"""
+        self.disk.put('a.txt', b'shared')
+        self.disk.copy('a.txt', 'b.txt')
+        self.disk.put('c.txt', b'replaced')
+        self.disk.put('c.txt', b'replacement')
+
+        self.assertEqual(self.disk.gc(), (1, len(b'replaced')))
+        self.assertTrue(self.disk.delete('a.txt'))
+        self.assertEqual(self.disk.gc(), (0, 0))
+        self.assertEqual(self.disk.get('b.txt'), b'shared')
+
+        self.disk.move('b.txt', 'd.txt')
+        self.assertFalse(self.disk.exists('b.txt'))
+        self.disk.delete('d.txt', 'c.txt')
+        self.assertEqual(self.disk.gc(), (2, len(b'shared') + len(b'replacement')))
+        self.assertEqual(self._blobs(), [])
+        with self.assertRaises(FileNotFoundError):
+            self.disk.get('d.txt')
+
+    def test_gc_removes_unindexed_blobs(self):
+        """Test blob files left by an interrupted put are collected"""
+        self.disk.put('kept.txt', b'kept')
+        orphan = self.disk.blobs_path / 'ab' / 'cd' / ('abcd' + '0' * 60)
+        orphan.parent.mkdir(parents=True)
+        orphan.write_bytes(b'orphan')
+
+        self.assertEqual(self.disk.gc(), (1, 6))
+        self.assertEqual(self.disk.get('kept.txt'), b'kept')
+
+    def test_stored_upload_is_not_rewritten(self):
+        """Test an upload whose content is already stored only gains a reference"""
+        self.disk.put('first.txt', b'document')
+        upload = UploadedFile('doc', 'doc.txt', 'text/plain', directory=self.root)
+        upload.write(b'document')
+
+        blob = self.disk.path('first.txt')
+        modified = blob.stat().st_mtime_ns
+        self.disk.put('second.txt', upload)
+        self.assertEqual(self.disk.path('second.txt'), blob)
+        self.assertEqual(blob.stat().st_mtime_ns, modified)
+
+        fresh = UploadedFile('doc', 'new.txt', 'text/plain', directory=self.root)
+        fresh.write(b'new document')
+        self.disk.put('third.txt', fresh)
+        self.assertEqual(self.disk.get('third.txt'), b'new document')
+
+    def test_disk_is_picklable(self):
+        """Test a disk can be pickled and reopens its index"""
+        self.disk.put('a.txt', b'a')
+        self.assertEqual(pickle.loads(pickle.dumps(self.disk)).get('a.txt'), b'a')
+
+    def test_invalid_paths(self):
+        """Test paths that normalize to nothing are rejected"""
+        with self.assertRaises(ValueError):
+            self.disk.put('/', b'x')
+        with self.assertRaises(ValueError):
+            self.disk.put('a/..', b'x')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+Test streaming multipart uploads
+"""
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+from unittest.mock import MagicMock
+from core.http import BodyError, BodyTooLarge
+from core.http.request import BodyReader, Request
+from core.http.upload import MultipartReader
+
+BOUNDARY = 'upload-boundary'
+CONTENT_TYPE = f'multipart/form-data; boundary={BOUNDARY}'
+
+def _part(name, value, filename=None, content_type='application/octet-stream'):
+    disposition = f'form-data; name="{name}"'
+    head = f'--{BOUNDARY}\r\nContent-Disposition: {disposition}'
+    if filename is not None:
+        head += f'; filename="{filename}"\r\nContent-Type: {content_type}'
+    return head.encode() + b'\r\n\r\n' + value + b'\r\n'
+
+def _body(*parts):
+    return b''.join(parts) + f'--{BOUNDARY}--\r\n'.encode()
+
+class TestMultipartReader(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def _parse(self, body, chunk_size=7, **options):
+        reader = MultipartReader(CONTENT_TYPE, directory=self.directory, **options)
+        for start in range(0, len(body), chunk_size):
+            reader.write(body[start:start + chunk_size])
+        return reader.finish()
+
+    def test_fields_and_files(self):
+        """Test fields and files are parsed from chunks split at arbitrary points"""
+        content = os.urandom(5000)
+        fields, files = self._parse(_body(
+            _part('title', 'Café'.encode()),
+            _part('document', content, filename='../report.pdf', content_type='application/pdf'),
+            _part('empty', b'', filename='')
+        ))
+        self.assertEqual(fields, {'title': 'Café'})
+        self.assertEqual(list(files), ['document'])
+        upload = files['document']
+        self.assertEqual((upload.filename, upload.content_type, upload.size), ('report.pdf', 'application/pdf', 5000))
+        self.assertEqual(upload.hash, hashlib.sha256(content).hexdigest())
+        self.assertEqual(upload.read(), content)
+
+        saved = upload.save(os.path.join(self.directory, 'saved', 'report.pdf'))
+        self.assertEqual(saved.read_bytes(), content)
+
+    def test_large_files_spill_to_disk(self):
+        """Test files over the spool size leave memory while small ones stay in it"""
+        _, files = self._parse(_body(
+            _part('small', b'x' * 100, filename='small.txt'),
+            _part('large', b'y' * 10000, filename='large.txt')
+        ), chunk_size=1024, spool_size=4096)
+        self.assertTrue(files['small'].in_memory)
+        self.assertFalse(files['large'].in_memory)
+        self.assertEqual(files['large'].read(), b'y' * 10000)
+
+    def test_memory_is_bounded(self):
+        """Test parsing a large upload holds no more than a few chunks in memory"""
+        reader = MultipartReader(CONTENT_TYPE, spool_size=64 * 1024, directory=self.directory)
+        chunk = b'z' * (64 * 1024)
+        tracemalloc.start()
+        try:
+            reader.write(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="f"; filename="f.bin"\r\n\r\n'.encode())
+            for _ in range(128):
+                reader.write(chunk)
+            reader.write(f'\r\n--{BOUNDARY}--\r\n'.encode())
+            _, files = reader.finish()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(files['f'].size, 128 * len(chunk))
+        self.assertLess(peak, 1024 * 1024)
+
+    def test_malformed_bodies(self):
+        """Test oversized fields, truncated bodies and missing boundaries raise body errors"""
+        with self.assertRaises(BodyTooLarge):
+            self._parse(_body(_part('bio', b'x' * 100)), max_field_size=10)
+        with self.assertRaises(BodyError):
+            self._parse(_body(_part('title', b'Hello'))[:-10])
+        with self.assertRaises(BodyError):
+            MultipartReader('multipart/form-data')
+
+class TestRequestFiles(unittest.TestCase):
+    def test_request_parses_multipart_lazily(self):
+        """Test form() and files() parse the body from the connection on first access"""
+        body = _body(_part('name', b'Ada'), _part('avatar', b'\x89PNG', filename='ada.png', content_type='image/png'))
+        reader = BodyReader(io.BytesIO(body), len(body), chunk_size=16)
+        request = Request(MagicMock(), 'POST', '/upload', {'Content-Type': CONTENT_TYPE}, stream=reader)
+
+        self.assertEqual(reader.remaining, len(body))
+        self.assertEqual(request.form(), {'name': 'Ada'})
+        self.assertEqual(reader.remaining, 0)
+        self.assertEqual(request.file('avatar').read(), b'\x89PNG')
+        self.assertIsNone(request.file('missing'))
+
+        request.close()
+        self.assertTrue(request.file('avatar').file.closed)
+
+if __name__ == '__main__':
+    unittest.main()